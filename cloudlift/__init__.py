@@ -1,19 +1,13 @@
 import functools
 
-import boto3
 import click
-from botocore.exceptions import ClientError
-
-from cloudlift.config import highlight_production
-from cloudlift.deployment.configs import deduce_name
-from cloudlift.deployment import EnvironmentCreator, editor
-from cloudlift.config.logging import log_err
-from cloudlift.deployment.service_creator import ServiceCreator
-from cloudlift.deployment.service_information_fetcher import ServiceInformationFetcher
-from cloudlift.deployment.service_updater import ServiceUpdater
-from cloudlift.session import SessionCreator
+
 from cloudlift.version import VERSION
 
+# Command implementations pull in boto3, troposphere, awscli and friends.
+# They are imported inside each command so that `cloudlift --version`,
+# `--help` and shell completion only pay for importing click.
+
 
 def _require_environment(func):
     @click.option('--environment', '-e', prompt='environment',
@@ -21,6 +15,7 @@ def _require_environment(func):
     @functools.wraps(func)
     def wrapper(*args, **kwargs):
         if kwargs['environment'] == 'production':
+            from cloudlift.config.banner import highlight_production
             highlight_production()
         return func(*args, **kwargs)
     return wrapper
@@ -32,47 +27,101 @@ repo')
     @functools.wraps(func)
     def wrapper(*args, **kwargs):
         if kwargs['name'] is None:
+            from cloudlift.deployment.configs import deduce_name
             kwargs['name'] = deduce_name(None)
         return func(*args, **kwargs)
     return wrapper
 
 
+def _require_aws(func):
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        from botocore.exceptions import BotoCoreError, ClientError
+        from cloudlift.config.client_pool import get_client
+        from cloudlift.config.logging import log_err
+        try:
+            get_client('cloudformation')
+        except (BotoCoreError, ClientError):
+            log_err("Could not connect to AWS!")
+            log_err("Ensure AWS_ACCESS_KEY_ID, AWS_SECRET_ACCESS_KEY & \
+AWS_DEFAULT_REGION env vars are set OR run 'aws configure'")
+            exit(1)
+        return func(*args, **kwargs)
+    return wrapper
+
+
+def _stack_timing_options(func):
+    func = click.option('--trace_file', default=None,
+                        type=click.Path(dir_okay=False, writable=True),
+                        help='Write resource timings as a Chrome trace to \
+this file')(func)
+    return click.option('--timings', is_flag=True,
+                        help='Print how long each resource of the stack \
+took')(func)
+
+
+def _log_client_stats():
+    from cloudlift.config.client_pool import get_client_pool_stats
+    from cloudlift.config.logging import log_bold
+    log_bold("AWS sessions: {sessions} | clients: {clients} | resources: \
+{resources} | connections: {connections}".format(**get_client_pool_stats()))
+
+
 @click.group()
 @click.version_option(version=VERSION, prog_name="cloudlift")
-def cli():
+@click.option('--max_pool_connections', type=int, default=None,
+              help='Maximum HTTP connections kept per AWS client')
+@click.option('--client_stats', is_flag=True,
+              help='Print how many AWS clients and connections were created')
+@click.option('--use_cache/--no_cache', default=None,
+              help='Cache environment and service configuration locally')
+@click.option('--offline', is_flag=True,
+              help='Use locally cached configuration without checking AWS')
+@click.pass_context
+def cli(ctx, max_pool_connections, client_stats, use_cache, offline):
     """
         Cloudlift is built by Simpl developers to make it easier to launch \
         dockerized services in AWS ECS.
     """
-    try:
-        boto3.client('cloudformation')
-    except ClientError:
-        log_err("Could not connect to AWS!")
-        log_err("Ensure AWS_ACCESS_KEY_ID, AWS_SECRET_ACCESS_KEY & \
-AWS_DEFAULT_REGION env vars are set OR run 'aws configure'")
-        exit(1)
+    if use_cache is not None or offline:
+        from cloudlift.config.local_cache import configure_local_cache
+        configure_local_cache(enabled=use_cache, offline=offline or None)
+    if max_pool_connections is not None:
+        from cloudlift.config.client_pool import configure_client_pool
+        configure_client_pool(max_pool_connections)
+    if client_stats:
+        ctx.call_on_close(_log_client_stats)
 
 
 @cli.command(help="Create a new service. This can contain multiple \
 ECS services")
 @_require_environment
 @_require_name
-def create_service(name, environment):
-    ServiceCreator(name, environment).create()
+@_stack_timing_options
+@_require_aws
+def create_service(name, environment, timings, trace_file):
+    from cloudlift.deployment.service_creator import ServiceCreator
+    ServiceCreator(name, environment, timings, trace_file).create()
 
 
 @cli.command(help="Update existing service.")
 @_require_environment
 @_require_name
-def update_service(name, environment):
-    ServiceCreator(name, environment).update()
+@_stack_timing_options
+@_require_aws
+def update_service(name, environment, timings, trace_file):
+    from cloudlift.deployment.service_creator import ServiceCreator
+    ServiceCreator(name, environment, timings, trace_file).update()
 
 
 @cli.command(help="Create a new environment")
 @click.option('--environment', '-e', prompt='environment',
               help='environment')
-def create_environment(environment):
-    EnvironmentCreator(environment).run()
+@_stack_timing_options
+@_require_aws
+def create_environment(environment, timings, trace_file):
+    from cloudlift.deployment.environment_creator import EnvironmentCreator
+    EnvironmentCreator(environment, timings, trace_file).run()
 
 
 @cli.command(help="Update environment")
@@ -80,15 +129,22 @@ def create_environment(environment):
 @click.option('--update_ecs_agents',
               is_flag=True,
               help='Update ECS container agents')
-def update_environment(environment, update_ecs_agents):
-    EnvironmentCreator(environment).run_update(update_ecs_agents)
+@_stack_timing_options
+@_require_aws
+def update_environment(environment, update_ecs_agents, timings, trace_file):
+    from cloudlift.deployment.environment_creator import EnvironmentCreator
+    EnvironmentCreator(environment, timings, trace_file).run_update(
+        update_ecs_agents
+    )
 
 
 @cli.command(help="Command used to create or update the configuration \
 in parameter store")
 @_require_name
 @_require_environment
+@_require_aws
 def edit_config(name, environment):
+    from cloudlift.deployment import editor
     editor.edit_config(name, environment)
 
 
@@ -97,8 +153,27 @@ def edit_config(name, environment):
 @_require_name
 @click.option('--version', default=None,
               help='local image version tag')
-def deploy_service(name, environment, version):
-    ServiceUpdater(name, environment, None, version).run()
+@click.option('--verify_tasks', is_flag=True,
+              help='Also count RUNNING tasks before declaring a service \
+deployed')
+@click.option('--parallelism', type=click.IntRange(min=1), default=None,
+              help='Maximum number of services deployed at a time. \
+Defaults to all of them')
+@click.option('--fail_fast', is_flag=True,
+              help='Stop deploying further services once one fails')
+@click.option('--force', is_flag=True,
+              help='Deploy services that already run this version and \
+configuration')
+@_require_aws
+def deploy_service(name, environment, version, verify_tasks, parallelism,
+                   fail_fast, force):
+    from cloudlift.deployment.service_updater import ServiceUpdater
+    ServiceUpdater(name, environment, None, version).run(
+        verify_tasks,
+        parallelism,
+        fail_fast,
+        force
+    )
 
 
 @cli.command()
@@ -106,7 +181,9 @@ def deploy_service(name, environment, version):
 @click.option('--additional_tags', default=[], multiple=True,
               help='Additional tags for the image apart from commit SHA')
 @_require_name
+@_require_aws
 def upload_to_ecr(name, local_tag, additional_tags):
+    from cloudlift.deployment.service_updater import ServiceUpdater
     ServiceUpdater(name, '', '', local_tag).upload_image(additional_tags)
 
 
@@ -116,7 +193,9 @@ from commit hash")
 @_require_name
 @click.option('--short', '-s', is_flag=True,
               help='Pass this when you just need the version tag')
+@_require_aws
 def get_version(name, environment, short):
+    from cloudlift.deployment.service_information_fetcher import ServiceInformationFetcher
     ServiceInformationFetcher(name, environment).get_version(short)
 
 
@@ -124,9 +203,74 @@ def get_version(name, environment, short):
 service task")
 @_require_environment
 @_require_name
-@click.option('--mfa', help='MFA code', prompt='MFA Code')
-def start_session(name, environment, mfa):
-    SessionCreator(name, environment).start_session(mfa)
+@click.option('--mfa', default=None,
+              help='MFA code, asked for when no cached MFA session is valid')
+@click.option('--mfa_duration', type=int, default=None,
+              help='Seconds the MFA session stays valid and cached')
+@_require_aws
+def start_session(name, environment, mfa, mfa_duration):
+    from cloudlift.session import SessionCreator
+    SessionCreator(name, environment).start_session(mfa, mfa_duration)
+
+
+@cli.command(help="Save the inputs of a service or environment template \
+to a file, for rendering it with `render`")
+@_require_environment
+@click.option('--name', default=None,
+              help='Your service name, give the name of repo')
+@click.option('--cluster', is_flag=True,
+              help='Capture the environment template instead of a service')
+@click.option('--output', '-o', required=True,
+              type=click.Path(dir_okay=False, writable=True),
+              help='Snapshot file to write')
+@_require_aws
+def snapshot(environment, name, cluster, output):
+    from cloudlift.config.logging import log_bold
+    from cloudlift.deployment.template_snapshot import TemplateSnapshot
+    if cluster:
+        template_snapshot = TemplateSnapshot.capture_environment(environment)
+    else:
+        from cloudlift.deployment.configs import deduce_name
+        template_snapshot = TemplateSnapshot.capture_service(
+            deduce_name(name),
+            environment
+        )
+    template_snapshot.save(output)
+    log_bold("Saved snapshot to " + output)
+
+
+@cli.command(help="Render a template from a snapshot file without \
+calling AWS")
+@click.option('--snapshot', 'snapshot_file', required=True,
+              type=click.Path(exists=True, dir_okay=False),
+              help='Snapshot file written by `snapshot`')
+@click.option('--env_sample', default='./env.sample',
+              type=click.Path(dir_okay=False),
+              help='env.sample of the service, for its environment names')
+@click.option('--output', '-o', default=None,
+              type=click.Path(dir_okay=False, writable=True),
+              help='Write the template to this file instead of stdout')
+def render(snapshot_file, env_sample, output):
+    from cloudlift.deployment.template_snapshot import TemplateSnapshot
+    template = TemplateSnapshot.load(snapshot_file).render(env_sample)
+    if output:
+        with open(output, 'w') as template_file:
+            template_file.write(template)
+    else:
+        click.echo(template)
+
+
+@cli.group(help="Manage configuration cached locally by cloudlift")
+def cache():
+    pass
+
+
+@cache.command(help="Remove everything cloudlift has cached locally")
+def clear():
+    from cloudlift.config.local_cache import clear_cache, get_cache_directory
+    from cloudlift.config.logging import log_bold
+    clear_cache()
+    log_bold("Cleared " + get_cache_directory())
 
 if __name__ == '__main__':
     cli()
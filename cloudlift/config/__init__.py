@@ -1,3 +1,4 @@
+from .client_pool import *
 from .account import *
 from .diff import *
 from .decimal_encoder import *
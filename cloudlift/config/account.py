@@ -1,6 +1,59 @@
-from boto3 import client
+import hashlib
+
+from cloudlift.config.client_pool import get_client, get_session
+from cloudlift.config.local_cache import read_cache, write_cache
+
+CALLER_IDENTITY_CACHE = 'caller_identity'
+CALLER_IDENTITY_TTL_SECONDS = 900
+
+_caller_identities = {}
+
+
+def get_caller_identity():
+    '''
+        STS caller identity of the current credentials. STS is called once
+        per credential set; the result is kept for a short while on disk,
+        keyed by a hash of the access key id.
+    '''
+    credentials_hash = get_credentials_hash()
+    if credentials_hash not in _caller_identities:
+        identity = None
+        if credentials_hash:
+            identity = read_cache(CALLER_IDENTITY_CACHE, credentials_hash)
+        if identity is None:
+            response = get_client('sts').get_caller_identity()
+            identity = {
+                'Account': response['Account'],
+                'Arn': response['Arn'],
+                'UserId': response['UserId']
+            }
+            if credentials_hash:
+                write_cache(
+                    CALLER_IDENTITY_CACHE,
+                    credentials_hash,
+                    identity,
+                    ttl=CALLER_IDENTITY_TTL_SECONDS
+                )
+        _caller_identities[credentials_hash] = identity
+    return _caller_identities[credentials_hash]
 
 
 def get_account_id(sts_client=None):
-    sts_client = sts_client or client('sts')
-    return sts_client.get_caller_identity().get('Account')
+    if sts_client:
+        return sts_client.get_caller_identity().get('Account')
+    return get_caller_identity()['Account']
+
+
+def get_username():
+    return get_caller_identity()['Arn'].split("user/")[1]
+
+
+def get_mfa_arn():
+    return "arn:aws:iam::%s:mfa/%s" % (get_account_id(), get_username())
+
+
+def get_credentials_hash():
+    credentials = get_session().get_credentials()
+    if credentials is None:
+        return None
+    return hashlib.sha256(credentials.access_key.encode('utf-8')).hexdigest()
@@ -0,0 +1,128 @@
+'''
+Process-wide pool of boto3 sessions, clients and resources.
+
+Building a client loads the botocore service model and opens fresh
+connections, so every module asks this pool instead of building its own.
+Entries are keyed by service, region and the credentials in the
+environment, so switching credentials (e.g. after MFA login) gets new
+clients.
+'''
+
+import os
+import threading
+
+import boto3
+from botocore.config import Config
+
+DEFAULT_MAX_POOL_CONNECTIONS = 10
+
+CREDENTIAL_VARIABLES = (
+    'AWS_ACCESS_KEY_ID',
+    'AWS_SECRET_ACCESS_KEY',
+    'AWS_SESSION_TOKEN',
+    'AWS_PROFILE',
+    'AWS_DEFAULT_PROFILE',
+)
+
+_lock = threading.RLock()
+_sessions = {}
+_clients = {}
+_resources = {}
+_settings = {
+    'max_pool_connections': int(os.environ.get(
+        'CLOUDLIFT_MAX_POOL_CONNECTIONS',
+        DEFAULT_MAX_POOL_CONNECTIONS
+    ))
+}
+
+
+def configure_client_pool(max_pool_connections):
+    '''
+        Set the size of the connection pool of clients created from now on
+    '''
+    _settings['max_pool_connections'] = max_pool_connections
+
+
+def ensure_max_pool_connections(max_pool_connections):
+    '''
+        Grow the connection pool of clients created from now on to at least
+        the given size, e.g. the number of threads sharing a client
+    '''
+    _settings['max_pool_connections'] = max(
+        _settings['max_pool_connections'],
+        max_pool_connections
+    )
+
+
+def get_session(region_name=None):
+    key = (region_name, _credentials_key())
+    with _lock:
+        if key not in _sessions:
+            _sessions[key] = boto3.session.Session(region_name=region_name)
+        return _sessions[key]
+
+
+def get_client(service, region_name=None):
+    key = (service, region_name, _credentials_key())
+    with _lock:
+        if key not in _clients:
+            _clients[key] = get_session(region_name).client(
+                service,
+                config=_client_config()
+            )
+        return _clients[key]
+
+
+def get_resource(service, region_name=None):
+    key = (service, region_name, _credentials_key())
+    with _lock:
+        if key not in _resources:
+            _resources[key] = get_session(region_name).resource(
+                service,
+                config=_client_config()
+            )
+        return _resources[key]
+
+
+def get_client_pool_stats():
+    '''
+        Counts of sessions, clients, resources and HTTP connections
+        created by this process
+    '''
+    with _lock:
+        clients = list(_clients.values()) + \
+            [resource.meta.client for resource in _resources.values()]
+        return {
+            'sessions': len(_sessions),
+            'clients': len(_clients),
+            'resources': len(_resources),
+            'connections': sum(_count_connections(c) for c in clients)
+        }
+
+
+def reset_client_pool():
+    with _lock:
+        _sessions.clear()
+        _clients.clear()
+        _resources.clear()
+
+
+def _client_config():
+    return Config(max_pool_connections=_settings['max_pool_connections'])
+
+
+def _credentials_key():
+    return tuple(os.environ.get(variable) for variable in CREDENTIAL_VARIABLES)
+
+
+def _count_connections(client):
+    # botocore does not expose connection counts, so read them from the
+    # urllib3 pools behind the client's endpoint.
+    try:
+        pool_manager = client._endpoint.http_session._manager
+        return sum(
+            pool_manager.pools[pool_key].num_connections
+            for pool_key in pool_manager.pools.keys()
+        )
+    except (AttributeError, KeyError):
+        return 0
@@ -5,7 +5,6 @@ the organization using cloudlift
 import ipaddress
 import json
 
-import boto3
 import dictdiffer
 from botocore.exceptions import ClientError
 from click import confirm, edit, prompt
@@ -14,10 +13,36 @@ from jsonschema.exceptions import ValidationError
 
 from cloudlift.config import DecimalEncoder
 from cloudlift.config import print_json_changes
+from cloudlift.config.client_pool import get_client, get_resource
+from cloudlift.config.local_cache import (get_versioned, is_offline,
+                                          store_versioned)
 # import config.mfa as mfa
 from cloudlift.config.logging import log_bold, log_err, log_warning
 
 ENVIRONMENT_CONFIGURATION_TABLE = 'environment_configurations'
+ENVIRONMENT_CONFIGURATION_CACHE = 'environment_configurations'
+
+# Environment configuration rarely changes while cloudlift runs, so each
+# environment is read from DynamoDB once per process.
+_environment_snapshots = {}
+_verified_tables = set()
+
+
+def get_environment_snapshot(environment):
+    '''
+        Configuration of the given environment, read once per process
+    '''
+    if environment not in _environment_snapshots:
+        _environment_snapshots[environment] = EnvironmentConfiguration(
+            environment
+        ).get_config()[environment]
+    return _environment_snapshots[environment]
+
+
+def clear_environment_snapshots():
+    _environment_snapshots.clear()
+    _verified_tables.clear()
+
 
 class EnvironmentConfiguration(object):
     '''
@@ -27,15 +52,23 @@ class EnvironmentConfiguration(object):
     def __init__(self, environment=None):
         self.environment = environment
 
-        session = boto3.session.Session()
-        self.dynamodb = session.resource('dynamodb')
+        self.dynamodb = get_resource('dynamodb')
         self.table = self._get_table()
 
     def get_config(self):
         '''
-            Get configuration from DynamoDB
+            Get configuration from DynamoDB, or the local cache when its
+            version is still current
         '''
 
+        return get_versioned(
+            ENVIRONMENT_CONFIGURATION_CACHE,
+            self.environment,
+            self._fetch_config_version,
+            self._fetch_config
+        )
+
+    def _fetch_config(self):
         try:
             configuration_response = self.table.get_item(
                 Key={
@@ -43,10 +76,12 @@ class EnvironmentConfiguration(object):
                 },
                 ConsistentRead=True,
                 AttributesToGet=[
-                    'configuration'
+                    'configuration',
+                    'config_version'
                 ]
             )
-            return configuration_response['Item']['configuration']
+            item = configuration_response['Item']
+            return item.get('config_version'), item['configuration']
         except ClientError:
             log_err("Unable to fetch environment configuration from DynamoDB.")
             exit(1)
@@ -54,6 +89,20 @@ class EnvironmentConfiguration(object):
             log_err("Environment configuration not found. Does this environment exist?")
             exit(1)
 
+    def _fetch_config_version(self):
+        try:
+            configuration_response = self.table.get_item(
+                Key={
+                    'environment': self.environment
+                },
+                ConsistentRead=True,
+                ProjectionExpression='config_version'
+            )
+            return configuration_response.get('Item', {}).get('config_version')
+        except ClientError:
+            log_err("Unable to fetch environment configuration from DynamoDB.")
+            exit(1)
+
     def update_config(self):
         if not self._env_config_exists():
             self._create_config()
@@ -73,11 +122,14 @@ class EnvironmentConfiguration(object):
         return [env['environment'] for env in response['Items']]
 
     def _get_table(self):
-        dynamodb_client = boto3.session.Session().client('dynamodb')
-        table_names = dynamodb_client.list_tables()['TableNames']
-        if ENVIRONMENT_CONFIGURATION_TABLE not in table_names:
-            log_warning("Could not find configuration table, creating one..")
-            self._create_configuration_table()
+        if ENVIRONMENT_CONFIGURATION_TABLE not in _verified_tables and \
+                not is_offline():
+            dynamodb_client = get_client('dynamodb')
+            table_names = dynamodb_client.list_tables()['TableNames']
+            if ENVIRONMENT_CONFIGURATION_TABLE not in table_names:
+                log_warning("Could not find configuration table, creating one..")
+                self._create_configuration_table()
+            _verified_tables.add(ENVIRONMENT_CONFIGURATION_TABLE)
         return self.dynamodb.Table(ENVIRONMENT_CONFIGURATION_TABLE)
 
     def _create_configuration_table(self):
@@ -222,12 +274,21 @@ class EnvironmentConfiguration(object):
                 Key={
                     'environment': self.environment
                 },
-                UpdateExpression='SET configuration = :configuration',
+                UpdateExpression='SET configuration = :configuration \
+ADD config_version :one',
                 ExpressionAttributeValues={
-                    ':configuration': config
+                    ':configuration': config,
+                    ':one': 1
                 },
                 ReturnValues="UPDATED_NEW"
             )
+            _environment_snapshots.pop(self.environment, None)
+            store_versioned(
+                ENVIRONMENT_CONFIGURATION_CACHE,
+                self.environment,
+                configuration_response['Attributes']['config_version'],
+                config
+            )
             return configuration_response
         except ClientError:
             log_err("Unable to store environment configuration in DynamoDB.")
@@ -264,7 +325,12 @@ class EnvironmentConfiguration(object):
                             "type": "object",
                             "properties": {
                                 "notifications_arn": {"type": "string"},
-                                "ssl_certificate_arn": {"type": "string"}
+                                "ssl_certificate_arn": {"type": "string"},
+                                "template_bucket": {"type": "string"},
+                                "template_format": {
+                                    "type": "string",
+                                    "enum": ["yaml", "json"]
+                                }
                             },
                             "required": [
                                 "notifications_arn",
@@ -0,0 +1,186 @@
+'''
+Cache of AWS data in the user's cache directory.
+
+Entries are JSON files, readable only by the current user, grouped by
+namespace. Caching of configuration is opt-in through the `--use_cache`
+flag or the CLOUDLIFT_CACHE environment variable. `--offline` trusts the
+cache without checking it against AWS.
+
+Secrets are encrypted with a key derived from the AWS credentials; this
+needs the optional `cryptography` package (`pip install cloudlift[cache]`).
+'''
+
+import base64
+import decimal
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import time
+
+try:
+    from cryptography.fernet import Fernet, InvalidToken
+except ImportError:
+    Fernet = None
+
+from cloudlift.config.client_pool import get_session
+from cloudlift.config.decimal_encoder import DecimalEncoder
+from cloudlift.config.logging import log_err
+
+CACHE_SETTINGS = {
+    'enabled': os.environ.get('CLOUDLIFT_CACHE', '').lower() in ('1', 'true', 'yes'),
+    'offline': False,
+}
+
+
+def configure_local_cache(enabled=None, offline=None):
+    if enabled is not None:
+        CACHE_SETTINGS['enabled'] = enabled
+    if offline is not None:
+        CACHE_SETTINGS['offline'] = offline
+        if offline:
+            CACHE_SETTINGS['enabled'] = True
+
+
+def is_local_cache_enabled():
+    return CACHE_SETTINGS['enabled']
+
+
+def is_offline():
+    return CACHE_SETTINGS['offline']
+
+
+def get_cache_directory():
+    if os.environ.get('CLOUDLIFT_CACHE_DIR'):
+        return os.environ['CLOUDLIFT_CACHE_DIR']
+    cache_home = os.environ.get('XDG_CACHE_HOME') or \
+        os.path.join(os.path.expanduser('~'), '.cache')
+    return os.path.join(cache_home, 'cloudlift')
+
+
+def read_cache(namespace, key, use_decimal=False):
+    '''
+        Cached value for the key, or None when missing or expired
+    '''
+    try:
+        with open(_entry_path(namespace, key)) as entry_file:
+            if use_decimal:
+                entry = json.load(
+                    entry_file,
+                    parse_float=decimal.Decimal,
+                    parse_int=decimal.Decimal
+                )
+            else:
+                entry = json.load(entry_file)
+    except (IOError, OSError, ValueError):
+        return None
+    if entry['expires_at'] is not None and entry['expires_at'] < time.time():
+        return None
+    return entry['value']
+
+
+def write_cache(namespace, key, value, ttl=None):
+    entry = {
+        'expires_at': time.time() + ttl if ttl is not None else None,
+        'value': value
+    }
+    path = _entry_path(namespace, key)
+    directory = os.path.dirname(path)
+    os.makedirs(directory, mode=0o700, exist_ok=True)
+    # Write to a private temporary file first so readers never see a
+    # partial entry and secrets are never world readable.
+    file_descriptor, temporary_path = tempfile.mkstemp(dir=directory)
+    try:
+        with os.fdopen(file_descriptor, 'w') as entry_file:
+            json.dump(entry, entry_file, cls=DecimalEncoder)
+        os.replace(temporary_path, path)
+    except Exception:
+        os.remove(temporary_path)
+        raise
+
+
+def is_encryption_available():
+    return Fernet is not None
+
+
+def get_cache_secret():
+    '''
+        Secret the cache of the current AWS credentials is encrypted with,
+        or None without credentials
+    '''
+    credentials = get_session().get_credentials()
+    return credentials.secret_key if credentials is not None else None
+
+
+def read_encrypted_cache(namespace, key, secret):
+    '''
+        Value written by write_encrypted_cache with the same secret, or
+        None when missing, expired or encrypted with another secret
+    '''
+    token = read_cache(namespace, key)
+    if token is None:
+        return None
+    try:
+        content = _fernet(secret).decrypt(token.encode('ascii'))
+    except InvalidToken:
+        return None
+    return json.loads(content.decode('utf-8'))
+
+
+def write_encrypted_cache(namespace, key, value, secret, ttl=None):
+    content = json.dumps(value, cls=DecimalEncoder).encode('utf-8')
+    token = _fernet(secret).encrypt(content).decode('ascii')
+    write_cache(namespace, key, token, ttl=ttl)
+
+
+def delete_cache(namespace, key):
+    try:
+        os.remove(_entry_path(namespace, key))
+    except OSError:
+        pass
+
+
+def clear_cache():
+    shutil.rmtree(get_cache_directory(), ignore_errors=True)
+
+
+def get_versioned(namespace, key, fetch_version, fetch):
+    '''
+        Value for the key from the cache if its version matches
+        fetch_version(), otherwise from fetch(). fetch returns a
+        (version, value) pair and its result is cached when it has a
+        version. Offline, the cache is used without fetching the version.
+    '''
+    if not is_local_cache_enabled():
+        return fetch()[1]
+    cached = read_cache(namespace, key, use_decimal=True)
+    if is_offline():
+        if cached is None:
+            log_err("No cached copy of %s %s. Run once without --offline." % (
+                namespace.replace('_', ' '),
+                key
+            ))
+            exit(1)
+        return cached['value']
+    if cached is not None and cached['version'] is not None and \
+            cached['version'] == fetch_version():
+        return cached['value']
+    version, value = fetch()
+    store_versioned(namespace, key, version, value)
+    return value
+
+
+def store_versioned(namespace, key, version, value):
+    if is_local_cache_enabled() and version is not None:
+        write_cache(namespace, key, {'version': version, 'value': value})
+
+
+def _fernet(secret):
+    digest = hashlib.sha256(('cloudlift-cache:' + secret).encode('utf-8'))
+    return Fernet(base64.urlsafe_b64encode(digest.digest()))
+
+
+def _entry_path(namespace, key):
+    file_name = hashlib.sha256(key.encode('utf-8')).hexdigest() + '.json'
+    return os.path.join(get_cache_directory(), namespace, file_name)
@@ -1,23 +1,37 @@
+import threading
+
 import click
 
+# Services are deployed from several threads. Every line goes through this
+# lock so that colored lines never interleave; hold it with log_block() to
+# keep a multi-line message together.
+_output_lock = threading.RLock()
+
+
+def _secho(text, **styles):
+    with _output_lock:
+        click.secho(text, **styles)
+
+def log_block():
+    return _output_lock
 
 def log_err(text):
-    click.secho(text, fg='red', bold=True)
+    _secho(text, fg='red', bold=True)
 
 def log(text):
-    click.secho(text, fg='green')
+    _secho(text, fg='green')
 
 def log_warning(text):
-    click.secho(text, fg='yellow')
+    _secho(text, fg='yellow')
 
 def log_bold(text):
-    click.secho(text, fg='green',  bold=True)
+    _secho(text, fg='green',  bold=True)
 
 def log_intent(text, level=1):
-    click.secho(''.join(['  '] * level + [text]), fg='green')
+    _secho(''.join(['  '] * level + [text]), fg='green')
 
 def log_intent_err(text, level=1):
-    click.secho(''.join(['  '] * level + [text]), fg='red')
+    _secho(''.join(['  '] * level + [text]), fg='red')
 
 def log_with_color(text, color, level=2):
-    click.secho(''.join(['  '] * level + [text]), fg=color)
+    _secho(''.join(['  '] * level + [text]), fg=color)
@@ -1,61 +1,89 @@
 import os
+from datetime import datetime
 
 import botocore
-from boto3 import client
 from boto3.session import Session
+from dateutil.parser import parse
+from dateutil.tz import tzutc
 
-from cloudlift.config import get_account_id
+from cloudlift.config import get_credentials_hash, get_mfa_arn, get_username
+from cloudlift.config.client_pool import get_client
+from cloudlift.config.local_cache import read_cache, write_cache
 from cloudlift.config.logging import log_bold, log_err
 
+MFA_CREDENTIALS_CACHE = 'mfa_credentials'
+MFA_SESSION_DURATION_SECONDS = int(os.environ.get(
+    'CLOUDLIFT_MFA_SESSION_DURATION',
+    900
+))
+# Cached credentials are dropped this long before they expire so that a
+# command never starts with credentials that run out halfway through.
+MFA_EXPIRY_MARGIN_SECONDS = 120
 
-def do_mfa_login(mfa_code=None, region='ap-south-1'):
-    username = get_username()
-    if not mfa_code:
-        mfa_code = input("MFA Code: ")
-    mfa_arn = "arn:aws:iam::%s:mfa/%s" % (get_account_id(), username)
 
-    log_bold("Using credentials for " + username)
-    try:
-        session_params = client('sts').get_session_token(
-            DurationSeconds=900,
-            SerialNumber=mfa_arn,
-            TokenCode=str(mfa_code)
-        )
-        credentials = session_params['Credentials']
-        os.environ['AWS_ACCESS_KEY_ID'] = credentials['AccessKeyId']
-        os.environ['AWS_SECRET_ACCESS_KEY'] = credentials['SecretAccessKey']
-        os.environ['AWS_SESSION_TOKEN'] = credentials['SessionToken']
-        os.environ['AWS_DEFAULT_REGION'] = region
-        return session_params
-    except botocore.exceptions.ClientError as client_error:
-        log_err(str(client_error))
-        exit(1)
+def do_mfa_login(mfa_code=None, region='ap-south-1', duration=None):
+    credentials = get_mfa_credentials(mfa_code, duration)
+    os.environ['AWS_ACCESS_KEY_ID'] = credentials['AccessKeyId']
+    os.environ['AWS_SECRET_ACCESS_KEY'] = credentials['SecretAccessKey']
+    os.environ['AWS_SESSION_TOKEN'] = credentials['SessionToken']
+    os.environ['AWS_DEFAULT_REGION'] = region
+    return {'Credentials': credentials}
+
+
+def get_mfa_session(mfa_code=None, region='ap-south-1', duration=None):
+    credentials = get_mfa_credentials(mfa_code, duration)
+    return Session(
+            aws_access_key_id=credentials['AccessKeyId'],
+            aws_secret_access_key=credentials['SecretAccessKey'],
+            aws_session_token=credentials['SessionToken'],
+            region_name=region
+    )
+
 
+def get_mfa_credentials(mfa_code=None, duration=None):
+    '''
+        MFA session credentials of the current user. They are kept in the
+        local cache and reused by later commands until shortly before
+        they expire, so the MFA code is asked for only once per session.
+    '''
+    credentials_hash = get_credentials_hash()
+    if credentials_hash:
+        credentials = read_cache(MFA_CREDENTIALS_CACHE, credentials_hash)
+        if credentials is not None:
+            log_bold("Using cached MFA session valid until " +
+                     credentials['Expiration'])
+            return credentials
 
-def get_mfa_session(mfa_code=None, region='ap-south-1'):
     username = get_username()
     if not mfa_code:
         mfa_code = input("MFA Code: ")
-    mfa_arn = "arn:aws:iam::%s:mfa/%s" % (get_account_id(), username)
-
     log_bold("Using credentials for " + username)
     try:
-        session_params = client('sts').get_session_token(
-            DurationSeconds=900,
-            SerialNumber=mfa_arn,
+        session_params = get_client('sts').get_session_token(
+            DurationSeconds=duration or MFA_SESSION_DURATION_SECONDS,
+            SerialNumber=get_mfa_arn(),
             TokenCode=str(mfa_code)
         )
-        credentials = session_params['Credentials']
-        return Session(
-                aws_access_key_id=credentials['AccessKeyId'],
-                aws_secret_access_key=credentials['SecretAccessKey'],
-                aws_session_token=credentials['SessionToken'],
-                region_name=region
-        )
     except botocore.exceptions.ClientError as client_error:
         log_err(str(client_error))
         exit(1)
 
+    credentials = {
+        'AccessKeyId': session_params['Credentials']['AccessKeyId'],
+        'SecretAccessKey': session_params['Credentials']['SecretAccessKey'],
+        'SessionToken': session_params['Credentials']['SessionToken'],
+        'Expiration': session_params['Credentials']['Expiration'].isoformat()
+    }
+    if credentials_hash:
+        write_cache(
+            MFA_CREDENTIALS_CACHE,
+            credentials_hash,
+            credentials,
+            ttl=_seconds_until(credentials['Expiration']) -
+            MFA_EXPIRY_MARGIN_SECONDS
+        )
+    return credentials
+
 
-def get_username():
-    return client('sts').get_caller_identity()['Arn'].split("user/")[1]
+def _seconds_until(timestamp):
+    return (parse(timestamp) - datetime.now(tz=tzutc())).total_seconds()
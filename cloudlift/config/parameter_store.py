@@ -1,7 +1,39 @@
+import os
+import random
 import re
+from concurrent.futures import ThreadPoolExecutor
+from time import sleep
 
-from cloudlift.config import get_client_for
-from cloudlift.config.logging import log_err
+from botocore.exceptions import ClientError
+
+from cloudlift.config import get_account_id, get_client_for
+from cloudlift.config.local_cache import (get_cache_secret,
+                                          is_encryption_available,
+                                          is_local_cache_enabled, is_offline,
+                                          read_encrypted_cache,
+                                          write_encrypted_cache)
+from cloudlift.config.logging import log, log_bold, log_err, log_warning
+from cloudlift.config.rate_limiter import TokenBucket
+
+GET_PARAMETERS_BATCH_SIZE = 10
+DELETE_PARAMETERS_BATCH_SIZE = 10
+DESCRIBE_PARAMETERS_PAGE_SIZE = 50
+PARAMETER_STORE_THREADS = int(os.environ.get('CLOUDLIFT_SSM_THREADS', 4))
+# Parameter Store allows 40 reads per second per account and region by
+# default, shared with every other client; deploys use a part of it.
+SSM_READ_LIMITER = TokenBucket(
+    float(os.environ.get('CLOUDLIFT_SSM_READ_TPS', 10))
+)
+# PutParameter is limited to 3 requests per second by default.
+SSM_WRITE_LIMITER = TokenBucket(
+    float(os.environ.get('CLOUDLIFT_SSM_WRITE_TPS', 3))
+)
+SSM_WRITE_ATTEMPTS = 5
+SSM_WRITE_BACKOFF_SECONDS = 0.5
+THROTTLING_ERRORS = ('ThrottlingException', 'TooManyUpdates')
+PARAMETER_CACHE = 'parameters'
+
+_warnings = {'encryption': False}
 
 
 class ParameterStore(object):
@@ -13,9 +45,10 @@ class ParameterStore(object):
         # require MFA
         #
         # mfa_region = get_region_for_environment(environment)
-        # mfa_session = mfa.get_mfa_session(mfa_region)
+        # mfa_session = mfa.get_mfa_session(region=mfa_region)
         # ssm_client = mfa_session.client('ssm')
         self.client = get_client_for('ssm', environment)
+        self._parameter_versions = None
 
     def get_existing_config_as_string(self):
         environment_configs = self.get_existing_config()
@@ -23,7 +56,144 @@ class ParameterStore(object):
             environment_configs.items()
         ))
 
+    def get_config(self, keys):
+        '''
+            Values of the given keys, fetched with GetParameters in batches
+            of 10 names on a few threads. Keys without a parameter are left
+            out of the result.
+        '''
+        if self._use_cache():
+            return self._get_cached_config(keys)
+        return {
+            key: parameter['Value']
+            for key, parameter in self._fetch_parameters(keys).items()
+        }
+
+    def get_parameter_arn(self, key):
+        return 'arn:aws:ssm:%s:%s:parameter%s%s' % (
+            self.client.meta.region_name,
+            get_account_id(),
+            self.path_prefix,
+            key
+        )
+
+    def get_existing_keys(self):
+        '''
+            Names of all parameters of the service, listed without
+            decrypting their values
+        '''
+        if is_offline() and self._use_cache():
+            return set(self._get_cached_config())
+        return set(self._get_parameter_versions())
+
+    def _get_parameter_versions(self):
+        if self._parameter_versions is None:
+            versions = {}
+            request = {
+                'ParameterFilters': [{
+                    'Key': 'Path',
+                    'Option': 'OneLevel',
+                    'Values': [self.path_prefix.rstrip('/')]
+                }],
+                'MaxResults': DESCRIBE_PARAMETERS_PAGE_SIZE
+            }
+            while True:
+                SSM_READ_LIMITER.acquire()
+                response = self.client.describe_parameters(**request)
+                for parameter in response['Parameters']:
+                    key = parameter['Name'].split(self.path_prefix)[1]
+                    versions[key] = parameter['Version']
+                if not response.get('NextToken'):
+                    break
+                request['NextToken'] = response['NextToken']
+            self._parameter_versions = versions
+        return self._parameter_versions
+
+    def _fetch_parameters(self, keys):
+        keys = sorted(set(keys))
+        batches = [
+            keys[index:index + GET_PARAMETERS_BATCH_SIZE]
+            for index in range(0, len(keys), GET_PARAMETERS_BATCH_SIZE)
+        ]
+        parameters = {}
+        with ThreadPoolExecutor(max_workers=PARAMETER_STORE_THREADS) as executor:
+            for batch in executor.map(self._get_parameters, batches):
+                for parameter in batch:
+                    key = parameter['Name'].split(self.path_prefix)[1]
+                    parameters[key] = parameter
+        return parameters
+
+    def _get_parameters(self, keys):
+        SSM_READ_LIMITER.acquire()
+        return self.client.get_parameters(
+            Names=[self.path_prefix + key for key in keys],
+            WithDecryption=True
+        )['Parameters']
+
+    def _use_cache(self):
+        if not is_local_cache_enabled():
+            return False
+        if not is_encryption_available():
+            if not _warnings['encryption']:
+                log_warning("Parameter Store values are not cached. \
+Install cloudlift[cache] to cache them encrypted.")
+                _warnings['encryption'] = True
+            return False
+        return get_cache_secret() is not None
+
+    def _get_cached_config(self, keys=None):
+        '''
+            Values of the given keys, or of all keys, from the encrypted
+            local cache. Versions are checked with DescribeParameters and
+            only parameters whose version changed are fetched again.
+        '''
+        secret = get_cache_secret()
+        cached = read_encrypted_cache(
+            PARAMETER_CACHE,
+            self.path_prefix,
+            secret
+        )
+        if is_offline():
+            if cached is None:
+                log_err("No cached copy of parameters %s. Run once without \
+--offline." % self.path_prefix)
+                exit(1)
+            return {
+                key: entry['value'] for key, entry in cached.items()
+                if keys is None or key in keys
+            }
+
+        cached = cached or {}
+        versions = self._get_parameter_versions()
+        wanted = set(versions) if keys is None else set(keys) & set(versions)
+        stale = [
+            key for key in wanted
+            if key not in cached or cached[key]['version'] != versions[key]
+        ]
+        for key, parameter in self._fetch_parameters(stale).items():
+            cached[key] = {
+                'version': parameter['Version'],
+                'value': parameter['Value']
+            }
+        cached = {
+            key: entry for key, entry in cached.items() if key in versions
+        }
+        if stale or len(cached) != len(versions):
+            write_encrypted_cache(
+                PARAMETER_CACHE,
+                self.path_prefix,
+                cached,
+                secret
+            )
+        return {key: cached[key]['value'] for key in wanted if key in cached}
+
     def get_existing_config(self):
+        '''
+            All parameters of the service, walking the whole path. Used
+            when editing, where the keys are not known up front.
+        '''
+        if self._use_cache():
+            return self._get_cached_config()
         environment_configs = {}
         next_token = None
         while True:
@@ -53,29 +223,104 @@ class ParameterStore(object):
         return environment_configs
 
     def set_config(self, differences):
+        '''
+            Apply the changes from dictdiffer to Parameter Store. Values are
+            written on a few threads within the write rate limit, retrying
+            throttled writes, and a summary of what could not be saved is
+            printed at the end.
+        '''
         self._validate_changes(differences)
+        puts = []
+        deletes = []
         for parameter_change in differences:
             if parameter_change[0] == 'change':
-                response = self.client.put_parameter(
-                    Name='%s%s' % (self.path_prefix, parameter_change[1]),
-                    Value=parameter_change[2][1],
-                    Type='SecureString',
-                    KeyId='alias/aws/ssm',
-                    Overwrite=True
+                puts.append(
+                    (parameter_change[1], parameter_change[2][1], True)
                 )
             elif parameter_change[0] == 'add':
                 for added_parameter in parameter_change[2]:
-                    response = self.client.put_parameter(
-                        Name='%s%s' % (self.path_prefix, added_parameter[0]),
-                        Value=added_parameter[1],
-                        Type='SecureString',
-                        KeyId='alias/aws/ssm',
-                        Overwrite=False
+                    puts.append(
+                        (added_parameter[0], added_parameter[1], False)
                     )
             elif parameter_change[0] == 'remove':
-                deleted_parameters = ["%s%s" % (self.path_prefix, item[0]) for item in parameter_change[2]]
-                response = self.client.delete_parameters(
-                    Names=deleted_parameters
+                deletes.extend(item[0] for item in parameter_change[2])
+
+        failures = {}
+        with ThreadPoolExecutor(max_workers=PARAMETER_STORE_THREADS) as executor:
+            put_futures = [
+                (key, executor.submit(self._put_parameter, key, value, overwrite))
+                for key, value, overwrite in puts
+            ]
+            delete_futures = [
+                (batch, executor.submit(self._delete_parameters, batch))
+                for batch in [
+                    deletes[index:index + DELETE_PARAMETERS_BATCH_SIZE]
+                    for index in range(0, len(deletes), DELETE_PARAMETERS_BATCH_SIZE)
+                ]
+            ]
+            for key, future in put_futures:
+                try:
+                    future.result()
+                except ClientError as error:
+                    failures[key] = str(error)
+            for batch, future in delete_futures:
+                try:
+                    for key in future.result():
+                        failures[key] = "Parameter not found"
+                except ClientError as error:
+                    for key in batch:
+                        failures[key] = str(error)
+
+        self._parameter_versions = None
+        saved = len(puts) + len(deletes) - len(failures)
+        log_bold("Saved %d of %d parameter changes" % (
+            saved,
+            len(puts) + len(deletes)
+        ))
+        if failures:
+            for key in sorted(failures):
+                log_err("Could not update %s: %s" % (key, failures[key]))
+            exit(1)
+
+    def _put_parameter(self, key, value, overwrite):
+        self._write(
+            'put_parameter',
+            Name='%s%s' % (self.path_prefix, key),
+            Value=value,
+            Type='SecureString',
+            KeyId='alias/aws/ssm',
+            Overwrite=overwrite
+        )
+        log("%s %s" % ("Updated" if overwrite else "Added", key))
+
+    def _delete_parameters(self, keys):
+        '''
+            Delete up to 10 parameters and return the keys that were not
+            found
+        '''
+        response = self._write(
+            'delete_parameters',
+            Names=['%s%s' % (self.path_prefix, key) for key in keys]
+        )
+        for parameter_name in response['DeletedParameters']:
+            log("Removed " + parameter_name.split(self.path_prefix)[1])
+        return [
+            parameter_name.split(self.path_prefix)[1]
+            for parameter_name in response.get('InvalidParameters', [])
+        ]
+
+    def _write(self, operation, **parameters):
+        for attempt in range(SSM_WRITE_ATTEMPTS):
+            SSM_WRITE_LIMITER.acquire()
+            try:
+                return getattr(self.client, operation)(**parameters)
+            except ClientError as error:
+                if error.response['Error']['Code'] not in THROTTLING_ERRORS \
+                        or attempt == SSM_WRITE_ATTEMPTS - 1:
+                    raise
+                sleep(
+                    SSM_WRITE_BACKOFF_SECONDS * 2 ** attempt *
+                    random.uniform(0.5, 1)
                 )
 
     def _validate_changes(self, differences):
@@ -0,0 +1,36 @@
+'''
+Client side throughput budget for AWS APIs with low request rate limits,
+shared by all threads of the process.
+'''
+
+import threading
+import time
+
+
+class TokenBucket(object):
+    '''
+        Allows `rate` calls per second on average and bursts of up to
+        `capacity` calls. acquire() blocks until a call is allowed.
+    '''
+
+    def __init__(self, rate, capacity=None):
+        self.rate = float(rate)
+        self.capacity = capacity or max(1, int(rate))
+        self._tokens = float(self.capacity)
+        self._updated_at = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self, tokens=1):
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(
+                    self.capacity,
+                    self._tokens + (now - self._updated_at) * self.rate
+                )
+                self._updated_at = now
+                if self._tokens >= tokens:
+                    self._tokens -= tokens
+                    return
+                delay = (tokens - self._tokens) / self.rate
+            time.sleep(delay)
@@ -1,34 +1,29 @@
-import boto3
-
-from cloudlift.config import EnvironmentConfiguration
+from cloudlift.config import get_environment_snapshot
+from cloudlift.config.client_pool import (get_client, get_resource,
+                                          get_session)
 from cloudlift.config.logging import log_err
 
 def get_region_for_environment(environment):
     if environment:
-        return EnvironmentConfiguration(environment).get_config()[environment]['region']
+        return get_environment_snapshot(environment)['region']
     else:
         # Get the region from the AWS credentials used to execute cloudlift
-        aws_session = boto3.session.Session()
-        return aws_session.region_name
+        return get_session().region_name
 
 
 def get_client_for(resource, environment):
-    return boto3.session.Session(
-        region_name=get_region_for_environment(environment)
-    ).client(resource)
+    return get_client(resource, get_region_for_environment(environment))
 
 
 def get_resource_for(resource, environment):
-    return boto3.session.Session(
-        region_name=get_region_for_environment(environment)
-    ).resource(resource)
+    return get_resource(resource, get_region_for_environment(environment))
 
 
 def get_notifications_arn_for_environment(environment):
     try:
-        return EnvironmentConfiguration(
+        return get_environment_snapshot(
             environment
-        ).get_config()[environment]['environment']["notifications_arn"]
+        )['environment']["notifications_arn"]
     except KeyError:
         log_err("Unable to find notifications arn for {environment}".format(**locals()))
         exit(1)
@@ -36,9 +31,9 @@ def get_notifications_arn_for_environment(environment):
 
 def get_ssl_certification_for_environment(environment):
     try:
-        return EnvironmentConfiguration(
+        return get_environment_snapshot(
             environment
-        ).get_config()[environment]['environment']["ssl_certificate_arn"]
+        )['environment']["ssl_certificate_arn"]
     except KeyError:
         log_err("Unable to find ssl certificate for {environment}".format(**locals()))
         exit(1)
@@ -16,10 +16,12 @@ from cloudlift.config import DecimalEncoder
 from cloudlift.config import print_json_changes
 # import config.mfa as mfa
 from cloudlift.config import get_resource_for
+from cloudlift.config.local_cache import get_versioned, store_versioned
 from cloudlift.config.logging import log_bold, log_err, log_warning
 from cloudlift.version import VERSION
 
 SERVICE_CONFIGURATION_TABLE = 'service_configurations'
+SERVICE_CONFIGURATION_CACHE = 'service_configurations'
 
 class ServiceConfiguration(object):
     '''
@@ -34,7 +36,7 @@ class ServiceConfiguration(object):
         # require MFA
         #
         # mfa_region = get_region_for_environment(environment)
-        # mfa_session = mfa.get_mfa_session(mfa_region)
+        # mfa_session = mfa.get_mfa_session(region=mfa_region)
         # ssm_client = mfa_session.client('ssm')
         self.table = get_resource_for(
             'dynamodb',
@@ -84,9 +86,20 @@ class ServiceConfiguration(object):
 
     def get_config(self):
         '''
-            Get configuration from DynamoDB
+            Get configuration from DynamoDB, or the local cache when its
+            version is still current
         '''
 
+        existing_configuration = get_versioned(
+            SERVICE_CONFIGURATION_CACHE,
+            self._cache_key,
+            self._fetch_config_version,
+            self._fetch_config
+        )
+        existing_configuration.pop("cloudlift_version", None)
+        return existing_configuration
+
+    def _fetch_config(self):
         try:
             configuration_response = self.table.get_item(
                 Key={
@@ -95,21 +108,40 @@ class ServiceConfiguration(object):
                 },
                 ConsistentRead=True,
                 AttributesToGet=[
-                    'configuration'
+                    'configuration',
+                    'config_version'
                 ]
             )
             if 'Item' in configuration_response:
-                existing_configuration = configuration_response['Item']['configuration']
-            else:
-                existing_configuration = self._default_service_configuration()
-                self.new_service = True
+                return (
+                    configuration_response['Item'].get('config_version'),
+                    configuration_response['Item']['configuration']
+                )
+            self.new_service = True
+            return None, self._default_service_configuration()
+        except ClientError:
+            log_err("Unable to fetch service configuration from DynamoDB.")
+            exit(1)
 
-            existing_configuration.pop("cloudlift_version", None)
-            return existing_configuration
+    def _fetch_config_version(self):
+        try:
+            configuration_response = self.table.get_item(
+                Key={
+                    'service_name': self.service_name,
+                    'environment': self.environment
+                },
+                ConsistentRead=True,
+                ProjectionExpression='config_version'
+            )
+            return configuration_response.get('Item', {}).get('config_version')
         except ClientError:
             log_err("Unable to fetch service configuration from DynamoDB.")
             exit(1)
 
+    @property
+    def _cache_key(self):
+        return '/'.join([self.environment, self.service_name])
+
     def set_config(self, config):
         '''
             Set configuration in DynamoDB
@@ -123,12 +155,20 @@ class ServiceConfiguration(object):
                     'service_name': self.service_name,
                     'environment': self.environment
                 },
-                UpdateExpression='SET configuration = :configuration',
+                UpdateExpression='SET configuration = :configuration \
+ADD config_version :one',
                 ExpressionAttributeValues={
-                    ':configuration': config
+                    ':configuration': config,
+                    ':one': 1
                 },
                 ReturnValues="UPDATED_NEW"
             )
+            store_versioned(
+                SERVICE_CONFIGURATION_CACHE,
+                self._cache_key,
+                configuration_response['Attributes']['config_version'],
+                config
+            )
             return configuration_response
         except ClientError:
             log_err("Unable to store service configuration in DynamoDB.")
@@ -202,6 +242,13 @@ class ServiceConfiguration(object):
                 },
                 "cloudlift_version": {
                     "type": "string"
+                },
+                "secrets_by_reference": {
+                    "type": "boolean"
+                },
+                "services_per_stack": {
+                    "type": "integer",
+                    "minimum": 1
                 }
             },
             "required": ["cloudlift_version", "services"]
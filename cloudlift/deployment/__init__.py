@@ -1,12 +1,21 @@
 from .changesets import *
 from .cluster_template_generator import *
 from .configs import *
+from .deploy_executor import *
 from .deployer import *
+from .deployment_monitor import *
 from .ecs import *
 from .environment_creator import *
+from .event_tracker import *
+from .generation_context import *
+from .poller import *
 from .progress import *
 from .service_creator import *
 from .service_information_fetcher import *
 from .service_template_generator import *
 from .service_updater import *
+from .stack_timeline import *
+from .task_definition_cache import *
+from .template_snapshot import *
+from .template_upload import *
 from .template_generator import *
\ No newline at end of file
@@ -1,46 +1,74 @@
+import hashlib
+import json
 import sys
 import uuid
-from time import sleep
 
 import click
+from cfn_flip import to_json
 
 from cloudlift.config.logging import log, log_bold, log_err
+from cloudlift.deployment.poller import Poller
+from cloudlift.deployment.template_upload import template_source
+
+
+def is_stack_up_to_date(client, service_template_body, stack_name,
+                        key_name, environment):
+    '''
+        Whether the stack already runs this template with these parameters,
+        in which case a changeset would only report that there is nothing
+        to update
+    '''
+    deployed_template = client.get_template(
+        StackName=stack_name,
+        TemplateStage='Original'
+    )['TemplateBody']
+    deployed_hash = _template_hash(deployed_template)
+    if deployed_hash is None or \
+            deployed_hash != _template_hash(service_template_body):
+        return False
+    stack = client.describe_stacks(StackName=stack_name)['Stacks'][0]
+    deployed_parameters = {
+        parameter['ParameterKey']: parameter.get('ParameterValue')
+        for parameter in stack.get('Parameters', [])
+    }
+    return all(
+        deployed_parameters.get(parameter['ParameterKey']) ==
+        parameter['ParameterValue']
+        for parameter in _change_set_parameters(key_name, environment)
+    )
 
 
 def create_change_set(client, service_template_body, stack_name,
                       key_name, environment):
-    change_set_parameters = [
-        {'ParameterKey': 'Environment', 'ParameterValue': environment}
-    ]
-    if key_name:
-        change_set_parameters.append({
-            'ParameterKey': 'KeyPair',
-            'ParameterValue': key_name
-        })
+    change_set_parameters = _change_set_parameters(key_name, environment)
     create_change_set_res = client.create_change_set(
         StackName=stack_name,
         ChangeSetName="cg"+uuid.uuid4().hex,
-        TemplateBody=service_template_body,
         Parameters=change_set_parameters,
         Capabilities=['CAPABILITY_NAMED_IAM'],
-        ChangeSetType='UPDATE'
+        ChangeSetType='UPDATE',
+        **template_source(service_template_body, stack_name, environment)
     )
     log("Changeset creation initiated. Checking the progress...")
     change_set = client.describe_change_set(
         ChangeSetName=create_change_set_res['Id']
     )
+    poller = Poller("Changeset creation", max_interval=5)
     while change_set['Status'] in ['CREATE_PENDING', 'CREATE_IN_PROGRESS']:
-        sleep(1)
+        poller.wait()
         status_string = '\x1b[2K\rChecking changeset status.  Status: ' + \
                         change_set['Status']
         sys.stdout.write(status_string)
         sys.stdout.flush()
+        previous_status = change_set['Status']
         change_set = client.describe_change_set(
             ChangeSetName=create_change_set_res['Id']
         )
+        poller.record(change_set['Status'] != previous_status)
     status_string = '\x1b[2K\rChecking changeset status..  Status: ' + \
                     change_set['Status']+'\n'
     sys.stdout.write(status_string)
+    poller.report()
     if change_set['Status'] == 'FAILED':
         log_err("Changeset creation failed!")
         log_bold(change_set.get(
@@ -62,6 +90,34 @@ def create_change_set(client, service_template_body, stack_name,
         exit(0)
 
 
+def _change_set_parameters(key_name, environment):
+    change_set_parameters = [
+        {'ParameterKey': 'Environment', 'ParameterValue': environment}
+    ]
+    if key_name:
+        change_set_parameters.append({
+            'ParameterKey': 'KeyPair',
+            'ParameterValue': key_name
+        })
+    return change_set_parameters
+
+
+def _template_hash(template):
+    '''
+        Hash of a template that ignores key order, formatting and whether it
+        is JSON or YAML. boto3 hands back JSON templates already parsed.
+    '''
+    if isinstance(template, str):
+        try:
+            template = json.loads(to_json(template))
+        except Exception:
+            return None
+    return hashlib.sha256(
+        json.dumps(template, sort_keys=True, separators=(',', ':'),
+                   default=str).encode('utf-8')
+    ).hexdigest()
+
+
 def _print_changes(change_set):
     for change in change_set['Changes']:
         resource_change = change['ResourceChange']
@@ -1,7 +1,6 @@
 import json
 import re
 
-from cfn_flip import to_yaml
 from stringcase import camelcase, pascalcase
 from troposphere import (Base64, FindInMap, Output, Parameter, Ref, Sub,
                          cloudformation)
@@ -19,8 +18,7 @@ from troposphere.policies import (AutoScalingRollingUpdate, CreationPolicy,
                                   ResourceSignal)
 from troposphere.rds import DBSubnetGroup
 
-from cloudlift.config import DecimalEncoder
-from cloudlift.config import get_client_for, get_region_for_environment
+from cloudlift.deployment.generation_context import GenerationContext
 from cloudlift.deployment.template_generator import TemplateGenerator
 from cloudlift.version import VERSION
 
@@ -30,8 +28,10 @@ class ClusterTemplateGenerator(TemplateGenerator):
         This class generates CloudFormation template for a environment cluster
     """
 
-    def __init__(self, environment, environment_configuration, desired_instances=None):
+    def __init__(self, environment, environment_configuration, desired_instances=None,
+                 context=None):
         super(ClusterTemplateGenerator, self).__init__(environment)
+        self.context = context or GenerationContext.for_cluster(environment)
         self.configuration = environment_configuration
         if desired_instances is None:
             self.desired_instances = self.configuration['cluster']['min_instances']
@@ -39,7 +39,7 @@ class ClusterTemplateGenerator(TemplateGenerator):
             self.desired_instances = desired_instances
         self.private_subnets = []
         self.public_subnets = []
-        self._get_availability_zones()
+        self.availability_zones = self.context.availability_zones
 
     def generate_cluster(self):
         self.__validate_parameters()
@@ -54,14 +54,7 @@ class ClusterTemplateGenerator(TemplateGenerator):
         self._add_mappings()
         self._add_metadata()
         self._add_cluster()
-        return to_yaml(json.dumps(self.template.to_dict(), cls=DecimalEncoder))
-
-    def _get_availability_zones(self):
-        client = get_client_for('ec2', self.env)
-        aws_azs = client.describe_availability_zones()['AvailabilityZones']
-        self.availability_zones = [
-            zone['ZoneName'] for zone in aws_azs
-        ][:2]
+        return self._serialize()
 
     def __validate_parameters(self):
         # TODO validate CIDR
@@ -564,14 +557,8 @@ for cluster for 15 minutes.',
             "InstanceType", Description='', Type="String", Default=self.configuration['cluster']['instance_type']))
 
     def _add_mappings(self):
-        # Pick from https://docs.aws.amazon.com/AmazonECS/latest/developerguide/al2ami.html
-        ssm_client = get_client_for('ssm', self.env)
-        ami_response = ssm_client.get_parameter(
-            Name='/aws/service/ecs/optimized-ami/amazon-linux-2/recommended')
-        ami_id = json.loads(ami_response['Parameter']['Value'])['image_id']
-        region = get_region_for_environment(self.env)
         self.template.add_mapping('AWSRegionToAMI', {
-            region: {"AMI": ami_id}
+            self.region: {"AMI": self.context.ami_id}
         })
 
     def _add_cluster_outputs(self):
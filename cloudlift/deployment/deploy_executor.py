@@ -0,0 +1,111 @@
+'''
+Deploy several ECS services of one application from a single process.
+
+The update of each service (building its task definition, registering it
+and updating the service) runs on a thread pool sharing the pooled AWS
+clients and the configuration already loaded. Rollouts are followed from
+the calling thread by one DeploymentMonitor. At most `parallelism`
+services are updated or rolling out at a time.
+'''
+
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from cloudlift.config.logging import log_bold, log_err, log_warning
+from cloudlift.deployment.deployer import UNCHANGED
+from cloudlift.deployment.poller import Poller
+
+
+class DeployExecutor(object):
+    def __init__(self, monitor, parallelism=None, fail_fast=False,
+                 poller=None):
+        self.monitor = monitor
+        self.parallelism = parallelism
+        self.fail_fast = fail_fast
+        self.poller = poller or Poller("Deployment")
+        self._cancelled = False
+
+    def run(self, deployments):
+        '''
+            deployments maps each service name to a callable that starts its
+            deployment without waiting for it, returning False when that
+            failed and UNCHANGED when there was nothing to deploy. Returns
+            whether each service was deployed: True or False, or None when
+            fail_fast cancelled it.
+        '''
+        parallelism = self.parallelism or len(deployments) or 1
+        pending = list(deployments)
+        updating = {}
+        results = {}
+        with ThreadPoolExecutor(max_workers=parallelism) as executor:
+            while pending or updating or self.monitor.active_services:
+                while pending and not self._cancelled and \
+                        len(updating) + len(self.monitor.active_services) \
+                        < parallelism:
+                    service_name = pending.pop(0)
+                    log_bold("Starting to deploy " + service_name)
+                    future = executor.submit(deployments[service_name])
+                    updating[future] = service_name
+                if self._cancelled:
+                    self._cancel(pending, updating, results)
+                    break
+
+                if self.monitor.active_services or not updating:
+                    self.poller.wait()
+                else:
+                    # Nothing is rolling out yet; go on as soon as an update
+                    # is done.
+                    wait(
+                        list(updating),
+                        timeout=self.poller.interval,
+                        return_when=FIRST_COMPLETED
+                    )
+                for future in [future for future in updating if future.done()]:
+                    service_name = updating.pop(future)
+                    outcome = self._update_outcome(service_name, future)
+                    if outcome == UNCHANGED:
+                        results[service_name] = True
+                    elif outcome:
+                        self.monitor.start(service_name)
+                    else:
+                        results[service_name] = False
+                        self._on_failure()
+                changed = self.monitor.poll()
+                for service_name, succeeded in self.monitor.results.items():
+                    if service_name not in results:
+                        results[service_name] = succeeded
+                        if not succeeded:
+                            self._on_failure()
+                self.poller.record(changed)
+        self.poller.report()
+        return results
+
+    def _update_outcome(self, service_name, future):
+        try:
+            result = future.result()
+        except SystemExit as exit_error:
+            return not exit_error.code
+        except Exception as error:
+            log_err("%s Deployment failed: %s" % (service_name, error))
+            return False
+        return UNCHANGED if result == UNCHANGED else result is not False
+
+    def _on_failure(self):
+        if self.fail_fast:
+            self._cancelled = True
+
+    def _cancel(self, pending, updating, results):
+        for service_name in pending:
+            log_warning("Cancelled deployment of " + service_name)
+            results[service_name] = None
+        for future, service_name in updating.items():
+            # Updates already sent to ECS can not be taken back; they go on
+            # without being followed.
+            if not future.cancel():
+                log_warning("Not waiting for deployment of " + service_name)
+            else:
+                log_warning("Cancelled deployment of " + service_name)
+            results[service_name] = None
+        for service_name in self.monitor.active_services:
+            log_warning("Not waiting for deployment of " + service_name)
+            self.monitor.forget(service_name)
+            results[service_name] = None
@@ -1,20 +1,46 @@
 import sys
-from time import sleep
 
 from colorclass import Color
 from terminaltables import SingleTable
 
 from cloudlift.config import ParameterStore
 from cloudlift.deployment.ecs import DeployAction
-from cloudlift.config.logging import log_bold, log_err, log_intent, log_with_color
+from cloudlift.deployment.event_tracker import EventTracker
+from cloudlift.deployment.poller import Poller
+from cloudlift.config.logging import (log_block, log_bold, log_err, log_intent,
+                                      log_with_color)
+
+# Returned by deploy_new_version when the service already runs the task
+# definition and desired count it would deploy
+UNCHANGED = 'unchanged'
 
 
 def deploy_new_version(client, cluster_name, ecs_service_name,
                        deploy_version_tag, service_name, sample_env_file_path,
-                       env_name, color='white', complete_image_uri=None):
-    env_config = build_config(env_name, service_name, sample_env_file_path)
+                       env_name, color='white', complete_image_uri=None,
+                       wait=True, env_config=None, secrets_by_reference=False,
+                       force=False):
+    '''
+        Deploy the given image to the ECS service. env_config is the result
+        of build_config; pass it when deploying several services of the
+        same application so Parameter Store is read only once. With
+        secrets_by_reference, containers get references to the parameters
+        instead of their values.
+
+        Returns UNCHANGED without registering a new revision when neither
+        the task definition nor the desired count would change, unless
+        force is set.
+    '''
+    if env_config is None:
+        env_config = build_config(
+            env_name,
+            service_name,
+            sample_env_file_path,
+            with_values=not secrets_by_reference
+        )
     deployment = DeployAction(client, cluster_name, ecs_service_name)
-    if deployment.service.desired_count == 0:
+    scaled_up = deployment.service.desired_count == 0
+    if scaled_up:
         desired_count = 1
     else:
         desired_count = deployment.service.desired_count
@@ -30,10 +56,32 @@ def deploy_new_version(client, cluster_name, ecs_service_name,
         )
     else:
         task_definition.set_images(deploy_version_tag)
-    for container in task_definition.containers:
-        task_definition.apply_container_environment(container, env_config)
+    if secrets_by_reference:
+        if not task_definition.execution_role_arn:
+            log_err(ecs_service_name + " has no execution role to read \
+secrets with. Run update_service first.")
+            sys.exit(1)
+        parameter_store = ParameterStore(service_name, env_name)
+        secrets = [
+            (name, parameter_store.get_parameter_arn(name))
+            for name, _ in env_config
+        ]
+        for container in task_definition.containers:
+            task_definition.apply_container_secrets(container, secrets)
+    else:
+        for container in task_definition.containers:
+            task_definition.apply_container_environment(container, env_config)
     print_task_diff(ecs_service_name, task_definition.diff, color)
+    if not force and not scaled_up and not task_definition.changed:
+        log_with_color(
+            ecs_service_name + " Already at desired state, skipping",
+            color
+        )
+        return UNCHANGED
     new_task_definition = deployment.update_task_definition(task_definition)
+    if not wait:
+        deployment.deploy(new_task_definition)
+        return True
     response = deploy_and_wait(deployment, new_task_definition, color)
     if response:
         log_bold(ecs_service_name + " Deployed successfully.")
@@ -43,17 +91,26 @@ def deploy_new_version(client, cluster_name, ecs_service_name,
 
 
 def deploy_and_wait(deployment, new_task_definition, color):
-    existing_events = fetch_events(deployment.get_service())
+    event_tracker = service_event_tracker(deployment.get_service())
     deployment.deploy(new_task_definition)
-    return wait_for_finish(deployment, existing_events, color)
+    return wait_for_finish(deployment, event_tracker, color)
 
 
-def build_config(env_name, service_name, sample_env_file_path):
+def build_config(env_name, service_name, sample_env_file_path,
+                 with_values=True):
+    '''
+        (name, value) pairs of the keys in env.sample, checked against
+        Parameter Store. Without values only the names are checked and
+        every value is None.
+    '''
     service_config = read_config(open(sample_env_file_path).read())
+    parameter_store = ParameterStore(service_name, env_name)
     try:
-        environment_config = ParameterStore(
-            service_name,
-            env_name).get_existing_config()
+        existing_keys = parameter_store.get_existing_keys()
+        if with_values:
+            environment_config = parameter_store.get_config(service_config)
+        else:
+            environment_config = dict.fromkeys(existing_keys)
     except Exception as err:
         log_intent(str(err))
         log_err("Cannot find the configuration in parameter store \
@@ -64,7 +121,7 @@ def build_config(env_name, service_name, sample_env_file_path):
         log_err('There is no config value for the keys ' +
                 str(missing_env_config))
         sys.exit(1)
-    missing_env_sample_config = set(environment_config) - set(service_config)
+    missing_env_sample_config = existing_keys - set(service_config)
     if missing_env_sample_config:
         log_err('There is no config value for the keys in env.sample file ' +
                 str(missing_env_sample_config))
@@ -93,46 +150,66 @@ def make_container_defn_env_conf(service_config, environment_config):
     return container_defn_env_config
 
 
-def wait_for_finish(action, existing_events, color):
+def wait_for_finish(action, event_tracker, color):
+    poller = Poller(action.service_name + " deployment")
     waiting = True
     while waiting:
-        sleep(1)
+        poller.wait()
         service = action.get_service()
-        existing_events = fetch_and_print_new_events(
+        new_events = fetch_and_print_new_events(
             service,
-            existing_events,
+            event_tracker,
             color
         )
-        waiting = not action.is_deployed(service) and not service.errors
+        poller.record(bool(new_events))
+        waiting = not action.is_deployed(service) and not service.errors \
+            and not service.rollout_failed
+    poller.report()
     if service.errors:
         log_err(str(service.errors))
         return False
+    if service.rollout_failed:
+        log_err(service.primary_deployment.get(u'rolloutStateReason', ''))
+        return False
     return True
 
 
-def fetch_events(service):
-    all_events = sorted(service.get(u'events'), key=lambda k: k['createdAt'])
-    return all_events
+def service_event_tracker(service):
+    '''
+        Tracker of the ECS service's events, counting the current ones as
+        already seen
+    '''
+    event_tracker = EventTracker(u'id', u'createdAt')
+    event_tracker.mark_seen(service.get(u'events'))
+    return event_tracker
 
 
-def fetch_and_print_new_events(service, existing_events, color):
-    all_events = fetch_events(service)
-    new_events = [evnt for evnt in all_events if evnt not in existing_events]
+def fetch_and_print_new_events(service, event_tracker, color):
+    new_events = event_tracker.new_events(service.get(u'events'))
     for event in new_events:
         log_with_color(
             event['message'].replace("(", "").replace(")", "")[8:],
             color
         )
-    return all_events
+    return new_events
 
 
 def print_task_diff(ecs_service_name, diffs, color):
+    with log_block():
+        _print_task_diff(ecs_service_name, diffs, color)
+
+
+def _print_task_diff(ecs_service_name, diffs, color):
     image_diff = next(x for x in diffs if x.field == 'image')
     if image_diff.old_value != image_diff.value:
         log_with_color(ecs_service_name + " New image getting deployed", color)
         log_with_color(ecs_service_name + " " + str(image_diff), color)
     else:
         log_with_color(ecs_service_name + " No change in image version", color)
+    secrets_diff = next((x for x in diffs if x.field == 'secrets'), None)
+    if secrets_diff is not None:
+        _print_secrets_diff(ecs_service_name, secrets_diff, color)
+        return
     env_diff = next(x for x in diffs if x.field == 'environment')
     old_env, current_env = env_diff.old_value, env_diff.value
     env_vars = sorted(
@@ -170,3 +247,20 @@ def print_task_diff(ecs_service_name, diffs, color):
             ecs_service_name + " No change in environment variables",
             color
         )
+
+
+def _print_secrets_diff(ecs_service_name, secrets_diff, color):
+    added = sorted(set(secrets_diff.value) - set(secrets_diff.old_value))
+    removed = sorted(set(secrets_diff.old_value) - set(secrets_diff.value))
+    if not added and not removed:
+        log_with_color(ecs_service_name + " No change in secrets", color)
+    if added:
+        log_with_color(
+            ecs_service_name + " Secrets added: " + ', '.join(added),
+            color
+        )
+    if removed:
+        log_with_color(
+            ecs_service_name + " Secrets removed: " + ', '.join(removed),
+            color
+        )
@@ -0,0 +1,149 @@
+'''
+Follow the rollout of all ECS services of a deployment from one polling
+loop. Services are described in batches of up to 10, the most a single
+DescribeServices call accepts, and each service's state is handed to its
+own DeploymentProgress.
+'''
+
+from cloudlift.config.logging import log_bold, log_err
+from cloudlift.deployment.deployer import (fetch_and_print_new_events,
+                                           service_event_tracker)
+from cloudlift.deployment.ecs import EcsAction, EcsService
+from cloudlift.deployment.poller import Poller
+
+DESCRIBE_SERVICES_BATCH_SIZE = 10
+
+
+class DeploymentProgress(object):
+    '''
+        Progress of the rollout of one ECS service
+    '''
+
+    def __init__(self, service_name, color, event_tracker):
+        self.service_name = service_name
+        self.color = color
+        self.event_tracker = event_tracker
+        self.started = False
+        self.finished = False
+        self.succeeded = False
+
+    def update(self, action, service):
+        '''
+            Print new events of the service and check whether its rollout
+            finished. Returns whether anything changed since the last update.
+        '''
+        changed = bool(fetch_and_print_new_events(
+            service,
+            self.event_tracker,
+            self.color
+        ))
+        if service.errors:
+            log_err(str(service.errors))
+            self._finish(False)
+        elif service.rollout_failed:
+            log_err(service.primary_deployment.get(
+                u'rolloutStateReason',
+                "Deployment circuit breaker rolled back the deployment"
+            ))
+            self._finish(False)
+        elif action.is_deployed(service):
+            self._finish(True)
+        return changed or self.finished
+
+    def _finish(self, succeeded):
+        self.finished = True
+        self.succeeded = succeeded
+        if succeeded:
+            log_bold(self.service_name + " Deployed successfully.")
+        else:
+            log_err(self.service_name + " Deployment failed.")
+
+
+class DeploymentMonitor(object):
+    def __init__(self, client, cluster_name, verify_tasks=False):
+        self._client = client
+        self._cluster_name = cluster_name
+        self._action = EcsAction(
+            client,
+            cluster_name,
+            None,
+            verify_tasks=verify_tasks
+        )
+        self._progress = {}
+
+    def watch(self, service_colors):
+        '''
+            Start following the given services, ignoring events that
+            happened before now. service_colors maps service name to the
+            color its output is printed in.
+        '''
+        for service in self._describe(list(service_colors)):
+            self._progress[service.name] = DeploymentProgress(
+                service.name,
+                service_colors[service.name],
+                service_event_tracker(service)
+            )
+
+    def start(self, service_name):
+        '''
+            Poll the service from now on. Call once its update was issued;
+            before that a watched service still looks fully deployed.
+        '''
+        self._progress[service_name].started = True
+
+    def forget(self, service_name):
+        self._progress.pop(service_name, None)
+
+    def poll(self):
+        '''
+            Update every service still rolling out. Returns whether any of
+            them changed.
+        '''
+        changed = False
+        for service in self._describe(self.active_services):
+            if self._progress[service.name].update(self._action, service):
+                changed = True
+        return changed
+
+    def wait(self, poller=None):
+        '''
+            Poll until every started service finished its rollout and
+            return whether each of them succeeded
+        '''
+        poller = poller or Poller("Deployment")
+        while self.active_services:
+            poller.wait()
+            poller.record(self.poll())
+        poller.report()
+        return self.results
+
+    @property
+    def active_services(self):
+        return [
+            name for name, progress in self._progress.items()
+            if progress.started and not progress.finished
+        ]
+
+    @property
+    def results(self):
+        '''
+            Whether each finished service rolled out successfully
+        '''
+        return {
+            name: progress.succeeded
+            for name, progress in self._progress.items()
+            if progress.finished
+        }
+
+    def _describe(self, service_names):
+        services = []
+        for index in range(0, len(service_names), DESCRIBE_SERVICES_BATCH_SIZE):
+            response = self._client.describe_service_batch(
+                self._cluster_name,
+                service_names[index:index + DESCRIBE_SERVICES_BATCH_SIZE]
+            )
+            services.extend(
+                EcsService(self._cluster_name, service_definition)
+                for service_definition in response[u'services']
+            )
+        return services
@@ -12,21 +12,28 @@ or updated. If the package supports deleting configs, use that.
 """
 
 from datetime import datetime
+from hashlib import sha256
 from json import dumps
 
 from boto3.session import Session
 from botocore.exceptions import ClientError, NoCredentialsError
 from dateutil.tz.tz import tzlocal
 
+from cloudlift.config import get_client
+from cloudlift.deployment.task_definition_cache import task_definition_cache
+
 
 class EcsClient(object):
     def __init__(self, access_key_id=None, secret_access_key=None,
                  region=None, profile=None):
-        session = Session(aws_access_key_id=access_key_id,
-                          aws_secret_access_key=secret_access_key,
-                          region_name=region,
-                          profile_name=profile)
-        self.boto = session.client(u'ecs')
+        if access_key_id or secret_access_key or profile:
+            session = Session(aws_access_key_id=access_key_id,
+                              aws_secret_access_key=secret_access_key,
+                              region_name=region,
+                              profile_name=profile)
+            self.boto = session.client(u'ecs')
+        else:
+            self.boto = get_client(u'ecs', region)
 
     def describe_services(self, cluster_name, service_name):
         return self.boto.describe_services(
@@ -34,7 +41,19 @@ class EcsClient(object):
             services=[service_name]
         )
 
+    def describe_service_batch(self, cluster_name, service_names):
+        return self.boto.describe_services(
+            cluster=cluster_name,
+            services=service_names
+        )
+
     def describe_task_definition(self, task_definition_arn):
+        return task_definition_cache.get(
+            task_definition_arn,
+            self._describe_task_definition
+        )
+
+    def _describe_task_definition(self, task_definition_arn):
         try:
             return self.boto.describe_task_definition(
                 taskDefinition=task_definition_arn
@@ -45,21 +64,27 @@ class EcsClient(object):
             )
 
     def list_tasks(self, cluster_name, service_name):
-        return self.boto.list_tasks(
-            cluster=cluster_name,
-            serviceName=service_name
-        )
+        task_arns = []
+        paginator = self.boto.get_paginator(u'list_tasks')
+        for page in paginator.paginate(cluster=cluster_name,
+                                       serviceName=service_name):
+            task_arns.extend(page[u'taskArns'])
+        return {u'taskArns': task_arns}
 
     def describe_tasks(self, cluster_name, task_arns):
         return self.boto.describe_tasks(cluster=cluster_name, tasks=task_arns)
 
-    def register_task_definition(self, family, containers, volumes, role_arn):
-        return self.boto.register_task_definition(
+    def register_task_definition(self, family, containers, volumes, role_arn,
+                                 execution_role_arn=None):
+        arguments = dict(
             family=family,
             containerDefinitions=containers,
             volumes=volumes,
             taskRoleArn=role_arn or u''
         )
+        if execution_role_arn:
+            arguments[u'executionRoleArn'] = execution_role_arn
+        return self.boto.register_task_definition(**arguments)
 
     def deregister_task_definition(self, task_definition_arn):
         return self.boto.deregister_task_definition(
@@ -111,6 +136,18 @@ class EcsService(dict):
     def desired_count(self):
         return self.get(u'desiredCount')
 
+    @property
+    def primary_deployment(self):
+        for deployment in self.get(u'deployments'):
+            if deployment.get(u'status') == u'PRIMARY':
+                return deployment
+        return None
+
+    @property
+    def rollout_failed(self):
+        primary_deployment = self.primary_deployment or {}
+        return primary_deployment.get(u'rolloutState') == u'FAILED'
+
     @property
     def deployment_created_at(self):
         for deployment in self.get(u'deployments'):
@@ -154,6 +191,30 @@ class EcsTaskDefinition(dict):
     def __init__(self, task_definition=None, **kwargs):
         super(EcsTaskDefinition, self).__init__(task_definition, **kwargs)
         self._diff = []
+        self._original_hash = self.content_hash
+
+    @property
+    def content_hash(self):
+        '''
+            Hash of everything a new revision would be registered with.
+            The order of environment variables and secrets does not count.
+        '''
+        content = {
+            u'containerDefinitions': [
+                _normalized_container(container)
+                for container in self.containers or []
+            ],
+            u'volumes': self.volumes or [],
+            u'taskRoleArn': self.role_arn or u'',
+            u'executionRoleArn': self.execution_role_arn or u''
+        }
+        return sha256(
+            dumps(content, sort_keys=True, default=str).encode('utf-8')
+        ).hexdigest()
+
+    @property
+    def changed(self):
+        return self.content_hash != self._original_hash
 
     @property
     def containers(self):
@@ -180,6 +241,10 @@ class EcsTaskDefinition(dict):
     def role_arn(self):
         return self.get(u'taskRoleArn')
 
+    @property
+    def execution_role_arn(self):
+        return self.get(u'executionRoleArn')
+
     @property
     def revision(self):
         return self.get(u'revision')
@@ -291,6 +356,33 @@ class EcsTaskDefinition(dict):
             } for e in merged_environment
         ]
 
+    def apply_container_secrets(self, container, secrets):
+        '''
+            Point the container's secrets at the given (name, valueFrom)
+            pairs. ECS reads the values when starting tasks, so only names
+            and references are compared here.
+        '''
+        old_secrets = {
+            secret['name']: secret['valueFrom']
+            for secret in container.get('secrets', [])
+        }
+        new_secrets = {name: value_from for name, value_from in secrets}
+
+        diff = EcsTaskDefinitionDiff(
+            container[u'name'],
+            u'secrets',
+            new_secrets,
+            old_secrets
+        )
+        self._diff.append(diff)
+
+        container[u'secrets'] = [
+            {
+                "name": name,
+                "valueFrom": new_secrets[name]
+            } for name in new_secrets
+        ]
+
     def validate_container_options(self, **container_options):
         for container_name in container_options:
             if container_name not in self.container_names:
@@ -310,6 +402,17 @@ class EcsTaskDefinition(dict):
             self._diff.append(diff)
 
 
+def _normalized_container(container):
+    normalized = dict(container)
+    for field in (u'environment', u'secrets'):
+        if field in normalized:
+            normalized[field] = sorted(
+                normalized[field],
+                key=lambda item: item[u'name']
+            )
+    return normalized
+
+
 class EcsTaskDefinitionDiff(object):
     def __init__(self, container, field, value, old_value):
         self.container = container
@@ -334,10 +437,12 @@ class EcsTaskDefinitionDiff(object):
 
 
 class EcsAction(object):
-    def __init__(self, client, cluster_name, service_name):
+    def __init__(self, client, cluster_name, service_name,
+                 verify_tasks=False):
         self._client = client
         self._cluster_name = cluster_name
         self._service_name = service_name
+        self._verify_tasks = verify_tasks
 
         try:
             if service_name:
@@ -388,7 +493,8 @@ class EcsAction(object):
             family=task_definition.family,
             containers=task_definition.containers,
             volumes=task_definition.volumes,
-            role_arn=task_definition.role_arn
+            role_arn=task_definition.role_arn,
+            execution_role_arn=task_definition.execution_role_arn
         )
         new_task_definition = EcsTaskDefinition(response[u'taskDefinition'])
         self._client.deregister_task_definition(task_definition.arn)
@@ -404,8 +510,24 @@ class EcsAction(object):
         return EcsService(self._cluster_name, response[u'service'])
 
     def is_deployed(self, service):
+        '''
+            The rollout is complete once the primary deployment is the only
+            one left and runs the desired number of tasks. ECS keeps these
+            counters on the service, so no task has to be described unless
+            the action verifies tasks.
+        '''
         if len(service[u'deployments']) != 1:
             return False
+        primary_deployment = service.primary_deployment
+        if primary_deployment.get(u'rolloutState', u'COMPLETED') != u'COMPLETED':
+            return False
+        if primary_deployment.get(u'runningCount') != service.desired_count:
+            return False
+        if self._verify_tasks:
+            return self.is_deployed_by_tasks(service)
+        return True
+
+    def is_deployed_by_tasks(self, service):
         running_tasks = self._client.list_tasks(
             cluster_name=service.cluster,
             service_name=service.name
@@ -420,15 +542,17 @@ class EcsAction(object):
 
     def get_running_tasks_count(self, service, task_arns):
         running_count = 0
-        tasks_details = self._client.describe_tasks(
-            cluster_name=self._cluster_name,
-            task_arns=task_arns
-        )
-        for task in tasks_details[u'tasks']:
-            arn = task[u'taskDefinitionArn']
-            status = task[u'lastStatus']
-            if arn == service.task_definition and status == u'RUNNING':
-                running_count += 1
+        # DescribeTasks accepts at most 100 tasks per call
+        for index in range(0, len(task_arns), 100):
+            tasks_details = self._client.describe_tasks(
+                cluster_name=self._cluster_name,
+                task_arns=task_arns[index:index + 100]
+            )
+            for task in tasks_details[u'tasks']:
+                arn = task[u'taskDefinitionArn']
+                status = task[u'lastStatus']
+                if arn == service.task_definition and status == u'RUNNING':
+                    running_count += 1
         return running_count
 
     @property
@@ -1,21 +1,26 @@
 import sys
-from time import sleep
 
 from botocore.exceptions import ClientError
 
 from cloudlift.config import EnvironmentConfiguration
 from cloudlift.config import get_client_for
 from cloudlift.config import get_cluster_name
-from cloudlift.deployment.changesets import create_change_set
+from cloudlift.deployment.changesets import (create_change_set,
+                                             is_stack_up_to_date)
 from cloudlift.deployment.cluster_template_generator import ClusterTemplateGenerator
 from cloudlift.config.logging import log, log_bold, log_err
-from cloudlift.deployment.progress import get_stack_events, print_new_events
+from cloudlift.deployment.poller import Poller
+from cloudlift.deployment.progress import StackEventReader, print_new_events
+from cloudlift.deployment.stack_timeline import report_stack_timeline
+from cloudlift.deployment.template_upload import template_source
 
 
 class EnvironmentCreator(object):
 
-    def __init__(self, environment):
+    def __init__(self, environment, timings=False, trace_file=None):
         self.environment = environment
+        self.timings = timings
+        self.trace_file = trace_file
         environment_configuration = EnvironmentConfiguration(
             self.environment
         )
@@ -44,13 +49,13 @@ class EnvironmentCreator(object):
                 self.environment,
                 self.configuration
             ).generate_cluster()
-            self.existing_events = get_stack_events(
+            self.stack_events = StackEventReader(
                 self.client,
                 self.cluster_name
             )
+            self.stack_events.skip_existing()
             environment_stack = self.client.create_stack(
                 StackName=self.cluster_name,
-                TemplateBody=environment_stack_template_body,
                 Parameters=[
                     {
                         'ParameterKey': 'KeyPair',
@@ -63,6 +68,11 @@ class EnvironmentCreator(object):
                 ],
                 OnFailure='DO_NOTHING',
                 Capabilities=['CAPABILITY_NAMED_IAM'],
+                **template_source(
+                    environment_stack_template_body,
+                    self.cluster_name,
+                    self.environment
+                )
             )
             log_bold("Submitted to cloudformation. Checking progress...")
             self.__print_progress()
@@ -80,6 +90,16 @@ class EnvironmentCreator(object):
                 self.__get_desired_count()
             ).generate_cluster()
             log("Template generation complete.")
+            if is_stack_up_to_date(
+                self.client,
+                environment_stack_template_body,
+                self.cluster_name,
+                self.key_name,
+                self.environment
+            ):
+                log_bold("Stack is up to date. No updates are to be \
+performed")
+                return
             change_set = create_change_set(
                 self.client,
                 environment_stack_template_body,
@@ -87,10 +107,11 @@ class EnvironmentCreator(object):
                 self.key_name,
                 self.environment
             )
-            self.existing_events = get_stack_events(
+            self.stack_events = StackEventReader(
                 self.client,
                 self.cluster_name
             )
+            self.stack_events.skip_existing()
             log_bold("Executing changeset. Checking progress...")
             self.client.execute_change_set(
                 ChangeSetName=change_set['ChangeSetId']
@@ -132,14 +153,27 @@ class EnvironmentCreator(object):
 
 
     def __print_progress(self):
+        poller = Poller(
+            "Stack " + self.cluster_name,
+            initial_interval=2,
+            max_interval=15
+        )
         while True:
             response = self.client.describe_stacks(StackName=self.cluster_name)
-            if "IN_PROGRESS" not in response['Stacks'][0]['StackStatus']:
+            finished = "IN_PROGRESS" not in response['Stacks'][0]['StackStatus']
+            new_events = self.stack_events.read()
+            print_new_events(new_events)
+            if finished:
                 break
-            all_events = get_stack_events(self.client, self.cluster_name)
-            print_new_events(all_events, self.existing_events)
-            self.existing_events = all_events
-            sleep(5)
+            poller.record(bool(new_events))
+            poller.wait()
+        poller.report()
+        report_stack_timeline(
+            self.cluster_name,
+            self.stack_events.events,
+            self.timings,
+            self.trace_file
+        )
         log_bold("Finished and Status: %s" % (response['Stacks'][0]['StackStatus']))
 
     def __run_ecs_container_agent_udpate(self):
@@ -163,8 +197,10 @@ class EnvironmentCreator(object):
                 else:
                     raise exception
 
+        poller = Poller("ECS agent update", max_interval=5)
+        previous_status_string = None
         while True:
-            sleep(1)
+            poller.wait()
             response = ecs_client.describe_container_instances(
                 cluster=self.cluster_name,
                 containerInstances=container_instance_arns
@@ -185,7 +221,10 @@ class EnvironmentCreator(object):
                     finished = False
             sys.stdout.write(status_string)
             sys.stdout.flush()
+            poller.record(status_string != previous_status_string)
+            previous_status_string = status_string
 
             if finished:
                 print("")
+                poller.report()
                 break
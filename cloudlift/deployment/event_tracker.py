@@ -0,0 +1,55 @@
+'''
+Tell new events from ones already printed, for ECS service events and
+CloudFormation stack events alike.
+'''
+
+from collections import OrderedDict
+
+MAX_TRACKED_EVENT_IDS = 1000
+
+
+class EventTracker(object):
+    '''
+        Remembers the newest timestamp seen and the ids of recent events.
+        Anything older than that timestamp is skipped without a lookup, so
+        only events sharing the newest timestamps need their ids kept and
+        the set of ids stays bounded.
+    '''
+
+    def __init__(self, id_key, timestamp_key,
+                 max_ids=MAX_TRACKED_EVENT_IDS):
+        self.id_key = id_key
+        self.timestamp_key = timestamp_key
+        self.max_ids = max_ids
+        self.high_water_mark = None
+        self._seen_ids = OrderedDict()
+
+    def mark_seen(self, events):
+        self.new_events(events)
+
+    def new_events(self, events):
+        '''
+            Events not seen before, oldest first. They count as seen from
+            now on.
+        '''
+        new_events = [
+            event for event in events
+            if not self._is_old(event)
+            and event[self.id_key] not in self._seen_ids
+        ]
+        new_events.sort(key=lambda event: event[self.timestamp_key])
+        for event in new_events:
+            self._remember(event)
+        return new_events
+
+    def _is_old(self, event):
+        return self.high_water_mark is not None and \
+            event[self.timestamp_key] < self.high_water_mark
+
+    def _remember(self, event):
+        self._seen_ids[event[self.id_key]] = True
+        while len(self._seen_ids) > self.max_ids:
+            self._seen_ids.popitem(last=False)
+        if self.high_water_mark is None or \
+                event[self.timestamp_key] > self.high_water_mark:
+            self.high_water_mark = event[self.timestamp_key]
@@ -0,0 +1,257 @@
+'''
+Inputs of template generation that come from AWS, gathered once before a
+template is built.
+'''
+
+import json
+from concurrent.futures import ThreadPoolExecutor
+
+from cloudlift.config import (get_account_id, get_client_for,
+                              get_cluster_name, get_environment_snapshot,
+                              get_region_for_environment,
+                              get_service_stack_name)
+from cloudlift.config.logging import log, log_bold, log_err
+from cloudlift.deployment.ecs import EcsClient
+from cloudlift.deployment.service_information_fetcher import ServiceInformationFetcher
+
+# DescribeServices accepts at most 10 services per call
+DESCRIBE_SERVICES_BATCH_SIZE = 10
+
+DEFAULT_TEMPLATE_FORMAT = 'yaml'
+
+# Output of a service stack listing the services of one of its nested
+# stacks, comma separated: <nested stack logical id>ServiceNames
+NESTED_STACK_OUTPUT_SUFFIX = 'ServiceNames'
+
+ECS_OPTIMIZED_AMI_PARAMETER = \
+    '/aws/service/ecs/optimized-ami/amazon-linux-2/recommended'
+
+
+class GenerationContext(object):
+    '''
+        Everything the template generators read from AWS. Build one with
+        for_service or for_cluster, which make the calls up front, in
+        parallel where they do not depend on each other.
+    '''
+
+    def __init__(self, environment, region, account_id=None,
+                 notifications_arn=None, ssl_certificate_arn=None,
+                 environment_outputs=None, desired_counts=None,
+                 current_version=None, availability_zones=None, ami_id=None,
+                 env_config=None, template_format=DEFAULT_TEMPLATE_FORMAT,
+                 template_bucket=None, nested_stacks=None,
+                 deployed_services=None):
+        self.environment = environment
+        self.region = region
+        self.account_id = account_id
+        self.environment_outputs = environment_outputs or {}
+        self.desired_counts = desired_counts or {}
+        self.current_version = current_version
+        self.availability_zones = availability_zones or []
+        self.ami_id = ami_id
+        # 'yaml', or 'json' for compact JSON
+        self.template_format = template_format
+        # S3 bucket holding templates CloudFormation reads by URL
+        self.template_bucket = template_bucket
+        # Services of each nested stack of the deployed service stack, by
+        # logical id of the nested stack
+        self.nested_stacks = nested_stacks or {}
+        # Services of the deployed service stack, nested or not
+        self.deployed_services = deployed_services or []
+        # (name, value) pairs of the container environment. When None, the
+        # service template generator reads them from Parameter Store.
+        self.env_config = env_config
+        self._notifications_arn = notifications_arn
+        self._ssl_certificate_arn = ssl_certificate_arn
+
+    @classmethod
+    def for_service(cls, environment, application_name, environment_stack):
+        with ThreadPoolExecutor(max_workers=3) as executor:
+            account_id = executor.submit(get_account_id)
+            service_stack_outputs = _fetch_service_stack_outputs(
+                environment,
+                application_name
+            )
+            ecs_service_names = _ecs_service_names(service_stack_outputs)
+            desired_counts = executor.submit(
+                _fetch_desired_counts,
+                environment,
+                ecs_service_names
+            )
+            current_version = executor.submit(
+                lambda: ServiceInformationFetcher(
+                    application_name,
+                    environment,
+                    list(ecs_service_names.values())
+                ).get_current_version()
+            )
+            return cls(
+                environment,
+                get_region_for_environment(environment),
+                account_id=account_id.result(),
+                environment_outputs={
+                    output['OutputKey']: output['OutputValue']
+                    for output in (environment_stack or {}).get('Outputs', [])
+                },
+                desired_counts=desired_counts.result(),
+                current_version=current_version.result(),
+                nested_stacks=_nested_stacks(service_stack_outputs),
+                deployed_services=sorted(ecs_service_names),
+                **_environment_settings(environment)
+            )
+
+    @classmethod
+    def for_cluster(cls, environment):
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            availability_zones = executor.submit(
+                _fetch_availability_zones,
+                environment
+            )
+            ami_id = executor.submit(_fetch_ami_id, environment)
+            return cls(
+                environment,
+                get_region_for_environment(environment),
+                availability_zones=availability_zones.result(),
+                ami_id=ami_id.result(),
+                **_environment_settings(environment)
+            )
+
+    @classmethod
+    def from_dict(cls, values):
+        return cls(**values)
+
+    def to_dict(self):
+        '''
+            The inputs as plain JSON-able values, without the container
+            environment
+        '''
+        return {
+            'environment': self.environment,
+            'region': self.region,
+            'account_id': self.account_id,
+            'notifications_arn': self._notifications_arn,
+            'ssl_certificate_arn': self._ssl_certificate_arn,
+            'environment_outputs': self.environment_outputs,
+            'desired_counts': self.desired_counts,
+            'current_version': self.current_version,
+            'availability_zones': self.availability_zones,
+            'ami_id': self.ami_id,
+            'template_format': self.template_format,
+            'template_bucket': self.template_bucket,
+            'nested_stacks': self.nested_stacks,
+            'deployed_services': self.deployed_services,
+        }
+
+    @property
+    def notifications_arn(self):
+        if self._notifications_arn is None:
+            log_err("Unable to find notifications arn for " +
+                    self.environment)
+            exit(1)
+        return self._notifications_arn
+
+    @property
+    def ssl_certificate_arn(self):
+        if self._ssl_certificate_arn is None:
+            log_err("Unable to find ssl certificate for " + self.environment)
+            exit(1)
+        return self._ssl_certificate_arn
+
+    def environment_output(self, key):
+        return self.environment_outputs[key]
+
+    def desired_count(self, service_name):
+        return self.desired_counts.get(service_name, 0)
+
+
+def _environment_settings(environment):
+    environment_config = get_environment_snapshot(environment).get(
+        'environment',
+        {}
+    )
+    return {
+        'notifications_arn': environment_config.get('notifications_arn'),
+        'ssl_certificate_arn': environment_config.get('ssl_certificate_arn'),
+        'template_format': environment_config.get(
+            'template_format',
+            DEFAULT_TEMPLATE_FORMAT
+        ),
+        'template_bucket': environment_config.get('template_bucket'),
+    }
+
+
+def _fetch_service_stack_outputs(environment, application_name):
+    '''
+        Outputs of the application's stack, by key
+    '''
+    try:
+        stack = get_client_for('cloudformation', environment).describe_stacks(
+            StackName=get_service_stack_name(environment, application_name)
+        )['Stacks'][0]
+    except Exception:
+        return {}
+    return {
+        output['OutputKey']: output['OutputValue']
+        for output in stack.get('Outputs', [])
+    }
+
+
+def _ecs_service_names(service_stack_outputs):
+    '''
+        ECS service names of the application's stack, by service name
+    '''
+    return {
+        key.replace('EcsServiceName', ''): value
+        for key, value in service_stack_outputs.items()
+        if key.endswith('EcsServiceName')
+    }
+
+
+def _nested_stacks(service_stack_outputs):
+    return {
+        key[:-len(NESTED_STACK_OUTPUT_SUFFIX)]: value.split(',')
+        for key, value in service_stack_outputs.items()
+        if key.endswith(NESTED_STACK_OUTPUT_SUFFIX)
+    }
+
+
+def _fetch_desired_counts(environment, ecs_service_names):
+    if not ecs_service_names:
+        log_bold("Could not find existing services.")
+        return {}
+    service_names = {
+        ecs_service_name: service_name
+        for service_name, ecs_service_name in ecs_service_names.items()
+    }
+    ecs_client = EcsClient(None, None, get_region_for_environment(environment))
+    ecs_names = list(service_names)
+    desired_counts = {}
+    try:
+        for start in range(0, len(ecs_names), DESCRIBE_SERVICES_BATCH_SIZE):
+            response = ecs_client.describe_service_batch(
+                get_cluster_name(environment),
+                ecs_names[start:start + DESCRIBE_SERVICES_BATCH_SIZE]
+            )
+            for service in response['services']:
+                service_name = service_names.get(service['serviceName'])
+                if service_name is not None:
+                    desired_counts[service_name] = service['desiredCount']
+    except Exception:
+        log_bold("Could not find existing services.")
+        return {}
+    log("Existing service counts: " + str(desired_counts))
+    return desired_counts
+
+
+def _fetch_availability_zones(environment):
+    client = get_client_for('ec2', environment)
+    aws_azs = client.describe_availability_zones()['AvailabilityZones']
+    return [zone['ZoneName'] for zone in aws_azs][:2]
+
+
+def _fetch_ami_id(environment):
+    # Pick from https://docs.aws.amazon.com/AmazonECS/latest/developerguide/al2ami.html
+    ami_response = get_client_for('ssm', environment).get_parameter(
+        Name=ECS_OPTIMIZED_AMI_PARAMETER
+    )
+    return json.loads(ami_response['Parameter']['Value'])['image_id']
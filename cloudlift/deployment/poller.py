@@ -0,0 +1,51 @@
+'''
+Spacing of repeated AWS status calls while waiting on deployments,
+changesets and stacks.
+'''
+
+import random
+from time import sleep, time
+
+from cloudlift.config.logging import log
+
+
+class Poller(object):
+    '''
+        Waits between polls with exponential backoff and jitter. The
+        interval grows while nothing changes, up to max_interval, and drops
+        back to initial_interval as soon as something new shows up.
+    '''
+
+    def __init__(self, name, initial_interval=1, max_interval=10,
+                 multiplier=1.5, jitter=0.2):
+        self.name = name
+        self.initial_interval = initial_interval
+        self.max_interval = max_interval
+        self.multiplier = multiplier
+        self.jitter = jitter
+        self.polls = 0
+        self.interval = initial_interval
+        self._started_at = time()
+
+    def wait(self):
+        sleep(self.interval * random.uniform(1 - self.jitter, 1 + self.jitter))
+        self.polls += 1
+
+    def record(self, changed):
+        '''
+            Adjust the next interval to whether the last poll saw a change
+        '''
+        if changed:
+            self.interval = self.initial_interval
+        else:
+            self.interval = min(
+                self.max_interval,
+                self.interval * self.multiplier
+            )
+
+    def report(self):
+        log("%s: %d polls in %ds" % (
+            self.name,
+            self.polls,
+            time() - self._started_at
+        ))
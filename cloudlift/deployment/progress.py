@@ -1,18 +1,77 @@
+from botocore.exceptions import ClientError
+
 from cloudlift.config.logging import log_intent, log_intent_err
+from cloudlift.deployment.event_tracker import EventTracker
+
+
+class StackEventReader(object):
+    '''
+        Reads the events of a CloudFormation stack incrementally.
+        DescribeStackEvents returns the newest events first, so each read
+        pages only until it reaches the newest event of the previous read.
+    '''
+
+    def __init__(self, client, stack_name):
+        self.client = client
+        self.stack_name = stack_name
+        self.event_tracker = EventTracker('EventId', 'Timestamp')
+        self.events = []
+        self._last_event_id = None
+
+    def skip_existing(self):
+        '''
+            Count the events so far as read. Only the newest page is
+            fetched; older history is never needed.
+        '''
+        events = self._fetch(all_pages=False)
+        self._remember(events)
+        self.event_tracker.mark_seen(events)
+
+    def read(self):
+        '''
+            Events since the previous read, oldest first. They are also kept
+            in self.events.
+        '''
+        events = self._fetch(all_pages=True)
+        self._remember(events)
+        new_events = self.event_tracker.new_events(events)
+        self.events.extend(new_events)
+        return new_events
+
+    def _fetch(self, all_pages):
+        '''
+            Events newer than the last one read, newest first. Errors other
+            than a missing stack are raised rather than returning part of
+            the events, which would skip the rest for good.
+        '''
+        events = []
+        request = {'StackName': self.stack_name}
+        try:
+            while True:
+                response = self.client.describe_stack_events(**request)
+                for event in response['StackEvents']:
+                    if event['EventId'] == self._last_event_id:
+                        return events
+                    events.append(event)
+                if not all_pages or not response.get('NextToken'):
+                    return events
+                request['NextToken'] = response['NextToken']
+        except ClientError as error:
+            if not _is_missing_stack(error):
+                raise
+            return []
+
+    def _remember(self, events):
+        if events:
+            self._last_event_id = events[0]['EventId']
 
 
-def get_stack_events(client, stack_name):
-    try:
-        return sorted(
-            client.describe_stack_events(
-                StackName=stack_name
-            )['StackEvents'], key=lambda k: k['Timestamp'])
-    except Exception:
-        return []
+def _is_missing_stack(error):
+    return error.response['Error']['Code'] == 'ValidationError' and \
+        'does not exist' in error.response['Error']['Message']
 
 
-def print_new_events(all_events, existing_events):
-    new_events = [evnt for evnt in all_events if evnt not in existing_events]
+def print_new_events(new_events):
     for event in new_events:
         update = "%s: Resource: %s\t\tStatus: %s" % (
             event['Timestamp'],
@@ -3,17 +3,20 @@ Create or update ECS service and related dependencies
 using CloudFormation templates
 '''
 
-from time import sleep
-
 from botocore.exceptions import ClientError
 
 from cloudlift.config import get_client_for
 from cloudlift.config import ServiceConfiguration
 from cloudlift.config import get_cluster_name, get_service_stack_name
-from cloudlift.deployment.changesets import create_change_set
+from cloudlift.deployment.changesets import (create_change_set,
+                                             is_stack_up_to_date)
 from cloudlift.config.logging import log, log_bold, log_err
-from cloudlift.deployment.progress import get_stack_events, print_new_events
+from cloudlift.deployment.poller import Poller
+from cloudlift.deployment.progress import StackEventReader, print_new_events
 from cloudlift.deployment.service_template_generator import ServiceTemplateGenerator
+from cloudlift.deployment.stack_timeline import report_stack_timeline
+from cloudlift.deployment.template_upload import (template_source,
+                                                  upload_template)
 
 
 class ServiceCreator(object):
@@ -22,13 +25,16 @@ class ServiceCreator(object):
         CloudFormation template for ECS service and related dependencies
     '''
 
-    def __init__(self, name, environment):
+    def __init__(self, name, environment, timings=False, trace_file=None):
         self.name = name
         self.environment = environment
+        self.timings = timings
+        self.trace_file = trace_file
         self.stack_name = get_service_stack_name(environment, name)
         self.client = get_client_for('cloudformation', self.environment)
         self.environment_stack = self._get_environment_stack()
-        self.existing_events = get_stack_events(self.client, self.stack_name)
+        self.stack_events = StackEventReader(self.client, self.stack_name)
+        self.stack_events.skip_existing()
         self.service_configuration = ServiceConfiguration(
             self.name,
             self.environment
@@ -47,17 +53,22 @@ class ServiceCreator(object):
             self.environment_stack
         )
         service_template_body = template_generator.generate_service()
+        self._upload_nested_templates(template_generator)
 
         try:
             self.client.create_stack(
                 StackName=self.stack_name,
-                TemplateBody=service_template_body,
                 Parameters=[{
                     'ParameterKey': 'Environment',
                     'ParameterValue': self.environment,
                 }],
                 OnFailure='DO_NOTHING',
                 Capabilities=['CAPABILITY_NAMED_IAM'],
+                **template_source(
+                    service_template_body,
+                    self.stack_name,
+                    self.environment
+                )
             )
             log_bold("Submitted to cloudformation. Checking progress...")
             self._print_progress()
@@ -83,6 +94,17 @@ class ServiceCreator(object):
                 self.environment_stack
             )
             service_template_body = template_generator.generate_service()
+            if is_stack_up_to_date(
+                self.client,
+                service_template_body,
+                self.stack_name,
+                "",
+                self.environment
+            ):
+                log_bold("Stack is up to date. No updates are to be \
+performed")
+                return
+            self._upload_nested_templates(template_generator)
             change_set = create_change_set(
                 self.client,
                 service_template_body,
@@ -116,15 +138,32 @@ cluster using `create_environment` command.")
             exit(1)
         return environment_stack
 
+    def _upload_nested_templates(self, template_generator):
+        for template_body in template_generator.nested_templates.values():
+            upload_template(template_body, self.stack_name, self.environment)
+
     def _print_progress(self):
+        poller = Poller(
+            "Stack " + self.stack_name,
+            initial_interval=2,
+            max_interval=15
+        )
         while True:
             response = self.client.describe_stacks(StackName=self.stack_name)
-            if "IN_PROGRESS" not in response['Stacks'][0]['StackStatus']:
+            finished = "IN_PROGRESS" not in response['Stacks'][0]['StackStatus']
+            new_events = self.stack_events.read()
+            print_new_events(new_events)
+            if finished:
                 break
-            all_events = get_stack_events(self.client, self.stack_name)
-            print_new_events(all_events, self.existing_events)
-            self.existing_events = all_events
-            sleep(5)
+            poller.record(bool(new_events))
+            poller.wait()
+        poller.report()
+        report_stack_timeline(
+            self.stack_name,
+            self.stack_events.events,
+            self.timings,
+            self.trace_file
+        )
         final_status = response['Stacks'][0]['StackStatus']
         if "FAIL" in final_status:
             log_err("Finished with status: %s" % (final_status))
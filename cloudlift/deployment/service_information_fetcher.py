@@ -4,19 +4,24 @@ from subprocess import call
 from cloudlift.config import get_client_for
 from cloudlift.config import get_cluster_name, get_service_stack_name
 from cloudlift.config.logging import log, log_bold, log_err, log_intent, log_warning
+from cloudlift.deployment.task_definition_cache import task_definition_cache
 
 
 class ServiceInformationFetcher(object):
-    def __init__(self, name, environment):
+    def __init__(self, name, environment, ecs_service_names=None):
         self.name = name
         self.environment = environment
         self.cluster_name = get_cluster_name(environment)
+        self.stack_name = get_service_stack_name(environment, name)
         self.ecs_client = get_client_for('ecs', self.environment)
         self.ec2_client = get_client_for('ec2', self.environment)
-        self.init_stack_info()
+        if ecs_service_names is None:
+            self.init_stack_info()
+        else:
+            # Already read from the service stack by the caller
+            self.ecs_service_names = ecs_service_names
 
     def init_stack_info(self):
-        self.stack_name = get_service_stack_name(self.environment, self.name)
         try:
             stack = get_client_for(
                 'cloudformation',
@@ -136,8 +141,11 @@ fetched.")
                 tasks=task_arns
             )['tasks']
             task_definition_arns = tasks[0]['taskDefinitionArn']
-            task_definition = self.ecs_client.describe_task_definition(
-                taskDefinition=task_definition_arns
+            task_definition = task_definition_cache.get(
+                task_definition_arns,
+                lambda arn: self.ecs_client.describe_task_definition(
+                    taskDefinition=arn
+                )
             )
             image = task_definition['taskDefinition']['containerDefinitions'][0]['image']
             commit_sha = image.split('-repo:')[1]
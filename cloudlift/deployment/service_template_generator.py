@@ -1,33 +1,54 @@
 import json
 import re
+from collections import OrderedDict
 
 from awacs.aws import PolicyDocument, Statement, Allow, Principal
+from awacs.ssm import GetParameters
 from awacs.sts import AssumeRole
-from cfn_flip import to_yaml
 from stringcase import pascalcase
-from troposphere import GetAtt, Output, Parameter, Ref, Sub
+from troposphere import GetAtt, Output, Parameter, Ref, Sub, Template
+from troposphere.cloudformation import Stack
 from troposphere.cloudwatch import Alarm, MetricDimension
 from troposphere.ec2 import SecurityGroup
 from troposphere.ecs import (ContainerDefinition, DeploymentConfiguration,
                              Environment, LoadBalancer, LogConfiguration,
-                             PlacementStrategy, PortMapping, Service,
-                             TaskDefinition)
+                             PlacementStrategy, PortMapping, Secret,
+                             Service, TaskDefinition)
 from troposphere.elasticloadbalancingv2 import Action, Certificate, Listener
 from troposphere.elasticloadbalancingv2 import LoadBalancer as ALBLoadBalancer
 from troposphere.elasticloadbalancingv2 import (Matcher, RedirectConfig,
                                                 TargetGroup,
                                                 TargetGroupAttribute)
-from troposphere.iam import Role
+from troposphere.iam import Policy, Role
 
-from cloudlift.config import region as region_service
-from cloudlift.config import get_account_id
-from cloudlift.config import DecimalEncoder
-from cloudlift.config import get_service_stack_name
+from cloudlift.config import DecimalEncoder, get_service_stack_name
+from cloudlift.config.logging import log_err
 from cloudlift.deployment.deployer import build_config
-from cloudlift.deployment.ecs import DeployAction, EcsClient
-from cloudlift.config.logging import log, log_bold
-from cloudlift.deployment.service_information_fetcher import ServiceInformationFetcher
+from cloudlift.deployment.generation_context import (NESTED_STACK_OUTPUT_SUFFIX,
+                                                     GenerationContext)
 from cloudlift.deployment.template_generator import TemplateGenerator
+from cloudlift.deployment.template_upload import template_url
+
+# CloudFormation allows at most this many resources and outputs in a stack
+MAX_STACK_RESOURCES = 500
+MAX_STACK_OUTPUTS = 200
+
+NESTED_STACK_PREFIX = 'ServicesStack'
+
+# What the services' resources refer to. A nested stack gets its own
+# parameters in their place while its template is built.
+NESTED_STACK_INPUTS = [
+    'template',
+    'notification_sns_arn',
+    'vpc',
+    'public_subnet1',
+    'public_subnet2',
+    'private_subnet1',
+    'private_subnet2',
+    'alb_security_group',
+    'ecs_service_role',
+    'task_execution_role_arn',
+]
 
 
 class ServiceTemplateGenerator(TemplateGenerator):
@@ -41,15 +62,24 @@ class ServiceTemplateGenerator(TemplateGenerator):
             Field='instanceId'
         )]
 
-    def __init__(self, service_configuration, environment_stack):
+    def __init__(self, service_configuration, environment_stack,
+                 context=None):
         super(ServiceTemplateGenerator, self).__init__(
             service_configuration.environment
         )
         self._derive_configuration(service_configuration)
         self.env_sample_file_path = './env.sample'
+        self._env_config = None
+        # Bodies of the nested stack templates, by logical id. They have to
+        # be uploaded with upload_template before the stack is deployed.
+        self.nested_templates = {}
         self.environment_stack = environment_stack
-        self.current_version = ServiceInformationFetcher(
-            self.application_name, self.env).get_current_version()
+        self.context = context or GenerationContext.for_service(
+            self.env,
+            self.application_name,
+            environment_stack
+        )
+        self.current_version = self.context.current_version
 
     def _derive_configuration(self, service_configuration):
         self.application_name = service_configuration.service_name
@@ -58,14 +88,195 @@ class ServiceTemplateGenerator(TemplateGenerator):
     def generate_service(self):
         self._add_service_parameters()
         self._add_service_outputs()
-        self._fetch_current_desired_count()
         self._add_ecs_service_iam_role()
-        self._add_cluster_services()
-        return to_yaml(self.template.to_json())
+        if self.secrets_by_reference:
+            self._add_task_execution_role()
+        service_names, partitions = self._partition_services()
+        self._add_cluster_services(service_names)
+        if partitions:
+            self._add_nested_service_stacks(partitions)
+        self._check_output_count()
+        return self._serialize()
+
+    def _add_cluster_services(self, service_names):
+        for ecs_service_name in service_names:
+            self._add_service(
+                ecs_service_name,
+                self.configuration['services'][ecs_service_name]
+            )
+
+    def _check_output_count(self):
+        output_count = len(self.template.outputs)
+        if output_count > MAX_STACK_OUTPUTS:
+            log_err("The template of %s has %d outputs, more than the %d \
+CloudFormation allows. The outputs of services in nested stacks are repeated \
+in it." % (self.application_name, output_count, MAX_STACK_OUTPUTS))
+            exit(1)
+
+    def _partition_services(self):
+        '''
+            Services to keep in this stack, and those to put in each nested
+            stack by logical id of the stack. services_per_stack in the
+            configuration asks for nested stacks; otherwise they are used
+            once a single stack would have too many resources. Moving a
+            service to another stack replaces it, so deployed services stay
+            where they are, in this stack or a nested one, and only new
+            services are placed.
+        '''
+        services = self.configuration['services']
+        partitions = self._deployed_partitions()
+        nested = set(
+            service_name
+            for service_names in partitions.values()
+            for service_name in service_names
+        )
+        kept = [
+            service_name for service_name in services
+            if service_name in self.context.deployed_services
+            and service_name not in nested
+        ]
+        new_services = sorted(set(services) - nested - set(kept))
+        services_per_stack = self.configuration.get('services_per_stack')
+        if services_per_stack:
+            return kept, self._place_services(
+                partitions,
+                new_services,
+                lambda service_names, service_name:
+                    len(service_names) < services_per_stack
+            )
+        resource_counts = {
+            service_name: self._count_service_resources(
+                service_name,
+                services[service_name]
+            )
+            for service_name in services
+        }
+        if not partitions and len(self.template.resources) + \
+                sum(resource_counts.values()) <= MAX_STACK_RESOURCES:
+            return list(services), partitions
+        return kept, self._place_services(
+            partitions,
+            new_services,
+            lambda service_names, service_name: sum(
+                resource_counts[name] for name in service_names
+            ) + resource_counts[service_name] <= MAX_STACK_RESOURCES
+        )
 
-    def _add_cluster_services(self):
-        for ecs_service_name, config in self.configuration['services'].items():
-            self._add_service(ecs_service_name, config)
+    def _deployed_partitions(self):
+        '''
+            Nested stacks of the deployed stack with the services they hold
+            that are still configured
+        '''
+        services = self.configuration['services']
+        partitions = OrderedDict()
+        for logical_id in sorted(self.context.nested_stacks,
+                                 key=_nested_stack_number):
+            service_names = [
+                service_name
+                for service_name in self.context.nested_stacks[logical_id]
+                if service_name in services
+            ]
+            if service_names:
+                partitions[logical_id] = service_names
+        return partitions
+
+    def _place_services(self, partitions, service_names, has_room):
+        '''
+            Put each service in the first nested stack has_room allows, or
+            in a new one
+        '''
+        last_number = max(
+            [0] + [
+                _nested_stack_number(logical_id)
+                for logical_id in list(partitions) +
+                list(self.context.nested_stacks)
+            ]
+        )
+        for service_name in service_names:
+            for partition in partitions.values():
+                if has_room(partition, service_name):
+                    partition.append(service_name)
+                    break
+            else:
+                last_number += 1
+                partitions[NESTED_STACK_PREFIX + str(last_number)] = \
+                    [service_name]
+        return partitions
+
+    def _count_service_resources(self, service_name, config):
+        template = self.template
+        self.template = Template()
+        try:
+            self._add_service(service_name, config)
+            return len(self.template.resources)
+        finally:
+            self.template = template
+
+    def _add_nested_service_stacks(self, partitions):
+        if not self.context.template_bucket:
+            log_err("The services of %s have to be split into nested \
+stacks, which CloudFormation reads from S3. Set environment.template_bucket \
+in the configuration of %s." % (self.application_name, self.env))
+            exit(1)
+        stack_name = get_service_stack_name(self.env, self.application_name)
+        for logical_id, service_names in partitions.items():
+            nested_template, template_body, parameters = \
+                self._nested_service_template(service_names)
+            self.nested_templates[logical_id] = template_body
+            nested_stack = self.template.add_resource(Stack(
+                logical_id,
+                TemplateURL=template_url(
+                    template_body,
+                    stack_name,
+                    self.context.template_bucket,
+                    self.region
+                ),
+                Parameters=parameters
+            ))
+            # *EcsServiceName outputs are how deploys find the ECS services
+            for output_name, output in nested_template.outputs.items():
+                self.template.add_output(Output(
+                    output_name,
+                    Description=output.Description,
+                    Value=GetAtt(nested_stack, 'Outputs.' + output_name)
+                ))
+            # Read back by the next update to keep services in this stack
+            self.template.add_output(Output(
+                logical_id + NESTED_STACK_OUTPUT_SUFFIX,
+                Description='Services of the nested stack ' + logical_id,
+                Value=','.join(service_names)
+            ))
+
+    def _nested_service_template(self, service_names):
+        '''
+            Template of a nested stack with the given services, built by the
+            same code as a single stack. The parameters and roles of this
+            stack are passed in as parameters of the nested one.
+        '''
+        inputs = {name: getattr(self, name, None) for name in NESTED_STACK_INPUTS}
+        self.template = Template()
+        try:
+            self._add_service_parameters()
+            parameters = {title: Ref(title) for title in self.template.parameters}
+            self.ecs_service_role = self.template.add_parameter(
+                Parameter('ECSServiceRole', Type='String')
+            )
+            parameters['ECSServiceRole'] = Ref(inputs['ecs_service_role'])
+            if self.secrets_by_reference:
+                self.task_execution_role_arn = Ref(self.template.add_parameter(
+                    Parameter('ECSTaskExecutionRoleArn', Type='String')
+                ))
+                parameters['ECSTaskExecutionRoleArn'] = \
+                    inputs['task_execution_role_arn']
+            for service_name in service_names:
+                self._add_service(
+                    service_name,
+                    self.configuration['services'][service_name]
+                )
+            return self.template, self._serialize(), parameters
+        finally:
+            for name, value in inputs.items():
+                setattr(self, name, value)
 
     def _add_service_alarms(self, svc):
         ecs_high_cpu_alarm = Alarm(
@@ -147,15 +358,7 @@ service is down',
         self.template.add_resource(ecs_no_running_tasks_alarm)
 
     def _add_service(self, service_name, config):
-        env_config = build_config(
-            self.env,
-            self.application_name,
-            self.env_sample_file_path
-        )
         container_definition_arguments = {
-            "Environment": [
-                Environment(Name=k, Value=v) for (k, v) in env_config
-            ],
             "Name": service_name + "Container",
             "Image": self.ecr_image_uri + ':' + self.current_version,
             "Essential": 'true',
@@ -164,6 +367,16 @@ service is down',
             "Cpu": 0
         }
 
+        if self.secrets_by_reference:
+            container_definition_arguments['Secrets'] = [
+                Secret(Name=k, ValueFrom=self._parameter_arn(k))
+                for (k, _) in self.env_config
+            ]
+        else:
+            container_definition_arguments['Environment'] = [
+                Environment(Name=k, Value=v) for (k, v) in self.env_config
+            ]
+
         if 'http_interface' in config:
             container_definition_arguments['PortMappings'] = [
                 PortMapping(
@@ -191,14 +404,20 @@ service is down',
             )
         ))
 
+        task_definition_arguments = {
+            "Family": service_name + "Family",
+            "ContainerDefinitions": [cd],
+            "TaskRoleArn": Ref(task_role)
+        }
+        if self.secrets_by_reference:
+            task_definition_arguments['ExecutionRoleArn'] = \
+                self.task_execution_role_arn
         td = TaskDefinition(
             service_name + "TaskDefinition",
-            Family=service_name + "Family",
-            ContainerDefinitions=[cd],
-            TaskRoleArn=Ref(task_role)
+            **task_definition_arguments
         )
         self.template.add_resource(td)
-        desired_count = self._get_desired_task_count_for_service(service_name)
+        desired_count = self.context.desired_count(service_name)
         deployment_configuration = DeploymentConfiguration(
             MinimumHealthyPercent=100,
             MaximumPercent=200
@@ -514,6 +733,48 @@ from load balancer',
         )
         self.template.add_resource(self.ecs_service_role)
 
+    def _add_task_execution_role(self):
+        self.task_execution_role = Role(
+            'ECSTaskExecutionRole',
+            AssumeRolePolicyDocument=PolicyDocument(
+                Statement=[
+                    Statement(
+                        Effect=Allow,
+                        Action=[AssumeRole],
+                        Principal=Principal("Service", ["ecs-tasks.amazonaws.com"])
+                    )
+                ]
+            ),
+            ManagedPolicyArns=[
+                'arn:aws:iam::aws:policy/service-role/AmazonECSTaskExecutionRolePolicy'
+            ],
+            Policies=[
+                Policy(
+                    PolicyName='ReadParameterStoreSecrets',
+                    PolicyDocument=PolicyDocument(
+                        Statement=[
+                            Statement(
+                                Effect=Allow,
+                                Action=[GetParameters],
+                                Resource=[self._parameter_arn('*')]
+                            )
+                        ]
+                    )
+                )
+            ]
+        )
+        self.template.add_resource(self.task_execution_role)
+        self.task_execution_role_arn = GetAtt(self.task_execution_role, 'Arn')
+
+    def _parameter_arn(self, key):
+        return 'arn:aws:ssm:%s:%s:parameter/%s/%s/%s' % (
+            self.region,
+            self.account_id,
+            self.env,
+            self.application_name,
+            key
+        )
+
     def _add_service_outputs(self):
         self.template.add_output(Output(
             "CloudliftOptions",
@@ -537,60 +798,35 @@ building this service",
             "VPC",
             Description='',
             Type="AWS::EC2::VPC::Id",
-            Default=list(
-                filter(
-                    lambda x: x['OutputKey'] == "VPC",
-                    self.environment_stack['Outputs']
-                )
-            )[0]['OutputValue']
+            Default=self.context.environment_output("VPC")
         )
         self.template.add_parameter(self.vpc)
         self.public_subnet1 = Parameter(
             "PublicSubnet1",
             Description='',
             Type="AWS::EC2::Subnet::Id",
-            Default=list(
-                filter(
-                    lambda x: x['OutputKey'] == "PublicSubnet1",
-                    self.environment_stack['Outputs']
-                )
-            )[0]['OutputValue']
+            Default=self.context.environment_output("PublicSubnet1")
         )
         self.template.add_parameter(self.public_subnet1)
         self.public_subnet2 = Parameter(
             "PublicSubnet2",
             Description='',
             Type="AWS::EC2::Subnet::Id",
-            Default=list(
-                filter(
-                    lambda x: x['OutputKey'] == "PublicSubnet2",
-                    self.environment_stack['Outputs']
-                )
-            )[0]['OutputValue']
+            Default=self.context.environment_output("PublicSubnet2")
         )
         self.template.add_parameter(self.public_subnet2)
         self.private_subnet1 = Parameter(
             "PrivateSubnet1",
             Description='',
             Type="AWS::EC2::Subnet::Id",
-            Default=list(
-                filter(
-                    lambda x: x['OutputKey'] == "PrivateSubnet1",
-                    self.environment_stack['Outputs']
-                )
-            )[0]['OutputValue']
+            Default=self.context.environment_output("PrivateSubnet1")
         )
         self.template.add_parameter(self.private_subnet1)
         self.private_subnet2 = Parameter(
             "PrivateSubnet2",
             Description='',
             Type="AWS::EC2::Subnet::Id",
-            Default=list(
-                filter(
-                    lambda x: x['OutputKey'] == "PrivateSubnet2",
-                    self.environment_stack['Outputs']
-                )
-            )[0]['OutputValue']
+            Default=self.context.environment_output("PrivateSubnet2")
         )
         self.template.add_parameter(self.private_subnet2)
         self.template.add_parameter(Parameter(
@@ -599,51 +835,35 @@ building this service",
             Type="String",
             Default="production"
         ))
-        self.alb_security_group = list(
-            filter(
-                lambda x: x['OutputKey'] == "SecurityGroupAlb",
-                self.environment_stack['Outputs']
-            )
-        )[0]['OutputValue']
+        self.alb_security_group = self.context.environment_output(
+            "SecurityGroupAlb"
+        )
 
-    def _fetch_current_desired_count(self):
-        stack_name = get_service_stack_name(self.env, self.application_name)
-        self.desired_counts = {}
-        try:
-            stack = region_service.get_client_for(
-                'cloudformation',
-                self.env
-            ).describe_stacks(StackName=stack_name)['Stacks'][0]
-            ecs_service_outputs = filter(
-                lambda x: x['OutputKey'].endswith('EcsServiceName'),
-                stack['Outputs']
+    @property
+    def env_config(self):
+        '''
+            Environment of the application's containers, read from Parameter
+            Store once (unless the context has it) and shared by all of its
+            ECS services
+        '''
+        if self._env_config is None and self.context.env_config is not None:
+            self._env_config = self.context.env_config
+        if self._env_config is None:
+            self._env_config = build_config(
+                self.env,
+                self.application_name,
+                self.env_sample_file_path,
+                with_values=not self.secrets_by_reference
             )
-            ecs_service_names = []
-            for service_name in ecs_service_outputs:
-                ecs_service_names.append({
-                    "key": service_name['OutputKey'],
-                    "value": service_name['OutputValue']
-                })
-            ecs_client = EcsClient(None, None, self.region)
-            for service_name in ecs_service_names:
-                deployment = DeployAction(
-                    ecs_client,
-                    self.cluster_name,
-                    service_name["value"]
-                )
-                actual_service_name = service_name["key"].\
-                    replace("EcsServiceName", "")
-                self.desired_counts[actual_service_name] = deployment.\
-                    service.desired_count
-            log("Existing service counts: " + str(self.desired_counts))
-        except Exception:
-            log_bold("Could not find existing services.")
-
-    def _get_desired_task_count_for_service(self, service_name):
-        if service_name in self.desired_counts:
-            return self.desired_counts[service_name]
-        else:
-            return 0
+        return self._env_config
+
+    @property
+    def secrets_by_reference(self):
+        '''
+            Containers read their environment from Parameter Store when
+            starting, instead of getting the values in the template
+        '''
+        return self.configuration.get('secrets_by_reference', False)
 
     @property
     def ecr_image_uri(self):
@@ -653,7 +873,7 @@ building this service",
 
     @property
     def account_id(self):
-        return get_account_id()
+        return self.context.account_id
 
     @property
     def repo_name(self):
@@ -667,4 +887,7 @@ building this service",
         if 'notifications_arn' in self.configuration:
             return self.configuration['notifications_arn']
         else:
-            return TemplateGenerator.notifications_arn.fget(self)
\ No newline at end of file
+            return TemplateGenerator.notifications_arn.fget(self)
+
+def _nested_stack_number(logical_id):
+    return int(logical_id[len(NESTED_STACK_PREFIX):])
@@ -1,19 +1,21 @@
 import base64
-import multiprocessing
 import os
 import subprocess
 import sys
-import boto3
-from time import sleep
+from functools import partial
 
 from botocore.exceptions import ClientError
 from stringcase import spinalcase
 
-from cloudlift.config import get_account_id
+from cloudlift.config import (ensure_max_pool_connections, get_account_id,
+                              get_client)
 from cloudlift.config import (get_client_for,
                               get_region_for_environment)
 from cloudlift.config import get_cluster_name, get_service_stack_name
+from cloudlift.config import ServiceConfiguration
 from cloudlift.deployment import deployer
+from cloudlift.deployment.deploy_executor import DeployExecutor
+from cloudlift.deployment.deployment_monitor import DeploymentMonitor
 from cloudlift.deployment.ecs import EcsClient
 from cloudlift.config.logging import log_bold, log_err, log_intent, log_warning
 
@@ -30,11 +32,12 @@ class ServiceUpdater(object):
         else:
             self.env_sample_file = './env.sample'
         self.version = version
-        self.ecr_client = boto3.session.Session(region_name=self.region).client('ecr')
+        self.ecr_client = get_client('ecr', self.region)
         self.cluster_name = get_cluster_name(environment)
         self.working_dir = working_dir
 
-    def run(self):
+    def run(self, verify_tasks=False, parallelism=None, fail_fast=False,
+            force=False):
         log_warning("Deploying to {self.region}".format(**locals()))
         self.init_stack_info()
         if not os.path.exists(self.env_sample_file):
@@ -45,39 +48,60 @@ class ServiceUpdater(object):
         log_bold("Checking image in ECR")
         self.upload_artefacts()
         log_bold("Initiating deployment\n")
+        ensure_max_pool_connections(
+            parallelism or len(self.ecs_service_names)
+        )
         ecs_client = EcsClient(None, None, self.region)
+        service_colors = {
+            service_name: DEPLOYMENT_COLORS[index % 3]
+            for index, service_name in enumerate(self.ecs_service_names)
+        }
+        deployment_monitor = DeploymentMonitor(
+            ecs_client,
+            self.cluster_name,
+            verify_tasks=verify_tasks
+        )
+        deployment_monitor.watch(service_colors)
 
-        jobs = []
-        for index, service_name in enumerate(self.ecs_service_names):
-            log_bold("Starting to deploy " + service_name)
-            color = DEPLOYMENT_COLORS[index % 3]
-            image_url = self.ecr_image_uri
-            image_url += (':' + self.version)
-            process = multiprocessing.Process(
-                target=deployer.deploy_new_version,
-                args=(
-                    ecs_client,
-                    self.cluster_name,
-                    service_name,
-                    self.version,
-                    self.name,
-                    self.env_sample_file,
-                    self.environment,
-                    color,
-                    image_url
-                )
+        secrets_by_reference = ServiceConfiguration(
+            self.name,
+            self.environment
+        ).get_config().get('secrets_by_reference', False)
+        # Every service of the application runs with the same environment,
+        # so it is read from Parameter Store and checked once.
+        env_config = deployer.build_config(
+            self.environment,
+            self.name,
+            self.env_sample_file,
+            with_values=not secrets_by_reference
+        )
+        image_url = self.ecr_image_uri + ':' + self.version
+        deployments = {
+            service_name: partial(
+                deployer.deploy_new_version,
+                ecs_client,
+                self.cluster_name,
+                service_name,
+                self.version,
+                self.name,
+                self.env_sample_file,
+                self.environment,
+                service_colors[service_name],
+                image_url,
+                False,
+                env_config,
+                secrets_by_reference,
+                force
             )
-            jobs.append(process)
-            process.start()
-
-        exit_codes = []
-        while True:
-            sleep(1)
-            exit_codes = [proc.exitcode for proc in jobs]
-            if None not in exit_codes:
-                break
+            for service_name in self.ecs_service_names
+        }
+        results = DeployExecutor(
+            deployment_monitor,
+            parallelism=parallelism,
+            fail_fast=fail_fast
+        ).run(deployments)
 
-        if any(exit_codes) != 0:
+        if not all(results.values()):
             sys.exit(1)
 
     def upload_image(self, additional_tags):
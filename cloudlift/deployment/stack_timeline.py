@@ -0,0 +1,189 @@
+'''
+Where the time of a CloudFormation stack operation went, worked out from
+the stack events seen while following it.
+'''
+
+import json
+
+from terminaltables import SingleTable
+
+from cloudlift.config.logging import log, log_bold
+
+OPERATIONS = ('CREATE', 'UPDATE', 'DELETE', 'IMPORT')
+
+TRACE_PROCESS_ID = 1
+
+
+class ResourceSpan(object):
+    '''
+        One operation on one resource, from its IN_PROGRESS event to the
+        COMPLETE or FAILED event that ended it.
+    '''
+
+    def __init__(self, logical_id, resource_type, operation, started_at):
+        self.logical_id = logical_id
+        self.resource_type = resource_type
+        self.operation = operation
+        self.started_at = started_at
+        self.finished_at = None
+        self.status = operation + '_IN_PROGRESS'
+        self.critical = False
+
+    @property
+    def duration(self):
+        if self.finished_at is None:
+            return None
+        return (self.finished_at - self.started_at).total_seconds()
+
+
+class StackTimeline(object):
+    def __init__(self, stack_name, events):
+        self.stack_name = stack_name
+        self.spans = []
+        self._build(sorted(events, key=lambda event: event['Timestamp']))
+        self._mark_critical_path()
+
+    @property
+    def resource_spans(self):
+        '''
+            Spans of the resources, without the stack itself
+        '''
+        return [
+            span for span in self.spans
+            if span.logical_id != self.stack_name
+        ]
+
+    @property
+    def started_at(self):
+        if not self.spans:
+            return None
+        return min(span.started_at for span in self.spans)
+
+    @property
+    def critical_path(self):
+        return [span for span in self.resource_spans if span.critical]
+
+    def table(self):
+        rows = [["Resource", "Type", "Status", "Start (s)", "Duration (s)",
+                 "Critical path"]]
+        spans = sorted(
+            self.spans,
+            key=lambda span: -(span.duration or 0)
+        )
+        for span in spans:
+            rows.append([
+                span.logical_id,
+                span.resource_type,
+                span.status,
+                "%d" % self._offset(span.started_at),
+                "-" if span.duration is None else "%d" % span.duration,
+                "*" if span.critical else ""
+            ])
+        return SingleTable(rows).table
+
+    def trace_events(self):
+        '''
+            The spans as Chrome trace events, one row per resource
+        '''
+        rows = {}
+        # Trace viewers expect numeric process ids; the stack name is
+        # given to the process by a metadata event instead
+        trace_events = [{
+            'name': 'process_name',
+            'ph': 'M',
+            'pid': TRACE_PROCESS_ID,
+            'args': {'name': self.stack_name}
+        }]
+        for span in self.spans:
+            if span.finished_at is None:
+                continue
+            trace_events.append({
+                'name': span.logical_id,
+                'cat': span.resource_type,
+                'ph': 'X',
+                'ts': int(self._offset(span.started_at) * 1000000),
+                'dur': int(span.duration * 1000000),
+                'pid': TRACE_PROCESS_ID,
+                'tid': rows.setdefault(span.logical_id, len(rows) + 1),
+                'args': {
+                    'status': span.status,
+                    'critical_path': span.critical
+                }
+            })
+        return {'traceEvents': trace_events, 'displayTimeUnit': 'ms'}
+
+    def _build(self, events):
+        open_spans = {}
+        for event in events:
+            status = event['ResourceStatus']
+            operation = status.split('_')[0]
+            if operation not in OPERATIONS:
+                continue
+            logical_id = event['LogicalResourceId']
+            if status == operation + '_IN_PROGRESS':
+                if (logical_id, operation) in open_spans:
+                    continue
+                span = ResourceSpan(
+                    logical_id,
+                    event.get('ResourceType', ''),
+                    operation,
+                    event['Timestamp']
+                )
+                open_spans[(logical_id, operation)] = span
+                self.spans.append(span)
+            elif status in (operation + '_COMPLETE', operation + '_FAILED'):
+                span = open_spans.pop((logical_id, operation), None)
+                if span is not None:
+                    span.finished_at = event['Timestamp']
+                    span.status = status
+
+    def _mark_critical_path(self):
+        '''
+            Stack events do not say which resources waited on which. A
+            resource usually starts as soon as the last one it depends on
+            is done, so starting from the resource that finished last, the
+            path is followed back through whichever resource finished last
+            before the current one started. A predecessor also has to start
+            strictly earlier, so a resource that took no time is never its
+            own predecessor nor that of one finishing at the same moment.
+        '''
+        finished = [
+            span for span in self.resource_spans
+            if span.finished_at is not None
+        ]
+        if not finished:
+            return
+        span = max(finished, key=lambda span: span.finished_at)
+        while span is not None:
+            span.critical = True
+            predecessors = [
+                candidate for candidate in finished
+                if candidate.finished_at <= span.started_at
+                and candidate.started_at < span.started_at
+            ]
+            span = max(
+                predecessors,
+                key=lambda candidate: candidate.finished_at
+            ) if predecessors else None
+
+    def _offset(self, timestamp):
+        return (timestamp - self.started_at).total_seconds()
+
+
+def report_stack_timeline(stack_name, events, timings=False,
+                          trace_file=None):
+    '''
+        Print the timings table and/or write the Chrome trace for the
+        stack events, as asked
+    '''
+    if not timings and not trace_file:
+        return
+    timeline = StackTimeline(stack_name, events)
+    if timings:
+        log_bold("Resource timings for " + stack_name)
+        print(timeline.table())
+    if trace_file:
+        with open(trace_file, 'w') as trace:
+            json.dump(timeline.trace_events(), trace)
+        log("Wrote trace to %s. Open it in chrome://tracing or \
+https://ui.perfetto.dev" % trace_file)
@@ -0,0 +1,112 @@
+'''
+Cache of DescribeTaskDefinition responses.
+
+A task definition revision never changes once registered, so a revision
+described once is reused for the rest of the process and, with the local
+cache enabled, by later commands. Entries never go stale; the in-memory
+cache only evicts the least recently used revisions beyond its size.
+
+Deregistering a revision does change its status, so the fields saying so
+are left out of cached payloads.
+
+Container environments hold Parameter Store values, so revisions are kept
+on disk encrypted like those values, and only in memory when they cannot
+be encrypted.
+'''
+
+import json
+import re
+import threading
+from collections import OrderedDict
+from copy import deepcopy
+
+from cloudlift.config.local_cache import (get_cache_secret,
+                                          is_encryption_available,
+                                          is_local_cache_enabled,
+                                          read_encrypted_cache,
+                                          write_encrypted_cache)
+
+TASK_DEFINITION_CACHE = 'task_definitions'
+TASK_DEFINITION_CACHE_SIZE = 256
+
+# Fields of a revision that change when it is deregistered
+_CHANGING_FIELDS = ('status', 'deregisteredAt')
+
+# Only family:revision and full revision ARNs name an immutable revision; a
+# bare family resolves to whatever revision is latest.
+_REVISION_PATTERN = re.compile(r':\d+$')
+
+
+class TaskDefinitionCache(object):
+    def __init__(self, max_size=TASK_DEFINITION_CACHE_SIZE):
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, task_definition_arn, fetch):
+        '''
+            DescribeTaskDefinition response for the revision. fetch(arn) is
+            called only when it is not cached. Callers get their own copy,
+            since deploys edit task definitions in place.
+        '''
+        if not _REVISION_PATTERN.search(task_definition_arn):
+            return fetch(task_definition_arn)
+        with self._lock:
+            if task_definition_arn in self._entries:
+                self._entries.move_to_end(task_definition_arn)
+                self.hits += 1
+                return deepcopy(self._entries[task_definition_arn])
+
+        payload = None
+        secret = _disk_cache_secret()
+        if secret is not None:
+            payload = read_encrypted_cache(
+                TASK_DEFINITION_CACHE,
+                task_definition_arn,
+                secret
+            )
+        if payload is None:
+            payload = _without_changing_fields(fetch(task_definition_arn))
+            if secret is not None:
+                write_encrypted_cache(
+                    TASK_DEFINITION_CACHE,
+                    task_definition_arn,
+                    json.loads(json.dumps(payload, default=str)),
+                    secret
+                )
+            with self._lock:
+                self.misses += 1
+        else:
+            with self._lock:
+                self.hits += 1
+        self._store(task_definition_arn, payload)
+        return deepcopy(payload)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def _store(self, task_definition_arn, payload):
+        with self._lock:
+            self._entries[task_definition_arn] = payload
+            self._entries.move_to_end(task_definition_arn)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+
+def _without_changing_fields(payload):
+    task_definition = payload.get('taskDefinition', {})
+    for field in _CHANGING_FIELDS:
+        task_definition.pop(field, None)
+    return payload
+
+
+def _disk_cache_secret():
+    if not is_local_cache_enabled() or not is_encryption_available():
+        return None
+    return get_cache_secret()
+
+
+task_definition_cache = TaskDefinitionCache()
@@ -1,7 +1,9 @@
+import json
+
+from cfn_flip import to_yaml
 from troposphere import Output, Ref, Template
 
-from cloudlift.config import region as region_service
-from cloudlift.config import get_cluster_name
+from cloudlift.config import DecimalEncoder, get_cluster_name
 
 
 class TemplateGenerator(object):
@@ -11,6 +13,8 @@ class TemplateGenerator(object):
         self.template = Template()
         self.env = env
         self.cluster_name = get_cluster_name(env)
+        # GenerationContext with the inputs read from AWS, set by subclasses
+        self.context = None
 
     def _add_stack_outputs(self):
         self.template.add_output(
@@ -29,14 +33,26 @@ circle CI environment variables to validate during deployment.",
             )
         )
 
+    def _serialize(self):
+        '''
+            The template as YAML or, with the 'json' template format, as
+            compact JSON, which keeps large templates smaller
+        '''
+        template = self.template.to_dict()
+        if self.context.template_format == 'json':
+            return json.dumps(template, cls=DecimalEncoder,
+                              separators=(',', ':'))
+        return to_yaml(json.dumps(template, cls=DecimalEncoder,
+                                  sort_keys=True))
+
     @property
     def region(self):
-        return region_service.get_region_for_environment(self.env)
+        return self.context.region
 
     @property
     def notifications_arn(self):
-        return region_service.get_notifications_arn_for_environment(self.env)
+        return self.context.notifications_arn
 
     @property
     def ssl_certificate_arn(self):
-        return region_service.get_ssl_certification_for_environment(self.env)
+        return self.context.ssl_certificate_arn
@@ -0,0 +1,135 @@
+'''
+Render service and environment templates without AWS.
+
+A snapshot file holds everything template generation reads from AWS and
+DynamoDB: the service or environment configuration and the
+GenerationContext. Rendering from it runs the same template generators
+with no network calls. Container environment values are never saved; they
+are taken from env.sample when rendering.
+'''
+
+import json
+
+from cloudlift.config import (DecimalEncoder, ServiceConfiguration,
+                              get_client_for, get_cluster_name,
+                              get_environment_snapshot)
+from cloudlift.config.logging import log_err
+from cloudlift.deployment.cluster_template_generator import ClusterTemplateGenerator
+from cloudlift.deployment.deployer import (make_container_defn_env_conf,
+                                           read_config)
+from cloudlift.deployment.generation_context import GenerationContext
+from cloudlift.deployment.service_template_generator import ServiceTemplateGenerator
+
+SNAPSHOT_FORMAT_VERSION = 1
+SERVICE = 'service'
+ENVIRONMENT = 'environment'
+
+
+class SnapshotServiceConfiguration(object):
+    '''
+        Stands in for ServiceConfiguration with configuration read from a
+        snapshot
+    '''
+
+    def __init__(self, service_name, environment, configuration):
+        self.service_name = service_name
+        self.environment = environment
+        self.configuration = configuration
+
+    def get_config(self):
+        return self.configuration
+
+
+class TemplateSnapshot(object):
+    '''
+        Inputs of one service or environment template. kind is SERVICE or
+        ENVIRONMENT.
+    '''
+
+    def __init__(self, kind, environment, configuration, context, name=None):
+        self.kind = kind
+        self.environment = environment
+        self.configuration = configuration
+        self.context = context
+        self.name = name
+
+    @classmethod
+    def capture_service(cls, name, environment):
+        environment_stack = get_client_for(
+            'cloudformation',
+            environment
+        ).describe_stacks(
+            StackName=get_cluster_name(environment)
+        )['Stacks'][0]
+        configuration = ServiceConfiguration(name, environment).get_config()
+        return cls(
+            SERVICE,
+            environment,
+            configuration,
+            GenerationContext.for_service(environment, name, environment_stack),
+            name
+        )
+
+    @classmethod
+    def capture_environment(cls, environment):
+        return cls(
+            ENVIRONMENT,
+            environment,
+            get_environment_snapshot(environment),
+            GenerationContext.for_cluster(environment)
+        )
+
+    @classmethod
+    def load(cls, path):
+        with open(path) as snapshot_file:
+            snapshot = json.load(snapshot_file)
+        if snapshot.get('format_version') != SNAPSHOT_FORMAT_VERSION:
+            log_err("Unsupported snapshot format in " + path)
+            exit(1)
+        return cls(
+            snapshot['kind'],
+            snapshot['environment'],
+            snapshot['configuration'],
+            GenerationContext.from_dict(snapshot['context']),
+            snapshot.get('name')
+        )
+
+    def save(self, path):
+        with open(path, 'w') as snapshot_file:
+            json.dump({
+                'format_version': SNAPSHOT_FORMAT_VERSION,
+                'kind': self.kind,
+                'environment': self.environment,
+                'name': self.name,
+                'configuration': self.configuration,
+                'context': self.context.to_dict(),
+            }, snapshot_file, cls=DecimalEncoder, indent=2, sort_keys=True)
+
+    def render(self, env_sample_file_path='./env.sample'):
+        if self.kind == SERVICE:
+            return self._render_service(env_sample_file_path)
+        return self._render_environment()
+
+    def _render_service(self, env_sample_file_path):
+        with open(env_sample_file_path) as env_sample:
+            sample_config = read_config(env_sample.read())
+        self.context.env_config = make_container_defn_env_conf(
+            sample_config,
+            sample_config
+        )
+        return ServiceTemplateGenerator(
+            SnapshotServiceConfiguration(
+                self.name,
+                self.environment,
+                self.configuration
+            ),
+            None,
+            self.context
+        ).generate_service()
+
+    def _render_environment(self):
+        return ClusterTemplateGenerator(
+            self.environment,
+            self.configuration,
+            context=self.context
+        ).generate_cluster()
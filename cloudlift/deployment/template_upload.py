@@ -0,0 +1,91 @@
+'''
+Hand templates to CloudFormation inline or, past the size CloudFormation
+accepts inline, through S3.
+'''
+
+from hashlib import sha256
+
+from cloudlift.config import (get_client_for, get_environment_snapshot,
+                              get_region_for_environment)
+from cloudlift.config.logging import log, log_err
+
+# CloudFormation rejects a TemplateBody larger than this; templates in S3
+# may be up to 1 MB.
+MAX_TEMPLATE_BODY_BYTES = 51200
+
+TEMPLATE_KEY_PREFIX = 'cloudlift-templates'
+
+
+def template_source(template_body, stack_name, environment):
+    '''
+        Keyword arguments that give CloudFormation the template: TemplateBody
+        when it is small enough, otherwise TemplateURL of a copy uploaded to
+        the environment's template_bucket
+    '''
+    size = len(template_body.encode('utf-8'))
+    if size <= MAX_TEMPLATE_BODY_BYTES:
+        return {'TemplateBody': template_body}
+    return {'TemplateURL': upload_template(
+        template_body,
+        stack_name,
+        environment,
+        "The template of %s is %d bytes, more than the %d bytes \
+CloudFormation accepts inline" % (stack_name, size, MAX_TEMPLATE_BODY_BYTES)
+    )}
+
+
+def upload_template(template_body, stack_name, environment, reason=None):
+    '''
+        Put the template in the environment's template_bucket, at the URL
+        template_url gives for it
+    '''
+    bucket = get_template_bucket(environment)
+    if not bucket:
+        log_err("%s. Set environment.template_bucket in the configuration \
+of %s to upload templates to S3." % (
+            reason or "The template of %s has to be uploaded" % stack_name,
+            environment
+        ))
+        exit(1)
+    body = template_body.encode('utf-8')
+    get_client_for('s3', environment).put_object(
+        Bucket=bucket,
+        Key=_template_key(body, stack_name),
+        Body=body
+    )
+    url = template_url(
+        template_body,
+        stack_name,
+        bucket,
+        get_region_for_environment(environment)
+    )
+    log("Uploaded %d byte template to %s" % (len(body), url))
+    return url
+
+
+def template_url(template_body, stack_name, bucket, region):
+    '''
+        Where upload_template puts the template. Templates are named by
+        content, so the URL is known before uploading and uploading the
+        same template again is harmless.
+    '''
+    return 'https://%s.s3.%s.amazonaws.com/%s' % (
+        bucket,
+        region,
+        _template_key(template_body.encode('utf-8'), stack_name)
+    )
+
+
+def get_template_bucket(environment):
+    return get_environment_snapshot(environment).get(
+        'environment',
+        {}
+    ).get('template_bucket')
+
+
+def _template_key(body, stack_name):
+    return '%s/%s/%s' % (
+        TEMPLATE_KEY_PREFIX,
+        stack_name,
+        sha256(body).hexdigest()
+    )
@@ -12,8 +12,12 @@ class SessionCreator(object):
     self.environment = environment
     self.sts_client = get_client_for("sts", self.environment)
 
-  def start_session(self, mfa_code):
-    mfa.do_mfa_login(mfa_code, get_region_for_environment(self.environment))
+  def start_session(self, mfa_code, mfa_duration=None):
+    mfa.do_mfa_login(
+      mfa_code,
+      get_region_for_environment(self.environment),
+      mfa_duration
+    )
     target_instance = self._get_target_instance()
     self._initiate_session(target_instance)
     exit(0)
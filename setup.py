@@ -14,6 +14,9 @@ setup(
     version=VERSION,
     packages=find_packages(),
     install_requires=requirements,
+    extras_require={
+        'cache': ['cryptography'],
+    },
     description="Cloudlift makes it easier to launch dockerized services in AWS ECS",
     long_description=long_description,
     long_description_content_type="text/markdown",
@@ -0,0 +1,47 @@
+import os
+
+import pytest
+from mock import patch
+
+from cloudlift.config import account
+
+
+@pytest.mark.usefixtures('aws_credentials')
+class TestCallerIdentity(object):
+    def setup_method(self, method):
+        account._caller_identities.clear()
+
+    def test_sts_is_called_once_per_credentials(self, tmpdir, monkeypatch,
+                                                mocked_sts_client):
+        monkeypatch.setenv('CLOUDLIFT_CACHE_DIR', str(tmpdir))
+        sts_client = mocked_sts_client()
+        with patch.object(account, 'get_client', return_value=sts_client):
+            assert account.get_account_id() == '123456789012'
+            assert account.get_username() == 'deployer'
+            assert account.get_mfa_arn() == \
+                'arn:aws:iam::123456789012:mfa/deployer'
+        assert sts_client.get_caller_identity.call_count == 1
+
+    def test_identity_is_reused_across_processes(self, tmpdir, monkeypatch,
+                                                 mocked_sts_client):
+        monkeypatch.setenv('CLOUDLIFT_CACHE_DIR', str(tmpdir))
+        with patch.object(account, 'get_client', return_value=mocked_sts_client()):
+            account.get_account_id()
+        account._caller_identities.clear()
+
+        sts_client = mocked_sts_client()
+        with patch.object(account, 'get_client', return_value=sts_client):
+            assert account.get_account_id() == '123456789012'
+        assert sts_client.get_caller_identity.call_count == 0
+
+    def test_identity_is_fetched_again_for_other_credentials(
+            self, tmpdir, monkeypatch, mocked_sts_client):
+        monkeypatch.setenv('CLOUDLIFT_CACHE_DIR', str(tmpdir))
+        with patch.object(account, 'get_client', return_value=mocked_sts_client()):
+            account.get_account_id()
+
+        sts_client = mocked_sts_client()
+        with patch.dict(os.environ, {'AWS_ACCESS_KEY_ID': 'AKIAOTHER'}):
+            with patch.object(account, 'get_client', return_value=sts_client):
+                account.get_account_id()
+        assert sts_client.get_caller_identity.call_count == 1
@@ -0,0 +1,38 @@
+import os
+
+from mock import patch
+
+from cloudlift.config import client_pool
+
+
+class TestClientPool(object):
+    def setup_method(self, method):
+        client_pool.reset_client_pool()
+
+    def test_reuses_client_for_same_service_and_region(self):
+        first = client_pool.get_client('ecs', 'ap-south-1')
+        second = client_pool.get_client('ecs', 'ap-south-1')
+        assert first is second
+        assert client_pool.get_client_pool_stats()['clients'] == 1
+
+    def test_creates_client_per_region(self):
+        mumbai = client_pool.get_client('ecs', 'ap-south-1')
+        virginia = client_pool.get_client('ecs', 'us-east-1')
+        assert mumbai is not virginia
+        assert client_pool.get_client_pool_stats()['sessions'] == 2
+
+    def test_creates_new_client_when_credentials_change(self):
+        first = client_pool.get_client('sts', 'ap-south-1')
+        with patch.dict(os.environ, {'AWS_SESSION_TOKEN': 'mfa-token'}):
+            second = client_pool.get_client('sts', 'ap-south-1')
+        assert first is not second
+
+    def test_uses_configured_max_pool_connections(self):
+        client_pool.configure_client_pool(25)
+        try:
+            client = client_pool.get_client('ssm', 'ap-south-1')
+            assert client.meta.config.max_pool_connections == 25
+        finally:
+            client_pool.configure_client_pool(
+                client_pool.DEFAULT_MAX_POOL_CONNECTIONS
+            )
@@ -0,0 +1,34 @@
+import datetime
+
+import pytest
+from dateutil.tz import tzutc
+from mock import MagicMock
+
+
+@pytest.fixture
+def aws_credentials(monkeypatch):
+    monkeypatch.setenv('AWS_ACCESS_KEY_ID', 'testing')
+    monkeypatch.setenv('AWS_SECRET_ACCESS_KEY', 'testing')
+    monkeypatch.delenv('AWS_SESSION_TOKEN', raising=False)
+
+
+@pytest.fixture
+def mocked_sts_client():
+    def make_sts_client(expires_in_seconds=3600):
+        sts_client = MagicMock()
+        sts_client.get_caller_identity.return_value = {
+            'Account': '123456789012',
+            'Arn': 'arn:aws:iam::123456789012:user/deployer',
+            'UserId': 'AIDAEXAMPLE'
+        }
+        sts_client.get_session_token.return_value = {
+            'Credentials': {
+                'AccessKeyId': 'ASIAEXAMPLE',
+                'SecretAccessKey': 'secret',
+                'SessionToken': 'token',
+                'Expiration': datetime.datetime.now(tz=tzutc()) +
+                datetime.timedelta(seconds=expires_in_seconds)
+            }
+        }
+        return sts_client
+    return make_sts_client
@@ -1,7 +1,9 @@
 import boto3
 from moto import mock_dynamodb2
 
-from cloudlift.config import EnvironmentConfiguration
+from cloudlift.config import (EnvironmentConfiguration,
+                              clear_environment_snapshots,
+                              get_environment_snapshot)
 
 
 class TestEnvironmentConfiguration(object):
@@ -240,3 +242,34 @@ class TestEnvironmentConfiguration(object):
                 }
             }
         }
+
+    @mock_dynamodb2
+    def test_environment_snapshot_is_read_once(self):
+        clear_environment_snapshots()
+        self.setup_existing_params()
+
+        assert get_environment_snapshot('dummy-staging')['region'] == 'ap-south-1'
+        boto3.resource('dynamodb').Table('environment_configurations').update_item(
+            Key={'environment': 'dummy-staging'},
+            UpdateExpression='SET configuration.#env.#region = :region',
+            ExpressionAttributeNames={'#env': 'dummy-staging', '#region': 'region'},
+            ExpressionAttributeValues={':region': 'us-east-1'}
+        )
+        assert get_environment_snapshot('dummy-staging')['region'] == 'ap-south-1'
+
+        clear_environment_snapshots()
+        assert get_environment_snapshot('dummy-staging')['region'] == 'us-east-1'
+
+    @mock_dynamodb2
+    def test_set_config_refreshes_environment_snapshot(self):
+        clear_environment_snapshots()
+        self.setup_existing_params()
+
+        store_object = EnvironmentConfiguration('dummy-staging')
+        configuration = store_object.get_config()
+        assert get_environment_snapshot('dummy-staging')['cluster']['instance_type'] == 'm5.xlarge'
+        configuration['dummy-staging']['cluster']['instance_type'] = 't2.large'
+        configuration['dummy-staging']['cluster']['min_instances'] = 5
+        configuration['dummy-staging']['cluster']['max_instances'] = 10
+        store_object._set_config(configuration)
+        assert get_environment_snapshot('dummy-staging')['cluster']['instance_type'] == 't2.large'
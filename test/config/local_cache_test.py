@@ -0,0 +1,70 @@
+import decimal
+import os
+import stat
+
+import pytest
+
+from cloudlift.config import local_cache
+
+
+class TestLocalCache(object):
+    def setup_method(self, method):
+        self.settings = dict(local_cache.CACHE_SETTINGS)
+        local_cache.configure_local_cache(enabled=True, offline=False)
+
+    def teardown_method(self, method):
+        local_cache.CACHE_SETTINGS.update(self.settings)
+
+    def test_write_and_read(self, tmpdir, monkeypatch):
+        monkeypatch.setenv('CLOUDLIFT_CACHE_DIR', str(tmpdir))
+        local_cache.write_cache('things', 'key', {'count': 3})
+        assert local_cache.read_cache('things', 'key') == {'count': 3}
+        assert local_cache.read_cache('things', 'key', use_decimal=True) == \
+            {'count': decimal.Decimal(3)}
+        entry_path = local_cache._entry_path('things', 'key')
+        assert stat.S_IMODE(os.stat(entry_path).st_mode) == 0o600
+
+    def test_expired_entries_are_ignored(self, tmpdir, monkeypatch):
+        monkeypatch.setenv('CLOUDLIFT_CACHE_DIR', str(tmpdir))
+        local_cache.write_cache('things', 'key', 'value', ttl=-1)
+        assert local_cache.read_cache('things', 'key') is None
+
+    def test_versioned_value_is_refetched_when_version_changes(self, tmpdir, monkeypatch):
+        monkeypatch.setenv('CLOUDLIFT_CACHE_DIR', str(tmpdir))
+        fetches = []
+
+        def fetch():
+            fetches.append(1)
+            return 1, {'value': 'first'}
+
+        assert local_cache.get_versioned('things', 'key', lambda: 1, fetch) == {'value': 'first'}
+        assert local_cache.get_versioned('things', 'key', lambda: 1, fetch) == {'value': 'first'}
+        assert len(fetches) == 1
+        local_cache.get_versioned('things', 'key', lambda: 2, fetch)
+        assert len(fetches) == 2
+
+    def test_offline_uses_cache_without_version_check(self, tmpdir, monkeypatch):
+        monkeypatch.setenv('CLOUDLIFT_CACHE_DIR', str(tmpdir))
+        local_cache.store_versioned('things', 'key', 1, 'cached')
+        local_cache.configure_local_cache(offline=True)
+
+        def fail():
+            raise AssertionError('AWS must not be called offline')
+
+        assert local_cache.get_versioned('things', 'key', fail, fail) == 'cached'
+        with pytest.raises(SystemExit):
+            local_cache.get_versioned('things', 'missing', fail, fail)
+
+    def test_encrypted_entries_need_the_same_secret(self, tmpdir, monkeypatch):
+        monkeypatch.setenv('CLOUDLIFT_CACHE_DIR', str(tmpdir))
+        local_cache.write_encrypted_cache('secrets', 'key', {'TOKEN': 'hunter2'}, 'secret')
+        with open(local_cache._entry_path('secrets', 'key')) as entry_file:
+            assert 'hunter2' not in entry_file.read()
+        assert local_cache.read_encrypted_cache('secrets', 'key', 'secret') == {'TOKEN': 'hunter2'}
+        assert local_cache.read_encrypted_cache('secrets', 'key', 'other') is None
+
+    def test_clear_cache(self, tmpdir, monkeypatch):
+        monkeypatch.setenv('CLOUDLIFT_CACHE_DIR', str(tmpdir.join('cache')))
+        local_cache.write_cache('things', 'key', 'value')
+        local_cache.clear_cache()
+        assert local_cache.read_cache('things', 'key') is None
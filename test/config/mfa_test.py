@@ -0,0 +1,34 @@
+import pytest
+from mock import patch
+
+from cloudlift.config import account, mfa
+
+
+@pytest.mark.usefixtures('aws_credentials')
+class TestMfaCredentials(object):
+    def setup_method(self, method):
+        account._caller_identities.clear()
+
+    def test_credentials_are_reused_until_expiry(self, tmpdir, monkeypatch,
+                                                 mocked_sts_client):
+        monkeypatch.setenv('CLOUDLIFT_CACHE_DIR', str(tmpdir))
+        sts_client = mocked_sts_client()
+        with patch.object(account, 'get_client', return_value=sts_client):
+            with patch.object(mfa, 'get_client', return_value=sts_client):
+                first = mfa.get_mfa_credentials('123456', duration=3600)
+                second = mfa.get_mfa_credentials()
+        assert first == second
+        assert sts_client.get_session_token.call_count == 1
+        assert sts_client.get_session_token.call_args[1]['DurationSeconds'] == 3600
+        assert sts_client.get_session_token.call_args[1]['SerialNumber'] == \
+            'arn:aws:iam::123456789012:mfa/deployer'
+
+    def test_credentials_close_to_expiry_are_not_reused(
+            self, tmpdir, monkeypatch, mocked_sts_client):
+        monkeypatch.setenv('CLOUDLIFT_CACHE_DIR', str(tmpdir))
+        sts_client = mocked_sts_client(expires_in_seconds=60)
+        with patch.object(account, 'get_client', return_value=sts_client):
+            with patch.object(mfa, 'get_client', return_value=sts_client):
+                mfa.get_mfa_credentials('123456')
+                mfa.get_mfa_credentials('654321')
+        assert sts_client.get_session_token.call_count == 2
@@ -1,8 +1,11 @@
 import boto3
 import pytest
+from botocore.exceptions import ClientError
+from mock import patch
 from moto import mock_dynamodb2, mock_ssm
 
 from cloudlift.config import ParameterStore
+from cloudlift.config import local_cache
 
 
 class TestParameterStore(object):
@@ -36,7 +39,7 @@ class TestParameterStore(object):
             UpdateExpression='SET configuration = :configuration',
             ExpressionAttributeValues={
                 ':configuration': {
-                    "staging": {
+                    "dummy-staging": {
                         "cluster": {
                             "instance_type": "m5.xlarge",
                             "key_name": "staging-cluster-v3",
@@ -83,9 +86,14 @@ class TestParameterStore(object):
         for i in range(14):
             client.put_parameter(Name="/dummy-staging/test-service/DUMMY_VAR"+str(i), Value="dummy_values_"+str(i), Type="SecureString", KeyId='alias/aws/ssm', Overwrite=False)
 
+    def parameter_store(self):
+        with patch('cloudlift.config.parameter_store.get_client_for',
+                   return_value=boto3.client('ssm')):
+            return ParameterStore('test-service', 'dummy-staging')
+
     @mock_dynamodb2
     def test_initialization(self):
-        store_object = ParameterStore('test-service', 'dummy-staging')
+        store_object = self.parameter_store()
         assert store_object.environment == 'dummy-staging'
         assert store_object.service_name == 'test-service'
         assert store_object.path_prefix == '/dummy-staging/test-service/'
@@ -95,7 +103,7 @@ class TestParameterStore(object):
     def test_get_existing_config(self):
         self.setup_existing_params()
 
-        store_object = ParameterStore('test-service', 'dummy-staging')
+        store_object = self.parameter_store()
         response = store_object.get_existing_config()
         assert response == {u'DUMMY_VAR12': u'dummy_values_12', u'DUMMY_VAR13': u'dummy_values_13', u'DUMMY_VAR10': u'dummy_values_10', u'DUMMY_VAR11': u'dummy_values_11', u'DUMMY_VAR8': u'dummy_values_8', u'DUMMY_VAR9': u'dummy_values_9', u'DUMMY_VAR0': u'dummy_values_0', u'DUMMY_VAR1': u'dummy_values_1', u'DUMMY_VAR2': u'dummy_values_2', u'DUMMY_VAR3': u'dummy_values_3', u'DUMMY_VAR4': u'dummy_values_4', u'DUMMY_VAR5': u'dummy_values_5', u'DUMMY_VAR6': u'dummy_values_6', u'DUMMY_VAR7': u'dummy_values_7'}
 
@@ -104,10 +112,34 @@ class TestParameterStore(object):
     def test_get_existing_config_as_string(self):
         self.setup_existing_params()
 
-        store_object = ParameterStore('test-service', 'dummy-staging')
+        store_object = self.parameter_store()
         response = store_object.get_existing_config_as_string()
         assert response == 'DUMMY_VAR0=dummy_values_0\nDUMMY_VAR1=dummy_values_1\nDUMMY_VAR10=dummy_values_10\nDUMMY_VAR11=dummy_values_11\nDUMMY_VAR12=dummy_values_12\nDUMMY_VAR13=dummy_values_13\nDUMMY_VAR2=dummy_values_2\nDUMMY_VAR3=dummy_values_3\nDUMMY_VAR4=dummy_values_4\nDUMMY_VAR5=dummy_values_5\nDUMMY_VAR6=dummy_values_6\nDUMMY_VAR7=dummy_values_7\nDUMMY_VAR8=dummy_values_8\nDUMMY_VAR9=dummy_values_9'
 
+    @mock_ssm
+    @mock_dynamodb2
+    def test_get_config_for_keys(self):
+        self.setup_existing_params()
+
+        store_object = self.parameter_store()
+        keys = ['DUMMY_VAR' + str(i) for i in range(12)] + ['MISSING_VAR']
+        with patch.object(store_object.client, 'get_parameters',
+                          wraps=store_object.client.get_parameters) as get_parameters:
+            response = store_object.get_config(keys)
+
+        assert response == {'DUMMY_VAR' + str(i): 'dummy_values_' + str(i) for i in range(12)}
+        assert get_parameters.call_count == 2
+        assert all(len(call[1]['Names']) <= 10 for call in get_parameters.call_args_list)
+
+    @mock_ssm
+    @mock_dynamodb2
+    def test_get_existing_keys(self):
+        self.setup_existing_params()
+        boto3.client('ssm').put_parameter(Name="/dummy-staging/other-service/OTHER_VAR", Value="other", Type="String")
+
+        store_object = self.parameter_store()
+        assert store_object.get_existing_keys() == {'DUMMY_VAR' + str(i) for i in range(14)}
+
     @mock_ssm
     @mock_dynamodb2
     def test_set_config(self):
@@ -118,11 +150,94 @@ class TestParameterStore(object):
             ['add', '', [('DUMMY_VAR20', 'test_add_20'), ('DUMMY_VAR21', 'test_add_21')]],
             ['remove', '', [('DUMMY_VAR13', 'dummy_values_13'), ('DUMMY_VAR10', 'dummy_values_10')]]
         ]
-        store_object = ParameterStore('test-service', 'dummy-staging')
+        store_object = self.parameter_store()
         store_object.set_config(differences)
         response = store_object.get_existing_config()
         assert response == {u'DUMMY_VAR12': u'test_change', u'DUMMY_VAR11': u'dummy_values_11', u'DUMMY_VAR8': u'dummy_values_8', u'DUMMY_VAR9': u'dummy_values_9', u'DUMMY_VAR0': u'dummy_values_0', u'DUMMY_VAR1': u'dummy_values_1', u'DUMMY_VAR2': u'dummy_values_2', u'DUMMY_VAR3': u'dummy_values_3', u'DUMMY_VAR4': u'dummy_values_4', u'DUMMY_VAR5': u'dummy_values_5', u'DUMMY_VAR6': u'dummy_values_6', u'DUMMY_VAR7': u'dummy_values_7', u'DUMMY_VAR20': u'test_add_20', u'DUMMY_VAR21': u'test_add_21'}
 
+    @mock_ssm
+    @mock_dynamodb2
+    def test_cached_values_are_refetched_only_when_their_version_changes(self, tmpdir, monkeypatch):
+        monkeypatch.setenv('CLOUDLIFT_CACHE_DIR', str(tmpdir))
+        monkeypatch.setitem(local_cache.CACHE_SETTINGS, 'enabled', True)
+        self.setup_existing_params()
+
+        first = self.parameter_store()
+        assert len(first.get_existing_config()) == 14
+
+        boto3.client('ssm').put_parameter(Name="/dummy-staging/test-service/DUMMY_VAR3", Value="changed", Type="SecureString", Overwrite=True)
+        second = self.parameter_store()
+        with patch.object(second.client, 'get_parameters',
+                          wraps=second.client.get_parameters) as get_parameters, \
+                patch.object(second.client, 'get_parameters_by_path') as get_parameters_by_path:
+            response = second.get_existing_config()
+
+        assert response['DUMMY_VAR3'] == 'changed'
+        assert response['DUMMY_VAR4'] == 'dummy_values_4'
+        assert not get_parameters_by_path.called
+        get_parameters.assert_called_once_with(
+            Names=['/dummy-staging/test-service/DUMMY_VAR3'],
+            WithDecryption=True
+        )
+
+    @mock_ssm
+    @mock_dynamodb2
+    def test_set_config_deletes_in_batches_of_ten(self):
+        self.setup_existing_params()
+
+        differences = [
+            ['remove', '', [('DUMMY_VAR' + str(i), 'dummy_values_' + str(i)) for i in range(12)]]
+        ]
+        store_object = self.parameter_store()
+        with patch.object(store_object.client, 'delete_parameters',
+                          wraps=store_object.client.delete_parameters) as delete_parameters:
+            store_object.set_config(differences)
+
+        assert [len(call[1]['Names']) for call in delete_parameters.call_args_list] == [10, 2]
+        assert store_object.get_existing_config() == {u'DUMMY_VAR12': u'dummy_values_12', u'DUMMY_VAR13': u'dummy_values_13'}
+
+    @mock_ssm
+    @mock_dynamodb2
+    def test_set_config_retries_throttled_writes(self):
+        self.setup_existing_params()
+
+        store_object = self.parameter_store()
+        put_parameter = store_object.client.put_parameter
+        throttled = ClientError({'Error': {'Code': 'ThrottlingException', 'Message': 'Rate exceeded'}}, 'PutParameter')
+        responses = [throttled]
+
+        def throttled_once(**kwargs):
+            if responses:
+                raise responses.pop()
+            return put_parameter(**kwargs)
+
+        with patch.object(store_object.client, 'put_parameter',
+                          side_effect=throttled_once) as mocked_put_parameter, \
+                patch('cloudlift.config.parameter_store.sleep') as sleep:
+            store_object.set_config([['change', 'DUMMY_VAR12', ('dummy_values_12', 'test_change')]])
+
+        assert mocked_put_parameter.call_count == 2
+        assert sleep.call_count == 1
+        assert store_object.get_existing_config()['DUMMY_VAR12'] == 'test_change'
+
+    @mock_ssm
+    @mock_dynamodb2
+    def test_set_config_reports_failed_writes(self, capsys):
+        self.setup_existing_params()
+
+        differences = [
+            ['add', '', [('DUMMY_VAR0', 'duplicate'), ('DUMMY_VAR20', 'test_add_20')]]
+        ]
+        store_object = self.parameter_store()
+        with pytest.raises(SystemExit) as pytest_wrapped_e:
+            store_object.set_config(differences)
+
+        captured = capsys.readouterr()
+        assert "Saved 1 of 2 parameter changes" in captured.out
+        assert "Could not update DUMMY_VAR0" in captured.out
+        assert pytest_wrapped_e.value.code == 1
+        assert store_object.get_existing_config()['DUMMY_VAR20'] == 'test_add_20'
+
     @mock_ssm
     @mock_dynamodb2
     def test_set_config_validation(self, capsys):
@@ -133,7 +248,7 @@ class TestParameterStore(object):
             ['change', 'DUMMY_VAR12', ('dummy_values_12', '')],
             ['add', '', [('DUMMY_VAR22', ''),('DUMMY_VAR*', 'valid_value')]]
         ]
-        store_object = ParameterStore('test-service', 'dummy-staging')
+        store_object = self.parameter_store()
         with pytest.raises(SystemExit) as pytest_wrapped_e:
             store_object.set_config(invalid_differences)
         captured = capsys.readouterr()
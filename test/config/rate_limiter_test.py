@@ -0,0 +1,51 @@
+import threading
+
+from mock import patch
+
+from cloudlift.config import rate_limiter
+from cloudlift.config.rate_limiter import TokenBucket
+
+
+class FakeClock(object):
+    def __init__(self):
+        self.now = 0.0
+        self.sleeps = []
+
+    def monotonic(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+
+class TestTokenBucket(object):
+    def test_allows_burst_up_to_capacity(self):
+        clock = FakeClock()
+        with patch.object(rate_limiter.time, 'monotonic', clock.monotonic), \
+                patch.object(rate_limiter.time, 'sleep', clock.sleep):
+            bucket = TokenBucket(5)
+            for _ in range(5):
+                bucket.acquire()
+        assert clock.sleeps == []
+
+    def test_waits_for_tokens_once_empty(self):
+        clock = FakeClock()
+        with patch.object(rate_limiter.time, 'monotonic', clock.monotonic), \
+                patch.object(rate_limiter.time, 'sleep', clock.sleep):
+            bucket = TokenBucket(2, capacity=1)
+            bucket.acquire()
+            bucket.acquire()
+            bucket.acquire()
+        assert clock.now == 1.0
+
+    def test_is_shared_between_threads(self):
+        bucket = TokenBucket(0.001, capacity=20)
+        threads = [
+            threading.Thread(target=bucket.acquire) for _ in range(20)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        assert bucket._tokens < 1
@@ -6,7 +6,38 @@ from cloudlift.version import VERSION
 
 
 class TestServiceConfiguration(object):
+    def setup_environment_config(self):
+        client = boto3.resource('dynamodb')
+        client.create_table(
+            TableName='environment_configurations',
+            AttributeDefinitions=[
+                {
+                    'AttributeName': 'environment',
+                    'AttributeType': 'S',
+                }
+            ],
+            KeySchema=[
+                {
+                    'AttributeName': 'environment',
+                    'KeyType': 'HASH',
+                }
+            ],
+            ProvisionedThroughput={
+                'ReadCapacityUnits': 10,
+                'WriteCapacityUnits': 10
+            }
+        )
+        client.Table('environment_configurations').put_item(Item={
+            'environment': 'dummy-staging',
+            'configuration': {
+                'dummy-staging': {
+                    'region': 'ap-south-1'
+                }
+            }
+        })
+
     def setup_existing_params(self):
+        self.setup_environment_config()
         client = boto3.resource('dynamodb')
         client.create_table(
             TableName='service_configurations',
@@ -64,6 +95,7 @@ class TestServiceConfiguration(object):
 
     @mock_dynamodb2
     def test_initialization(self):
+        self.setup_environment_config()
         store_object = ServiceConfiguration('test-service', 'dummy-staging')
         assert store_object.environment == 'dummy-staging'
         assert store_object.service_name == 'test-service'
@@ -113,3 +145,13 @@ class TestServiceConfiguration(object):
                         }
                     }
                 }
+
+    @mock_dynamodb2
+    def test_set_config_bumps_config_version(self):
+        self.setup_existing_params()
+
+        store_object = ServiceConfiguration('test-service', 'dummy-staging')
+        store_object.set_config(store_object.get_config())
+        assert store_object._fetch_config_version() == 1
+        store_object.set_config(store_object.get_config())
+        assert store_object._fetch_config_version() == 2
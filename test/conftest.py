@@ -0,0 +1,19 @@
+import pytest
+
+from cloudlift.config.client_pool import reset_client_pool
+from cloudlift.config.environment_configuration import \
+    clear_environment_snapshots
+
+
+@pytest.fixture(autouse=True)
+def fresh_aws_state():
+    '''
+        Environment configuration and clients are shared across a process,
+        so a test would otherwise see the tables and sessions of the moto
+        mock of an earlier one
+    '''
+    clear_environment_snapshots()
+    reset_client_pool()
+    yield
+    clear_environment_snapshots()
+    reset_client_pool()
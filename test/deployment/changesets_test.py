@@ -0,0 +1,85 @@
+import json
+
+from cfn_flip import to_yaml
+from mock import MagicMock
+
+from cloudlift.deployment.changesets import is_stack_up_to_date
+
+TEMPLATE = {
+    'Parameters': {
+        'Environment': {'Type': 'String'},
+    },
+    'Resources': {
+        'Topic': {
+            'Type': 'AWS::SNS::Topic',
+            'Properties': {'TopicName': 'alerts'},
+        },
+    },
+}
+
+
+def deployed_stack(template=TEMPLATE, environment='staging'):
+    client = MagicMock()
+    # boto3 parses JSON template bodies
+    client.get_template.return_value = {
+        'TemplateBody': json.loads(json.dumps(template))
+    }
+    client.describe_stacks.return_value = {'Stacks': [{
+        'StackName': 'staging-dummy',
+        'Parameters': [
+            {'ParameterKey': 'Environment', 'ParameterValue': environment}
+        ]
+    }]}
+    return client
+
+
+class TestIsStackUpToDate(object):
+    def test_same_template_and_parameters(self):
+        client = deployed_stack()
+        # Formatting and key order do not matter
+        template_body = json.dumps(
+            {'Resources': TEMPLATE['Resources'],
+             'Parameters': TEMPLATE['Parameters']},
+            indent=4
+        )
+
+        assert is_stack_up_to_date(client, template_body, 'staging-dummy',
+                                   '', 'staging')
+        client.get_template.assert_called_with(
+            StackName='staging-dummy',
+            TemplateStage='Original'
+        )
+
+    def test_changed_template(self):
+        client = deployed_stack()
+        template = json.loads(json.dumps(TEMPLATE))
+        template['Resources']['Topic']['Properties']['TopicName'] = 'other'
+
+        assert not is_stack_up_to_date(client, json.dumps(template),
+                                       'staging-dummy', '', 'staging')
+        client.describe_stacks.assert_not_called()
+
+    def test_changed_parameters(self):
+        client = deployed_stack(environment='production')
+
+        assert not is_stack_up_to_date(client, json.dumps(TEMPLATE),
+                                       'staging-dummy', '', 'staging')
+
+    def test_missing_key_pair_parameter(self):
+        client = deployed_stack()
+
+        assert not is_stack_up_to_date(client, json.dumps(TEMPLATE),
+                                       'staging-dummy', 'key', 'staging')
+
+    def test_yaml_template_matches_deployed_json(self):
+        client = deployed_stack()
+
+        assert is_stack_up_to_date(client, to_yaml(json.dumps(TEMPLATE)),
+                                   'staging-dummy', '', 'staging')
+
+    def test_unreadable_templates_are_never_up_to_date(self):
+        client = deployed_stack()
+        client.get_template.return_value = {'TemplateBody': '{not a template'}
+
+        assert not is_stack_up_to_date(client, '{not a template',
+                                       'staging-dummy', '', 'staging')
@@ -0,0 +1,119 @@
+import threading
+
+from mock import MagicMock
+
+from cloudlift.deployment.deploy_executor import DeployExecutor
+from cloudlift.deployment.deployer import UNCHANGED
+from cloudlift.deployment.poller import Poller
+
+
+class FakeMonitor(object):
+    '''
+        Stands in for DeploymentMonitor: a started service finishes on the
+        next poll with the outcome given for it
+    '''
+
+    def __init__(self, outcomes):
+        self.outcomes = outcomes
+        self.started = []
+        self.results = {}
+        self._active = []
+
+    def start(self, service_name):
+        self.started.append(service_name)
+        self._active.append(service_name)
+
+    def forget(self, service_name):
+        self._active.remove(service_name)
+
+    def poll(self):
+        for service_name in self._active:
+            self.results[service_name] = self.outcomes[service_name]
+        changed = bool(self._active)
+        self._active = []
+        return changed
+
+    @property
+    def active_services(self):
+        return list(self._active)
+
+
+def executor(monitor, **options):
+    return DeployExecutor(
+        monitor,
+        poller=Poller("Deployment", initial_interval=0),
+        **options
+    )
+
+
+class TestDeployExecutor(object):
+    def test_deploys_all_services_from_threads(self):
+        threads = set()
+
+        def deploy():
+            threads.add(threading.current_thread().name)
+            return True
+
+        monitor = FakeMonitor({'web': True, 'worker': True})
+        results = executor(monitor).run({'web': deploy, 'worker': deploy})
+
+        assert results == {'web': True, 'worker': True}
+        assert sorted(monitor.started) == ['web', 'worker']
+        assert threading.current_thread().name not in threads
+
+    def test_parallelism_limits_services_in_flight(self):
+        in_flight = []
+        peak = [0]
+
+        class CountingMonitor(FakeMonitor):
+            def start(self, service_name):
+                FakeMonitor.start(self, service_name)
+                in_flight.append(service_name)
+                peak[0] = max(peak[0], len(in_flight))
+
+            def poll(self):
+                del in_flight[:]
+                return FakeMonitor.poll(self)
+
+        names = ['service%d' % index for index in range(5)]
+        monitor = CountingMonitor({name: True for name in names})
+        results = executor(monitor, parallelism=2).run(
+            {name: MagicMock(return_value=True) for name in names}
+        )
+
+        assert results == {name: True for name in names}
+        assert peak[0] <= 2
+
+    def test_failed_update_is_reported_without_polling(self):
+        def failing_deploy():
+            raise SystemExit(1)
+
+        monitor = FakeMonitor({'web': True, 'worker': True})
+        results = executor(monitor).run({
+            'web': MagicMock(return_value=True),
+            'worker': failing_deploy
+        })
+
+        assert results == {'web': True, 'worker': False}
+        assert monitor.started == ['web']
+
+    def test_fail_fast_cancels_remaining_services(self):
+        worker_deploy = MagicMock(return_value=True)
+
+        monitor = FakeMonitor({'web': False, 'worker': True})
+        results = executor(monitor, parallelism=1, fail_fast=True).run({
+            'web': MagicMock(return_value=True),
+            'worker': worker_deploy
+        })
+
+        assert results == {'web': False, 'worker': None}
+        assert not worker_deploy.called
+
+    def test_unchanged_services_are_not_polled(self):
+        monitor = FakeMonitor({'web': True})
+        results = executor(monitor).run({
+            'web': MagicMock(return_value=UNCHANGED)
+        })
+
+        assert results == {'web': True}
+        assert monitor.started == []
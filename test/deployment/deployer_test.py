@@ -0,0 +1,84 @@
+from mock import MagicMock, patch
+
+from cloudlift.config import ParameterStore
+from cloudlift.deployment import deployer
+
+
+class TestDeployNewVersion(object):
+    def test_uses_resolved_env_config_without_reading_parameter_store(self):
+        deployment = MagicMock()
+        deployment.service.desired_count = 2
+        task_definition = MagicMock()
+        task_definition.containers = [{'name': 'web'}]
+        task_definition.changed = True
+        deployment.get_current_task_definition.return_value = task_definition
+        env_config = [('VAR1', 'val1')]
+
+        with patch.object(deployer, 'DeployAction', return_value=deployment), \
+                patch.object(deployer, 'print_task_diff'), \
+                patch.object(ParameterStore, 'get_existing_config') as get_config:
+            deployed = deployer.deploy_new_version(
+                MagicMock(), 'cluster-staging', 'DummyWeb', 'v1', 'dummy',
+                './env.sample', 'staging', wait=False, env_config=env_config
+            )
+
+        assert deployed
+        assert not get_config.called
+        task_definition.apply_container_environment.assert_called_with(
+            {'name': 'web'},
+            env_config
+        )
+        deployment.deploy.assert_called_with(
+            deployment.update_task_definition.return_value
+        )
+
+    def test_secrets_by_reference_points_containers_at_parameters(self):
+        deployment = MagicMock()
+        deployment.service.desired_count = 1
+        task_definition = MagicMock()
+        task_definition.containers = [{'name': 'web'}]
+        task_definition.execution_role_arn = 'arn:aws:iam::123456789012:role/execution'
+        deployment.get_current_task_definition.return_value = task_definition
+
+        with patch.object(deployer, 'DeployAction', return_value=deployment), \
+                patch.object(deployer, 'print_task_diff'), \
+                patch.object(ParameterStore, '__init__', return_value=None), \
+                patch.object(ParameterStore, 'get_parameter_arn', side_effect=lambda key: 'arn/' + key), \
+                patch.object(ParameterStore, 'get_config') as get_config:
+            deployer.deploy_new_version(
+                MagicMock(), 'cluster-staging', 'DummyWeb', 'v1', 'dummy',
+                './env.sample', 'staging', wait=False,
+                env_config=[('VAR1', None)], secrets_by_reference=True
+            )
+
+        assert not get_config.called
+        assert not task_definition.apply_container_environment.called
+        task_definition.apply_container_secrets.assert_called_with(
+            {'name': 'web'},
+            [('VAR1', 'arn/VAR1')]
+        )
+
+    def test_skips_registration_when_nothing_changed(self):
+        deployment = MagicMock()
+        deployment.service.desired_count = 2
+        task_definition = MagicMock()
+        task_definition.containers = [{'name': 'web'}]
+        task_definition.changed = False
+        deployment.get_current_task_definition.return_value = task_definition
+
+        def deploy(force):
+            with patch.object(deployer, 'DeployAction', return_value=deployment), \
+                    patch.object(deployer, 'print_task_diff'):
+                return deployer.deploy_new_version(
+                    MagicMock(), 'cluster-staging', 'DummyWeb', 'v1', 'dummy',
+                    './env.sample', 'staging', wait=False,
+                    env_config=[('VAR1', 'val1')], force=force
+                )
+
+        assert deploy(force=False) == deployer.UNCHANGED
+        assert not deployment.update_task_definition.called
+        assert not deployment.deploy.called
+
+        assert deploy(force=True) is True
+        assert deployment.update_task_definition.called
+        assert deployment.deploy.called
@@ -0,0 +1,65 @@
+import datetime
+
+from dateutil.tz import tzlocal
+from mock import MagicMock, patch
+
+from cloudlift.deployment.deployment_monitor import DeploymentMonitor
+from cloudlift.deployment.ecs import EcsAction
+from cloudlift.deployment.poller import Poller
+
+
+def service_definition(name):
+    started_at = datetime.datetime.now(tz=tzlocal())
+    return {
+        'serviceName': name,
+        'desiredCount': 1,
+        'events': [],
+        'deployments': [{
+            'status': 'PRIMARY',
+            'createdAt': started_at,
+            'updatedAt': started_at
+        }]
+    }
+
+
+def mocked_ecs_client():
+    client = MagicMock()
+    client.describe_service_batch.side_effect = \
+        lambda cluster_name, service_names: {
+            'services': [service_definition(name) for name in service_names]
+        }
+    return client
+
+
+class TestDeploymentMonitor(object):
+    def test_polls_services_in_batches_of_ten(self):
+        client = mocked_ecs_client()
+        service_names = ['service%d' % index for index in range(12)]
+        monitor = DeploymentMonitor(client, 'cluster-staging')
+        monitor.watch({name: 'white' for name in service_names})
+        assert client.describe_service_batch.call_count == 2
+        for name in service_names:
+            monitor.start(name)
+
+        with patch.object(EcsAction, 'is_deployed', return_value=True):
+            results = monitor.wait(Poller("Deployment", initial_interval=0))
+
+        assert client.describe_service_batch.call_count == 4
+        assert results == {name: True for name in service_names}
+
+    def test_only_active_services_are_polled(self):
+        client = mocked_ecs_client()
+        monitor = DeploymentMonitor(client, 'cluster-staging')
+        monitor.watch({'web': 'white', 'worker': 'blue', 'cron': 'cyan'})
+        monitor.start('web')
+        monitor.start('worker')
+        monitor.forget('worker')
+
+        with patch.object(EcsAction, 'is_deployed', return_value=True):
+            results = monitor.wait(Poller("Deployment", initial_interval=0))
+
+        client.describe_service_batch.assert_called_with(
+            'cluster-staging',
+            ['web']
+        )
+        assert results == {'web': True}
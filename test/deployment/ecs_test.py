@@ -0,0 +1,148 @@
+from mock import MagicMock
+
+from cloudlift.deployment.ecs import (EcsAction, EcsClient, EcsService,
+                                     EcsTaskDefinition)
+
+
+def ecs_service(deployments, desired_count=2):
+    return EcsService('cluster-staging', {
+        'serviceName': 'web',
+        'desiredCount': desired_count,
+        'taskDefinition': 'arn:aws:ecs:ap-south-1:123456789012:task-definition/web:2',
+        'deployments': deployments,
+        'events': []
+    })
+
+
+def primary_deployment(running_count, **kwargs):
+    deployment = {
+        'status': 'PRIMARY',
+        'desiredCount': 2,
+        'runningCount': running_count
+    }
+    deployment.update(kwargs)
+    return deployment
+
+
+class TestIsDeployed(object):
+    def test_deployed_when_primary_runs_desired_count(self):
+        client = MagicMock()
+        action = EcsAction(client, 'cluster-staging', None)
+        assert action.is_deployed(ecs_service([primary_deployment(2)]))
+        client.list_tasks.assert_not_called()
+        client.describe_tasks.assert_not_called()
+
+    def test_not_deployed_while_old_deployment_is_draining(self):
+        action = EcsAction(MagicMock(), 'cluster-staging', None)
+        service = ecs_service([
+            primary_deployment(2),
+            {'status': 'ACTIVE', 'desiredCount': 0, 'runningCount': 1}
+        ])
+        assert not action.is_deployed(service)
+
+    def test_not_deployed_while_tasks_are_starting(self):
+        action = EcsAction(MagicMock(), 'cluster-staging', None)
+        assert not action.is_deployed(ecs_service([primary_deployment(1)]))
+
+    def test_not_deployed_while_rollout_is_in_progress(self):
+        action = EcsAction(MagicMock(), 'cluster-staging', None)
+        service = ecs_service([
+            primary_deployment(2, rolloutState='IN_PROGRESS')
+        ])
+        assert not action.is_deployed(service)
+        assert not service.rollout_failed
+
+    def test_rollout_failed(self):
+        service = ecs_service([primary_deployment(0, rolloutState='FAILED')])
+        assert service.rollout_failed
+
+    def test_verify_tasks_counts_running_tasks_in_chunks(self):
+        service = ecs_service([primary_deployment(150)], desired_count=150)
+        task_arns = ['task%d' % index for index in range(150)]
+        client = MagicMock()
+        client.list_tasks.return_value = {'taskArns': task_arns}
+        client.describe_tasks.side_effect = lambda cluster_name, task_arns: {
+            'tasks': [{
+                'taskDefinitionArn': service.task_definition,
+                'lastStatus': 'RUNNING'
+            } for _ in task_arns]
+        }
+        action = EcsAction(client, 'cluster-staging', None, verify_tasks=True)
+        assert action.is_deployed(service)
+        assert client.describe_tasks.call_count == 2
+
+
+class TestSecretsByReference(object):
+    def test_apply_container_secrets_diffs_names_only(self):
+        task_definition = EcsTaskDefinition({
+            'containerDefinitions': [{
+                'name': 'web',
+                'secrets': [
+                    {'name': 'OLD', 'valueFrom': 'arn:aws:ssm:ap-south-1:123456789012:parameter/staging/web/OLD'}
+                ]
+            }]
+        })
+        container = task_definition.containers[0]
+        new_arn = 'arn:aws:ssm:ap-south-1:123456789012:parameter/staging/web/NEW'
+        task_definition.apply_container_secrets(container, [('NEW', new_arn)])
+
+        assert container['secrets'] == [{'name': 'NEW', 'valueFrom': new_arn}]
+        diff = task_definition.diff[0]
+        assert diff.field == 'secrets'
+        assert set(diff.old_value) == {'OLD'}
+        assert set(diff.value) == {'NEW'}
+
+    def test_register_task_definition_keeps_execution_role(self):
+        client = EcsClient(None, None, 'ap-south-1')
+        client.boto = MagicMock()
+        client.register_task_definition(
+            'webFamily', [], [], 'arn:aws:iam::123456789012:role/web',
+            execution_role_arn='arn:aws:iam::123456789012:role/execution'
+        )
+        arguments = client.boto.register_task_definition.call_args[1]
+        assert arguments['executionRoleArn'] == 'arn:aws:iam::123456789012:role/execution'
+
+        client.register_task_definition('webFamily', [], [], None)
+        assert 'executionRoleArn' not in client.boto.register_task_definition.call_args[1]
+
+
+def task_definition_payload(environment):
+    return {
+        'family': 'webFamily',
+        'taskRoleArn': 'arn:aws:iam::123456789012:role/web',
+        'containerDefinitions': [{
+            'name': 'web',
+            'image': '123456789012.dkr.ecr.ap-south-1.amazonaws.com/web-repo:v1',
+            'environment': [
+                {'name': name, 'value': value} for name, value in environment
+            ]
+        }]
+    }
+
+
+class TestTaskDefinitionChanges(object):
+    def test_unchanged_when_image_and_environment_are_the_same(self):
+        task_definition = EcsTaskDefinition(task_definition_payload(
+            [('A', '1'), ('B', '2')]
+        ))
+        task_definition.set_images('v1')
+        task_definition.apply_container_environment(
+            task_definition.containers[0],
+            [('B', '2'), ('A', '1')]
+        )
+        assert not task_definition.changed
+
+    def test_changed_when_image_changes(self):
+        task_definition = EcsTaskDefinition(task_definition_payload([]))
+        task_definition.set_images('v2')
+        assert task_definition.changed
+
+    def test_changed_when_environment_value_changes(self):
+        task_definition = EcsTaskDefinition(task_definition_payload(
+            [('A', '1')]
+        ))
+        task_definition.apply_container_environment(
+            task_definition.containers[0],
+            [('A', '2')]
+        )
+        assert task_definition.changed
@@ -0,0 +1,35 @@
+import datetime
+
+from cloudlift.deployment.event_tracker import EventTracker
+
+
+def stack_event(event_id, second):
+    return {
+        'EventId': event_id,
+        'Timestamp': datetime.datetime(2020, 1, 1, 0, 0, second)
+    }
+
+
+class TestEventTracker(object):
+    def test_yields_unseen_events_oldest_first(self):
+        tracker = EventTracker('EventId', 'Timestamp')
+        tracker.mark_seen([stack_event('a', 1)])
+        new_events = tracker.new_events([
+            stack_event('c', 3),
+            stack_event('b', 2),
+            stack_event('a', 1)
+        ])
+        assert [event['EventId'] for event in new_events] == ['b', 'c']
+        assert tracker.new_events([stack_event('c', 3)]) == []
+
+    def test_events_sharing_the_newest_timestamp_are_told_apart_by_id(self):
+        tracker = EventTracker('EventId', 'Timestamp')
+        tracker.mark_seen([stack_event('a', 1)])
+        new_events = tracker.new_events([stack_event('a', 1), stack_event('b', 1)])
+        assert [event['EventId'] for event in new_events] == ['b']
+
+    def test_events_older_than_high_water_mark_are_skipped(self):
+        tracker = EventTracker('EventId', 'Timestamp', max_ids=2)
+        tracker.mark_seen([stack_event(str(second), second) for second in range(10)])
+        assert len(tracker._seen_ids) == 2
+        assert tracker.new_events([stack_event('0', 0), stack_event('5', 5)]) == []
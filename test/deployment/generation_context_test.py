@@ -0,0 +1,112 @@
+import json
+
+import pytest
+from mock import MagicMock, patch
+
+from cloudlift.deployment.generation_context import GenerationContext
+
+ENVIRONMENT = {
+    'region': 'ap-south-1',
+    'environment': {
+        'notifications_arn': 'arn:aws:sns:ap-south-1:123456789012:alerts',
+    }
+}
+
+
+def service_stack(count):
+    return {'Stacks': [{'Outputs': [
+        {'OutputKey': 'Service%dEcsServiceName' % number,
+         'OutputValue': 'dummy-service-%d' % number}
+        for number in range(count)
+    ] + [
+        {'OutputKey': 'StackName', 'OutputValue': 'dummy-staging'},
+        {'OutputKey': 'ServicesStack1ServiceNames',
+         'OutputValue': 'Service0,Service1'},
+    ]}]}
+
+
+def describe_services(cluster_name, service_names):
+    return {'services': [
+        {'serviceName': name, 'desiredCount': int(name.split('-')[-1])}
+        for name in service_names
+    ]}
+
+
+class TestGenerationContext(object):
+    def test_for_service_reads_each_input_once(self):
+        clients = {'cloudformation': MagicMock()}
+        clients['cloudformation'].describe_stacks.return_value = \
+            service_stack(12)
+        ecs_client = MagicMock()
+        ecs_client.describe_service_batch.side_effect = describe_services
+        environment_stack = {'Outputs': [
+            {'OutputKey': 'VPC', 'OutputValue': 'vpc-1'}
+        ]}
+
+        with patch('cloudlift.deployment.generation_context.get_client_for',
+                   side_effect=lambda service, env: clients[service]), \
+            patch('cloudlift.deployment.generation_context.EcsClient',
+                  return_value=ecs_client), \
+            patch('cloudlift.deployment.generation_context.get_account_id',
+                  return_value='123456789012'), \
+            patch('cloudlift.deployment.generation_context.get_environment_snapshot',
+                  return_value=ENVIRONMENT), \
+            patch('cloudlift.deployment.generation_context.get_region_for_environment',
+                  return_value='ap-south-1'), \
+            patch('cloudlift.deployment.generation_context.ServiceInformationFetcher') \
+                as fetcher:
+            fetcher.return_value.get_current_version.return_value = 'v1'
+            context = GenerationContext.for_service(
+                'staging',
+                'dummy',
+                environment_stack
+            )
+
+        assert clients['cloudformation'].describe_stacks.call_count == 1
+        # DescribeServices takes ten services at a time
+        assert [len(call[0][1]) for call in
+                ecs_client.describe_service_batch.call_args_list] == [10, 2]
+        assert context.desired_count('Service11') == 11
+        assert context.desired_count('Unknown') == 0
+        assert context.current_version == 'v1'
+        # The version is read without describing the stack again
+        assert len(fetcher.call_args[0][2]) == 12
+        assert context.account_id == '123456789012'
+        assert context.region == 'ap-south-1'
+        assert context.environment_output('VPC') == 'vpc-1'
+        assert context.nested_stacks == \
+            {'ServicesStack1': ['Service0', 'Service1']}
+        assert len(context.deployed_services) == 12
+        assert context.notifications_arn == \
+            'arn:aws:sns:ap-south-1:123456789012:alerts'
+
+    def test_for_cluster(self):
+        clients = {'ec2': MagicMock(), 'ssm': MagicMock()}
+        clients['ec2'].describe_availability_zones.return_value = {
+            'AvailabilityZones': [
+                {'ZoneName': 'ap-south-1a'},
+                {'ZoneName': 'ap-south-1b'},
+                {'ZoneName': 'ap-south-1c'},
+            ]
+        }
+        clients['ssm'].get_parameter.return_value = {
+            'Parameter': {'Value': json.dumps({'image_id': 'ami-1'})}
+        }
+
+        with patch('cloudlift.deployment.generation_context.get_client_for',
+                   side_effect=lambda service, env: clients[service]), \
+            patch('cloudlift.deployment.generation_context.get_environment_snapshot',
+                  return_value=ENVIRONMENT), \
+            patch('cloudlift.deployment.generation_context.get_region_for_environment',
+                  return_value='ap-south-1'):
+            context = GenerationContext.for_cluster('staging')
+
+        assert context.availability_zones == ['ap-south-1a', 'ap-south-1b']
+        assert context.ami_id == 'ami-1'
+
+    def test_missing_certificate_exits(self):
+        context = GenerationContext('staging', 'ap-south-1')
+
+        with pytest.raises(SystemExit) as exit_error:
+            context.ssl_certificate_arn
+        assert exit_error.value.code == 1
@@ -0,0 +1,29 @@
+from mock import patch
+
+from cloudlift.deployment.poller import Poller
+
+
+class TestPoller(object):
+    def test_backs_off_while_nothing_changes(self):
+        poller = Poller("Test", initial_interval=1, max_interval=4, multiplier=2)
+        intervals = []
+        for _ in range(4):
+            poller.record(False)
+            intervals.append(poller.interval)
+        assert intervals == [2, 4, 4, 4]
+
+    def test_speeds_up_when_something_changes(self):
+        poller = Poller("Test", initial_interval=1, max_interval=4, multiplier=2)
+        poller.record(False)
+        poller.record(False)
+        poller.record(True)
+        assert poller.interval == 1
+
+    def test_sleeps_within_jitter_and_counts_polls(self):
+        poller = Poller("Test", initial_interval=10, jitter=0.2)
+        with patch('cloudlift.deployment.poller.sleep') as sleep:
+            poller.wait()
+            poller.wait()
+        assert poller.polls == 2
+        for call in sleep.call_args_list:
+            assert 8 <= call[0][0] <= 12
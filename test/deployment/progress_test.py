@@ -0,0 +1,119 @@
+from datetime import datetime, timedelta
+
+import pytest
+from botocore.exceptions import ClientError
+from mock import MagicMock
+
+from cloudlift.deployment.progress import StackEventReader
+
+START = datetime(2020, 1, 1)
+
+
+def stack_event(number):
+    return {
+        'EventId': 'event-%d' % number,
+        'Timestamp': START + timedelta(seconds=number),
+        'LogicalResourceId': 'Resource%d' % number,
+        'ResourceStatus': 'CREATE_IN_PROGRESS',
+    }
+
+
+class FakeCloudFormation(object):
+    '''Pages stack events newest first, two per page'''
+
+    def __init__(self, count=0):
+        self.events = [stack_event(number) for number in range(count)]
+        self.requests = []
+
+    def add_events(self, count):
+        start = len(self.events)
+        self.events += [stack_event(start + i) for i in range(count)]
+
+    def describe_stack_events(self, StackName, NextToken=None):
+        self.requests.append(NextToken)
+        newest_first = list(reversed(self.events))
+        start = int(NextToken or 0)
+        response = {'StackEvents': newest_first[start:start + 2]}
+        if start + 2 < len(newest_first):
+            response['NextToken'] = str(start + 2)
+        return response
+
+
+class TestStackEventReader(object):
+    def test_skip_existing_reads_only_the_newest_page(self):
+        client = FakeCloudFormation(count=10)
+        reader = StackEventReader(client, 'stack')
+
+        reader.skip_existing()
+
+        assert client.requests == [None]
+        assert reader.read() == []
+
+    def test_reads_new_events_across_pages_oldest_first(self):
+        client = FakeCloudFormation(count=10)
+        reader = StackEventReader(client, 'stack')
+        reader.skip_existing()
+        client.add_events(5)
+        client.requests = []
+
+        new_events = reader.read()
+
+        assert [event['EventId'] for event in new_events] == \
+            ['event-10', 'event-11', 'event-12', 'event-13', 'event-14']
+        # Stops at the page holding the last event already read
+        assert client.requests == [None, '2', '4']
+
+    def test_reads_full_history_of_a_new_stack(self):
+        client = FakeCloudFormation()
+        reader = StackEventReader(client, 'stack')
+        reader.skip_existing()
+        client.add_events(5)
+
+        assert len(reader.read()) == 5
+        assert reader.read() == []
+
+    def test_missing_stack_has_no_events(self):
+        client = MagicMock()
+        client.describe_stack_events.side_effect = ClientError(
+            {'Error': {'Code': 'ValidationError',
+                       'Message': 'Stack with id stack does not exist'}},
+            'DescribeStackEvents'
+        )
+        reader = StackEventReader(client, 'stack')
+
+        reader.skip_existing()
+
+        assert reader.read() == []
+
+    def test_failed_read_does_not_skip_events(self):
+        client = FakeCloudFormation(count=2)
+        reader = StackEventReader(client, 'stack')
+        reader.skip_existing()
+        client.add_events(5)
+        describe_stack_events = client.describe_stack_events
+        throttled = ClientError(
+            {'Error': {'Code': 'Throttling', 'Message': 'Rate exceeded'}},
+            'DescribeStackEvents'
+        )
+        client.describe_stack_events = MagicMock(
+            side_effect=[describe_stack_events('stack'), throttled]
+        )
+
+        with pytest.raises(ClientError):
+            reader.read()
+        client.describe_stack_events = describe_stack_events
+
+        assert [event['EventId'] for event in reader.read()] == \
+            ['event-2', 'event-3', 'event-4', 'event-5', 'event-6']
+
+    def test_keeps_events_read(self):
+        client = FakeCloudFormation(count=2)
+        reader = StackEventReader(client, 'stack')
+        reader.skip_existing()
+        client.add_events(1)
+        reader.read()
+        client.add_events(2)
+        reader.read()
+
+        assert [event['EventId'] for event in reader.events] == \
+            ['event-2', 'event-3', 'event-4']
@@ -1,12 +1,17 @@
 import datetime
+import json
+from copy import deepcopy
 
+import pytest
 from cfn_flip import to_json
 from mock import patch
 
 from cloudlift.config import ParameterStore
 from cloudlift.config import ServiceConfiguration
+from cloudlift.deployment.generation_context import GenerationContext
 from cloudlift.deployment.service_information_fetcher import ServiceInformationFetcher
 from cloudlift.deployment.service_template_generator import ServiceTemplateGenerator
+from cloudlift.deployment.template_snapshot import SnapshotServiceConfiguration
 from cloudlift.version import VERSION
 
 
@@ -38,6 +43,10 @@ def mocked_environment_config(cls, *args, **kwargs):
     }
 
 
+def mocked_environment_keys(cls, *args, **kwargs):
+    return {"VAR1"}
+
+
 def mocked_service_information(cls, *args, **kwargs):
     return "master"
 
@@ -59,11 +68,224 @@ class TestServiceTemplateGenerator(object):
             u'Description': 'ID of the 1st subnet', u'OutputKey': 'PrivateSubnet1', u'OutputValue': 'subnet-09b6cd23af94861cc'}, {u'Description': 'ID of the 2nd subnet', u'OutputKey': 'PrivateSubnet2', u'OutputValue': 'subnet-0657bc2faa99ce5f7'}, {u'Description': 'Minimum instances in cluster', u'OutputKey': 'MinInstances', u'OutputValue': '1'}, {u'Description': 'ID of the 2nd subnet', u'OutputKey': 'PublicSubnet2', u'OutputValue': 'subnet-096377a44ccb73aca'}, {u'Description': 'EC2 instance type', u'OutputKey': 'InstanceType', u'OutputValue': 'm5.xlarge'}, {u'Description': 'ID of the 1st subnet', u'OutputKey': 'PublicSubnet1', u'OutputValue': 'subnet-0aeae8fe5e13a7ff7'}, {u'Description': 'The name of the stack', u'OutputKey': 'StackName', u'OutputValue': 'cluster-staging'}, {u'Description': 'The unique ID of the stack. To be supplied to circle CI environment variables to validate during deployment.', u'OutputKey': 'StackId', u'OutputValue': 'arn:aws:cloudformation:ap-south-1:725827686899:stack/cluster-staging/65410f80-d21c-11e8-913a-503a56826a2a'}], u'CreationTime': datetime.datetime(2018, 10, 17, 14, 53, 23, 469000), u'Capabilities': ['CAPABILITY_NAMED_IAM'], u'StackName': 'cluster-staging', u'NotificationARNs': [], u'StackStatus': 'UPDATE_COMPLETE', u'DisableRollback': True, u'ChangeSetId': 'arn:aws:cloudformation:ap-south-1:725827686899:changeSet/cg901a2f5dbf984b9e9807a21da1ac7d12/7588cd05-1e2d-4dd6-85ab-12b921baa814', u'RollbackConfiguration': {}}
 
         with patch.object(ServiceConfiguration, 'get_config', new=mocked_service_config):
-            with patch.object(ParameterStore, 'get_existing_config', new=mocked_environment_config):
-                with patch.object(ServiceInformationFetcher, 'get_current_version', new=mocked_service_information):
-                    service_config = ServiceConfiguration(application_name, environment)
-                    template_generator = ServiceTemplateGenerator(service_config, env_stack)
-                    template_generator.env_sample_file_path = './test/templates/test_env.sample'
-                    generated_template = template_generator.generate_service()
+            with patch.object(ParameterStore, 'get_config', new=mocked_environment_config):
+                with patch.object(ParameterStore, 'get_existing_keys', new=mocked_environment_keys):
+                    with patch.object(ServiceInformationFetcher, 'get_current_version', new=mocked_service_information):
+                        service_config = ServiceConfiguration(application_name, environment)
+                        template_generator = ServiceTemplateGenerator(service_config, env_stack)
+                        template_generator.env_sample_file_path = './test/templates/test_env.sample'
+                        generated_template = template_generator.generate_service()
 
         assert to_json(''.join(open('./test/templates/expected_service_template.yml').readlines())) == to_json(generated_template)
+
+
+def offline_generator(template_bucket='templates', nested_stacks=None,
+                      deployed_services=None, **configuration):
+    context = GenerationContext(
+        'staging',
+        'ap-south-1',
+        account_id='725827686899',
+        notifications_arn='arn:aws:sns:ap-south-1:725827686899:alerts',
+        ssl_certificate_arn='arn:aws:acm:ap-south-1:725827686899:certificate/1',
+        environment_outputs={
+            'VPC': 'vpc-1',
+            'PublicSubnet1': 'subnet-1',
+            'PublicSubnet2': 'subnet-2',
+            'PrivateSubnet1': 'subnet-3',
+            'PrivateSubnet2': 'subnet-4',
+            'SecurityGroupAlb': 'sg-1',
+        },
+        current_version='master',
+        env_config=[('VAR1', 'val1')],
+        template_bucket=template_bucket,
+        nested_stacks=nested_stacks,
+        deployed_services=deployed_services
+    )
+    service_configuration = mocked_service_config(None)
+    service_configuration.update(configuration)
+    return ServiceTemplateGenerator(
+        SnapshotServiceConfiguration('dummy', 'staging', service_configuration),
+        None,
+        context
+    )
+
+
+def parse(template_body):
+    return json.loads(to_json(template_body))
+
+
+class TestNestedStacks(object):
+    def test_single_stack_by_default(self):
+        template_generator = offline_generator()
+
+        template = parse(template_generator.generate_service())
+
+        assert 'Dummy' in template['Resources']
+        assert template_generator.nested_templates == {}
+
+    def test_services_per_stack(self):
+        template_generator = offline_generator(services_per_stack=1)
+
+        template = parse(template_generator.generate_service())
+
+        nested_stack = template['Resources']['ServicesStack1']
+        assert nested_stack['Type'] == 'AWS::CloudFormation::Stack'
+        assert nested_stack['Properties']['TemplateURL'].startswith(
+            'https://templates.s3.ap-south-1.amazonaws.com/'
+            'cloudlift-templates/dummy-staging/'
+        )
+        assert nested_stack['Properties']['Parameters']['ECSServiceRole'] == \
+            {'Ref': 'ECSServiceRole'}
+        assert 'Dummy' not in template['Resources']
+        # Deploys find the ECS services through the parent's outputs
+        assert template['Outputs']['DummyEcsServiceName']['Value'] == \
+            {'Fn::GetAtt': ['ServicesStack1', 'Outputs.DummyEcsServiceName']}
+        assert template['Outputs']['DummyRunSidekiqshEcsServiceName'][
+            'Value'] == {'Fn::GetAtt': [
+                'ServicesStack2',
+                'Outputs.DummyRunSidekiqshEcsServiceName'
+            ]}
+
+        nested = parse(template_generator.nested_templates['ServicesStack1'])
+        assert 'Dummy' in nested['Resources']
+        assert 'DummyRunSidekiqsh' not in nested['Resources']
+        assert nested['Resources']['Dummy']['Properties']['Role'] == \
+            {'Ref': 'ECSServiceRole'}
+        assert set(nested['Parameters']) == \
+            set(nested_stack['Properties']['Parameters'])
+
+    def test_secrets_role_is_passed_to_nested_stacks(self):
+        template_generator = offline_generator(
+            services_per_stack=2,
+            secrets_by_reference=True
+        )
+
+        template = parse(template_generator.generate_service())
+
+        assert template['Resources']['ServicesStack1']['Properties'][
+            'Parameters']['ECSTaskExecutionRoleArn'] == \
+            {'Fn::GetAtt': ['ECSTaskExecutionRole', 'Arn']}
+        nested = parse(template_generator.nested_templates['ServicesStack1'])
+        assert nested['Resources']['DummyTaskDefinition']['Properties'][
+            'ExecutionRoleArn'] == {'Ref': 'ECSTaskExecutionRoleArn'}
+
+    def test_splits_when_over_the_resource_limit(self):
+        template_generator = offline_generator()
+
+        with patch('cloudlift.deployment.service_template_generator.'
+                   'MAX_STACK_RESOURCES', 15):
+            template = parse(template_generator.generate_service())
+
+        assert set(template_generator.nested_templates) == \
+            {'ServicesStack1', 'ServicesStack2'}
+        assert 'ServicesStack2' in template['Resources']
+
+    def test_adding_a_service_keeps_services_in_their_stacks(self):
+        services = mocked_service_config(None)['services']
+        services['Api'] = deepcopy(services['Dummy'])
+        template_generator = offline_generator(
+            nested_stacks={
+                'ServicesStack1': ['Dummy'],
+                'ServicesStack2': ['DummyRunSidekiqsh'],
+            },
+            services_per_stack=1,
+            services=services
+        )
+
+        template = parse(template_generator.generate_service())
+
+        assert template['Outputs']['ServicesStack1ServiceNames']['Value'] == \
+            'Dummy'
+        assert template['Outputs']['ServicesStack2ServiceNames']['Value'] == \
+            'DummyRunSidekiqsh'
+        assert template['Outputs']['ServicesStack3ServiceNames']['Value'] == \
+            'Api'
+        nested = parse(template_generator.nested_templates['ServicesStack1'])
+        assert 'Dummy' in nested['Resources']
+
+    def test_new_services_fill_deployed_stacks_with_room(self):
+        services = mocked_service_config(None)['services']
+        services['Api'] = deepcopy(services['DummyRunSidekiqsh'])
+        template_generator = offline_generator(
+            nested_stacks={
+                'ServicesStack1': ['Dummy'],
+                'ServicesStack2': ['DummyRunSidekiqsh'],
+            },
+            services=services
+        )
+
+        with patch('cloudlift.deployment.service_template_generator.'
+                   'MAX_STACK_RESOURCES', 15):
+            template = parse(template_generator.generate_service())
+
+        assert template['Outputs']['ServicesStack1ServiceNames']['Value'] == \
+            'Dummy'
+        assert template['Outputs']['ServicesStack2ServiceNames']['Value'] == \
+            'DummyRunSidekiqsh,Api'
+
+    def test_deployed_nested_stacks_are_kept_below_the_limit(self):
+        services = mocked_service_config(None)['services']
+        del services['Dummy']
+        template_generator = offline_generator(
+            nested_stacks={
+                'ServicesStack1': ['Dummy'],
+                'ServicesStack2': ['DummyRunSidekiqsh'],
+            },
+            services=services
+        )
+
+        template = parse(template_generator.generate_service())
+
+        assert set(template_generator.nested_templates) == {'ServicesStack2'}
+        assert 'DummyRunSidekiqsh' not in template['Resources']
+
+    def test_services_of_a_single_stack_stay_in_it(self):
+        services = mocked_service_config(None)['services']
+        services['Api'] = deepcopy(services['Dummy'])
+        template_generator = offline_generator(
+            deployed_services=['Dummy', 'DummyRunSidekiqsh'],
+            services_per_stack=1,
+            services=services
+        )
+
+        template = parse(template_generator.generate_service())
+
+        assert 'Dummy' in template['Resources']
+        assert 'DummyRunSidekiqsh' in template['Resources']
+        assert 'Api' not in template['Resources']
+        assert set(template_generator.nested_templates) == {'ServicesStack1'}
+        assert template['Outputs']['ServicesStack1ServiceNames']['Value'] == \
+            'Api'
+
+    def test_single_stack_over_the_resource_limit_nests_new_services(self):
+        services = mocked_service_config(None)['services']
+        services['Api'] = deepcopy(services['DummyRunSidekiqsh'])
+        template_generator = offline_generator(
+            deployed_services=['Dummy', 'DummyRunSidekiqsh'],
+            services=services
+        )
+
+        with patch('cloudlift.deployment.service_template_generator.'
+                   'MAX_STACK_RESOURCES', 24):
+            template = parse(template_generator.generate_service())
+
+        assert 'Dummy' in template['Resources']
+        assert 'DummyRunSidekiqsh' in template['Resources']
+        assert template['Outputs']['ServicesStack1ServiceNames']['Value'] == \
+            'Api'
+
+    def test_outputs_over_the_limit_exit(self):
+        template_generator = offline_generator(services_per_stack=1)
+
+        with patch('cloudlift.deployment.service_template_generator.'
+                   'MAX_STACK_OUTPUTS', 5), pytest.raises(SystemExit):
+            template_generator.generate_service()
+
+    def test_nested_stacks_need_a_template_bucket(self):
+        template_generator = offline_generator(
+            template_bucket=None,
+            services_per_stack=1
+        )
+
+        with pytest.raises(SystemExit):
+            template_generator.generate_service()
@@ -0,0 +1,112 @@
+import json
+from datetime import datetime, timedelta
+
+from cloudlift.deployment.stack_timeline import (StackTimeline,
+                                                 report_stack_timeline)
+
+START = datetime(2020, 1, 1)
+
+
+def stack_event(logical_id, status, second,
+                resource_type='AWS::EC2::Instance'):
+    return {
+        'EventId': '%s-%s' % (logical_id, status),
+        'LogicalResourceId': logical_id,
+        'ResourceType': resource_type,
+        'ResourceStatus': status,
+        'Timestamp': START + timedelta(seconds=second),
+    }
+
+
+def cluster_events():
+    return [
+        stack_event('cluster', 'CREATE_IN_PROGRESS', 0,
+                    'AWS::CloudFormation::Stack'),
+        stack_event('Vpc', 'CREATE_IN_PROGRESS', 1),
+        stack_event('Vpc', 'CREATE_COMPLETE', 10),
+        stack_event('NatGateway', 'CREATE_IN_PROGRESS', 11),
+        stack_event('LogGroup', 'CREATE_IN_PROGRESS', 11),
+        stack_event('LogGroup', 'CREATE_COMPLETE', 12),
+        stack_event('NatGateway', 'CREATE_COMPLETE', 100),
+        stack_event('AutoScalingGroup', 'CREATE_IN_PROGRESS', 101),
+        stack_event('AutoScalingGroup', 'CREATE_COMPLETE', 300),
+        stack_event('cluster', 'CREATE_COMPLETE', 301,
+                    'AWS::CloudFormation::Stack'),
+    ]
+
+
+class TestStackTimeline(object):
+    def test_resource_durations(self):
+        timeline = StackTimeline('cluster', cluster_events())
+
+        durations = {
+            span.logical_id: span.duration for span in timeline.spans
+        }
+
+        assert durations == {
+            'cluster': 301,
+            'Vpc': 9,
+            'NatGateway': 89,
+            'LogGroup': 1,
+            'AutoScalingGroup': 199,
+        }
+
+    def test_critical_path_follows_resources_finishing_before_next_start(self):
+        timeline = StackTimeline('cluster', cluster_events())
+
+        assert [span.logical_id for span in timeline.critical_path] == \
+            ['Vpc', 'NatGateway', 'AutoScalingGroup']
+
+    def test_critical_path_with_resources_taking_no_time(self):
+        events = cluster_events() + [
+            stack_event('Alarm', 'CREATE_IN_PROGRESS', 301),
+            stack_event('Alarm', 'CREATE_COMPLETE', 301),
+            stack_event('Topic', 'CREATE_IN_PROGRESS', 301),
+            stack_event('Topic', 'CREATE_COMPLETE', 301),
+        ]
+
+        timeline = StackTimeline('cluster', events)
+
+        assert [span.logical_id for span in timeline.critical_path] == \
+            ['Vpc', 'NatGateway', 'AutoScalingGroup', 'Alarm']
+
+    def test_unfinished_and_failed_resources(self):
+        events = cluster_events()[:4] + [
+            stack_event('NatGateway', 'CREATE_FAILED', 20),
+            stack_event('Subnet', 'CREATE_IN_PROGRESS', 21),
+        ]
+
+        spans = {
+            span.logical_id: span
+            for span in StackTimeline('cluster', events).spans
+        }
+
+        assert spans['NatGateway'].status == 'CREATE_FAILED'
+        assert spans['NatGateway'].duration == 9
+        assert spans['Subnet'].duration is None
+
+    def test_table_lists_longest_resources_first(self):
+        table = StackTimeline('cluster', cluster_events()).table()
+
+        assert table.index('AutoScalingGroup') < table.index('NatGateway') \
+            < table.index('LogGroup')
+
+    def test_writes_chrome_trace(self, tmpdir):
+        trace_file = str(tmpdir.join('trace.json'))
+
+        report_stack_timeline('cluster', cluster_events(),
+                              trace_file=trace_file)
+
+        with open(trace_file) as trace:
+            trace_events = json.load(trace)['traceEvents']
+        nat_gateway = next(
+            event for event in trace_events
+            if event['name'] == 'NatGateway'
+        )
+        assert nat_gateway['ph'] == 'X'
+        assert nat_gateway['pid'] == 1
+        assert nat_gateway['ts'] == 11000000
+        assert nat_gateway['dur'] == 89000000
+        assert nat_gateway['args']['critical_path']
+        assert trace_events[0]['ph'] == 'M'
+        assert trace_events[0]['args']['name'] == 'cluster'
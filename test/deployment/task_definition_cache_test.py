@@ -0,0 +1,100 @@
+import datetime
+import os
+
+from mock import MagicMock
+
+from cloudlift.config import local_cache
+from cloudlift.deployment.task_definition_cache import TaskDefinitionCache
+
+ARN = 'arn:aws:ecs:ap-south-1:123456789012:task-definition/webFamily:%d'
+
+
+def describe(task_definition_arn):
+    return {
+        'taskDefinition': {
+            'taskDefinitionArn': task_definition_arn,
+            'containerDefinitions': [{
+                'name': 'web',
+                'image': 'web-repo:v1',
+                'environment': [{'name': 'DB_PASSWORD', 'value': 'hunter2'}]
+            }],
+            'registeredAt': datetime.datetime(2020, 1, 1),
+            'status': 'ACTIVE'
+        }
+    }
+
+
+class TestTaskDefinitionCache(object):
+    def test_revision_is_described_once(self):
+        fetch = MagicMock(side_effect=describe)
+        cache = TaskDefinitionCache()
+        cache.get(ARN % 1, fetch)
+        cache.get(ARN % 1, fetch)
+        assert fetch.call_count == 1
+        assert (cache.hits, cache.misses) == (1, 1)
+
+    def test_callers_get_their_own_copy(self):
+        cache = TaskDefinitionCache()
+        first = cache.get(ARN % 1, describe)
+        first['taskDefinition']['containerDefinitions'][0]['image'] = 'web-repo:v2'
+        second = cache.get(ARN % 1, describe)
+        assert second['taskDefinition']['containerDefinitions'][0]['image'] == 'web-repo:v1'
+
+    def test_least_recently_used_revision_is_evicted(self):
+        fetch = MagicMock(side_effect=describe)
+        cache = TaskDefinitionCache(max_size=2)
+        cache.get(ARN % 1, fetch)
+        cache.get(ARN % 2, fetch)
+        cache.get(ARN % 1, fetch)
+        cache.get(ARN % 3, fetch)
+        cache.get(ARN % 1, fetch)
+        assert fetch.call_count == 3
+        cache.get(ARN % 2, fetch)
+        assert fetch.call_count == 4
+
+    def test_family_without_revision_is_not_cached(self):
+        fetch = MagicMock(side_effect=describe)
+        cache = TaskDefinitionCache()
+        cache.get('webFamily', fetch)
+        cache.get('webFamily', fetch)
+        assert fetch.call_count == 2
+
+    def test_revisions_are_kept_on_disk_with_local_cache(self, tmpdir, monkeypatch):
+        enable_local_cache(tmpdir, monkeypatch)
+        TaskDefinitionCache().get(ARN % 1, describe)
+
+        fetch = MagicMock(side_effect=describe)
+        payload = TaskDefinitionCache().get(ARN % 1, fetch)
+        assert not fetch.called
+        assert payload['taskDefinition']['taskDefinitionArn'] == ARN % 1
+
+    def test_status_is_not_cached(self):
+        payload = TaskDefinitionCache().get(ARN % 1, describe)
+        assert 'status' not in payload['taskDefinition']
+
+    def test_environment_values_are_encrypted_on_disk(self, tmpdir, monkeypatch):
+        enable_local_cache(tmpdir, monkeypatch)
+        TaskDefinitionCache().get(ARN % 1, describe)
+
+        cache_files = [
+            os.path.join(directory, file_name)
+            for directory, _, file_names in os.walk(str(tmpdir))
+            for file_name in file_names
+        ]
+        assert len(cache_files) == 1
+        with open(cache_files[0]) as cache_file:
+            assert 'hunter2' not in cache_file.read()
+
+    def test_revisions_stay_in_memory_without_encryption(self, tmpdir, monkeypatch):
+        enable_local_cache(tmpdir, monkeypatch)
+        monkeypatch.setattr(local_cache, 'Fernet', None)
+        TaskDefinitionCache().get(ARN % 1, describe)
+
+        assert tmpdir.listdir() == []
+
+
+def enable_local_cache(tmpdir, monkeypatch):
+    monkeypatch.setenv('CLOUDLIFT_CACHE_DIR', str(tmpdir))
+    monkeypatch.setenv('AWS_ACCESS_KEY_ID', 'testing')
+    monkeypatch.setenv('AWS_SECRET_ACCESS_KEY', 'testing')
+    monkeypatch.setitem(local_cache.CACHE_SETTINGS, 'enabled', True)
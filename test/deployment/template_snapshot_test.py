@@ -0,0 +1,113 @@
+import json
+
+from cfn_flip import to_json
+from mock import patch
+
+from cloudlift.deployment.generation_context import GenerationContext
+from cloudlift.deployment.template_snapshot import SERVICE, TemplateSnapshot
+
+SERVICE_CONFIGURATION = {
+    "cloudlift_version": "1.3.1",
+    "services": {
+        "Dummy": {
+            "memory_reservation": 1000,
+            "command": None,
+            "http_interface": {
+                "internal": False,
+                "container_port": 7003,
+                "restrict_access_to": ["0.0.0.0/0"],
+                "health_check_path": "/elb-check"
+            }
+        },
+        "DummyRunSidekiqsh": {
+            "memory_reservation": 1000,
+            "command": "./run-sidekiq.sh"
+        }
+    }
+}
+
+CONTEXT = GenerationContext(
+    'staging',
+    'ap-south-1',
+    account_id='725827686899',
+    notifications_arn='arn:aws:sns:ap-south-1:725827686899:non-prod-mumbai',
+    ssl_certificate_arn='arn:aws:acm:ap-south-1:725827686899:certificate/'
+    '380232d3-d868-4ce3-a43d-211cdfd39d26',
+    environment_outputs={
+        'VPC': 'vpc-00f07c5a6b6c9abdb',
+        'PublicSubnet1': 'subnet-0aeae8fe5e13a7ff7',
+        'PublicSubnet2': 'subnet-096377a44ccb73aca',
+        'PrivateSubnet1': 'subnet-09b6cd23af94861cc',
+        'PrivateSubnet2': 'subnet-0657bc2faa99ce5f7',
+        'SecurityGroupAlb': 'sg-095dbeb511019cfd8',
+    },
+    desired_counts={'Dummy': 2},
+    current_version='v1'
+)
+
+
+def no_aws_calls(*args, **kwargs):
+    raise AssertionError('Rendering called AWS')
+
+
+class TestTemplateSnapshot(object):
+    def test_renders_service_template_offline(self, tmpdir):
+        snapshot_file = str(tmpdir.join('snapshot.json'))
+        TemplateSnapshot(
+            SERVICE,
+            'staging',
+            SERVICE_CONFIGURATION,
+            CONTEXT,
+            'dummy'
+        ).save(snapshot_file)
+
+        with patch('botocore.client.BaseClient._make_api_call',
+                   side_effect=no_aws_calls):
+            template = TemplateSnapshot.load(snapshot_file).render(
+                './test/templates/test_env.sample'
+            )
+
+        resources = json.loads(to_json(template))['Resources']
+        parameters = json.loads(to_json(template))['Parameters']
+        container = resources['DummyTaskDefinition']['Properties'][
+            'ContainerDefinitions'][0]
+        assert container['Image'] == \
+            '725827686899.dkr.ecr.ap-south-1.amazonaws.com/dummy-repo:v1'
+        assert container['Environment'] == [{'Name': 'VAR1', 'Value': 'val1'}]
+        assert resources['Dummy']['Properties']['DesiredCount'] == 2
+        assert resources['DummyRunSidekiqsh']['Properties'][
+            'DesiredCount'] == 0
+        assert parameters['VPC']['Default'] == 'vpc-00f07c5a6b6c9abdb'
+
+    def test_snapshot_keeps_context(self, tmpdir):
+        snapshot_file = str(tmpdir.join('snapshot.json'))
+        TemplateSnapshot(
+            SERVICE,
+            'staging',
+            SERVICE_CONFIGURATION,
+            CONTEXT,
+            'dummy'
+        ).save(snapshot_file)
+
+        loaded = TemplateSnapshot.load(snapshot_file)
+
+        assert loaded.name == 'dummy'
+        assert loaded.configuration == SERVICE_CONFIGURATION
+        assert loaded.context.to_dict() == CONTEXT.to_dict()
+
+    def test_renders_compact_json(self):
+        context = GenerationContext.from_dict(CONTEXT.to_dict())
+        context.template_format = 'json'
+        snapshot = TemplateSnapshot(
+            SERVICE,
+            'staging',
+            SERVICE_CONFIGURATION,
+            context,
+            'dummy'
+        )
+
+        template = snapshot.render('./test/templates/test_env.sample')
+
+        assert template == json.dumps(json.loads(template),
+                                      separators=(',', ':'))
+        assert 'DummyTaskDefinition' in json.loads(template)['Resources']
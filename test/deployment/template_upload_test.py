@@ -0,0 +1,54 @@
+import boto3
+import pytest
+from mock import patch
+from moto import mock_s3
+
+from cloudlift.deployment.template_upload import (MAX_TEMPLATE_BODY_BYTES,
+                                                  template_source)
+
+LARGE_TEMPLATE = '{"Description": "%s"}' % ('x' * MAX_TEMPLATE_BODY_BYTES)
+
+
+def environment(template_bucket=None):
+    settings = {'notifications_arn': 'arn:aws:sns:us-east-1:1:alerts'}
+    if template_bucket:
+        settings['template_bucket'] = template_bucket
+    return patch(
+        'cloudlift.deployment.template_upload.get_environment_snapshot',
+        return_value={'region': 'us-east-1', 'environment': settings}
+    )
+
+
+class TestTemplateSource(object):
+    def test_small_template_is_passed_inline(self):
+        with environment():
+            assert template_source('{}', 'dummy-staging', 'staging') == \
+                {'TemplateBody': '{}'}
+
+    @mock_s3
+    def test_large_template_is_uploaded(self, monkeypatch):
+        # Newer botocore sends checksummed aws-chunked uploads, which moto
+        # stores without decoding
+        monkeypatch.setenv('AWS_REQUEST_CHECKSUM_CALCULATION', 'when_required')
+        s3 = boto3.client('s3', region_name='us-east-1')
+        s3.create_bucket(Bucket='templates')
+
+        with environment('templates'), \
+            patch('cloudlift.deployment.template_upload.get_client_for',
+                  return_value=s3), \
+            patch('cloudlift.deployment.template_upload.get_region_for_environment',
+                  return_value='us-east-1'):
+            source = template_source(LARGE_TEMPLATE, 'dummy-staging',
+                                     'staging')
+
+        prefix = 'https://templates.s3.us-east-1.amazonaws.com/'
+        assert source['TemplateURL'].startswith(prefix)
+        key = source['TemplateURL'][len(prefix):]
+        assert key.startswith('cloudlift-templates/dummy-staging/')
+        body = s3.get_object(Bucket='templates', Key=key)['Body'].read()
+        assert body.decode('utf-8') == LARGE_TEMPLATE
+
+    def test_large_template_without_bucket_exits(self):
+        with environment(), pytest.raises(SystemExit) as exit_error:
+            template_source(LARGE_TEMPLATE, 'dummy-staging', 'staging')
+        assert exit_error.value.code == 1
@@ -0,0 +1,57 @@
+import subprocess
+import sys
+
+from click.testing import CliRunner
+
+from cloudlift import cli
+from cloudlift.version import VERSION
+
+# Cumulative import time allowed for `import cloudlift`. Importing click
+# alone takes a fraction of this; pulling in boto3 or troposphere blows it.
+STARTUP_BUDGET_MICROSECONDS = 100000
+
+EAGERLY_FORBIDDEN_MODULES = [
+    'awacs',
+    'awscli',
+    'boto3',
+    'botocore',
+    'cfn_flip',
+    'colorclass',
+    'dictdiffer',
+    'jsonschema',
+    'terminaltables',
+    'troposphere',
+]
+
+
+def import_times(statement):
+    completed_process = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', statement],
+        stderr=subprocess.PIPE,
+        check=True
+    )
+    times = {}
+    for line in completed_process.stderr.decode('utf-8').splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        _, cumulative_time, module = line[len('import time:'):].split('|')
+        times[module.strip()] = int(cumulative_time)
+    return times
+
+
+class TestStartup(object):
+    def test_import_stays_within_budget(self):
+        times = import_times('import cloudlift')
+        assert times['cloudlift'] < STARTUP_BUDGET_MICROSECONDS
+
+    def test_import_does_not_load_command_dependencies(self):
+        times = import_times('import cloudlift')
+        loaded = [
+            module for module in EAGERLY_FORBIDDEN_MODULES if module in times
+        ]
+        assert loaded == []
+
+    def test_version_does_not_need_aws(self):
+        result = CliRunner().invoke(cli, ['--version'])
+        assert result.exit_code == 0
+        assert VERSION in result.output